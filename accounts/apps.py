@@ -2,4 +2,16 @@ from django.apps import AppConfig
 
 
 class AccountsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from .change_feed import connect_change_feed_signals
+        from .images import connect_image_signals
+        from .master_cache import connect_master_signals
+        from .report_months import connect_report_signals
+
+        connect_change_feed_signals()
+        connect_image_signals()
+        connect_master_signals()
+        connect_report_signals()
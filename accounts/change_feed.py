@@ -0,0 +1,196 @@
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import (
+    ChangeEvent,
+    ChangeFeedCursor,
+    DispatchChallan,
+    DyeingPOInward,
+    DyeingPOInwardItem,
+    DyeingPurchaseOrder,
+    DyeingPurchaseOrderItem,
+    GreigePOInward,
+    GreigePOInwardItem,
+    GreigePurchaseOrder,
+    GreigePurchaseOrderItem,
+    InventoryLot,
+    Program,
+    ProgramInvoice,
+    ProgramInvoiceItem,
+    ProgramJobberChallan,
+    ReadyPOInward,
+    ReadyPOInwardItem,
+    ReadyPurchaseOrder,
+    ReadyPurchaseOrderItem,
+    YarnPOInward,
+    YarnPOInwardItem,
+    YarnPurchaseOrder,
+    YarnPurchaseOrderItem,
+)
+from .tenant_db import owner_lookup
+
+
+# Change feed for the core documents. Every save/delete of a tracked model
+# appends a ChangeEvent in the same transaction as the write itself, so a
+# consumer that has seen seq N has seen every committed change up to N.
+#
+# Signals do not fire for bulk_create()/bulk_update()/QuerySet.update();
+# code using those calls record_changes() next to them. Inside change_batch()
+# events are buffered and written with one bulk insert when the block ends,
+# which must be before the surrounding atomic() block commits.
+CHANGE_FEED_MODELS = (
+    YarnPurchaseOrder, YarnPurchaseOrderItem, YarnPOInward, YarnPOInwardItem,
+    GreigePurchaseOrder, GreigePurchaseOrderItem, GreigePOInward, GreigePOInwardItem,
+    DyeingPurchaseOrder, DyeingPurchaseOrderItem, DyeingPOInward, DyeingPOInwardItem,
+    ReadyPurchaseOrder, ReadyPurchaseOrderItem, ReadyPOInward, ReadyPOInwardItem,
+    Program, ProgramJobberChallan, DispatchChallan,
+    ProgramInvoice, ProgramInvoiceItem, InventoryLot,
+)
+CHANGE_FEED_BATCH_SIZE = 500
+
+_buffer = contextvars.ContextVar("change_feed_buffer", default=None)
+_owner_paths = {}
+
+
+def _owner_path(model):
+    if model not in _owner_paths:
+        lookup = owner_lookup(model) or ""
+        _owner_paths[model] = lookup.split("__")[:-1] if lookup else None
+    return _owner_paths[model]
+
+
+def _owner_id(instance):
+    # Follows cached relations where possible; otherwise one lookup per
+    # parent row, remembered because a document never changes owner.
+    path = _owner_path(type(instance))
+    if path is None:
+        return None
+    obj = instance
+    for index, name in enumerate(path):
+        field = obj._meta.get_field(name)
+        if not field.is_cached(obj):
+            lookup = "__".join([*path[index + 1:], "owner"])
+            # Keyed by database too: with tenant routing, pks repeat across owners' files.
+            alias = router.db_for_read(field.related_model, instance=obj)
+            return _stored_owner_id(alias, field.related_model, getattr(obj, field.attname), lookup)
+        obj = getattr(obj, name)
+    return getattr(obj, "owner_id", None)
+
+
+@lru_cache(maxsize=4096)
+def _stored_owner_id(alias, model, pk, lookup):
+    if pk is None:
+        return None
+    return model._base_manager.using(alias).filter(pk=pk).values_list(lookup, flat=True).first()
+
+
+def _event(instance, operation):
+    return ChangeEvent(
+        owner_id=_owner_id(instance),
+        model_label=instance._meta.label_lower,
+        object_pk=instance.pk,
+        operation=operation,
+    )
+
+
+def _write(alias, events):
+    buffered = _buffer.get()
+    if buffered is not None:
+        buffered.setdefault(alias, []).extend(events)
+        return
+    if events:
+        ChangeEvent.objects.using(alias).bulk_create(events, batch_size=CHANGE_FEED_BATCH_SIZE)
+
+
+@contextmanager
+def change_batch():
+    if _buffer.get() is not None:
+        yield
+        return
+
+    buffered = {}
+    token = _buffer.set(buffered)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+    # Only reached when the block succeeded; on error the events are dropped
+    # along with the rolled-back writes.
+    for alias, events in buffered.items():
+        _write(alias, events)
+
+
+def record_changes(instances, operation):
+    by_alias = {}
+    for instance in instances:
+        if instance.pk is None:
+            continue
+        alias = instance._state.db or router.db_for_write(type(instance), instance=instance)
+        by_alias.setdefault(alias, []).append(_event(instance, operation))
+    for alias, events in by_alias.items():
+        _write(alias, events)
+
+
+def _on_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_changes([instance], "insert" if created else "update")
+
+
+def _on_delete(sender, instance, **kwargs):
+    record_changes([instance], "delete")
+
+
+def connect_change_feed_signals():
+    for model in CHANGE_FEED_MODELS:
+        uid = f"change_feed:{model._meta.label_lower}"
+        post_save.connect(_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=uid)
+
+
+def _labels(models):
+    return [model if isinstance(model, str) else model._meta.label_lower for model in models]
+
+
+def read_changes(owner, after=0, models=None, limit=CHANGE_FEED_BATCH_SIZE):
+    qs = ChangeEvent.objects.filter(owner=owner, seq__gt=after)
+    if models:
+        qs = qs.filter(model_label__in=_labels(models))
+    return list(qs.order_by("seq")[:limit])
+
+
+def changed_pks(events, model):
+    # Collapses a batch to the final state per object: pks to (re)load and
+    # pks that are gone.
+    label = _labels([model])[0]
+    latest = {}
+    for event in events:
+        if event.model_label == label:
+            latest[event.object_pk] = event.operation
+    upserted = {pk for pk, operation in latest.items() if operation != "delete"}
+    deleted = {pk for pk, operation in latest.items() if operation == "delete"}
+    return upserted, deleted
+
+
+def consume_changes(owner, name, handler, models=None, batch_size=CHANGE_FEED_BATCH_SIZE):
+    # Feeds handler(events) batch by batch from the named cursor. The handler's
+    # writes and the cursor move commit together, so a crash never skips or
+    # double-applies a batch.
+    alias = router.db_for_write(ChangeFeedCursor)
+    applied = 0
+    while True:
+        with transaction.atomic(using=alias):
+            cursor, _ = ChangeFeedCursor.objects.select_for_update().get_or_create(owner=owner, name=name)
+            events = read_changes(owner, cursor.last_seq, models, batch_size)
+            if not events:
+                break
+            handler(events)
+            cursor.last_seq = events[-1].seq
+            cursor.save(update_fields=["last_seq", "updated_at"])
+        applied += len(events)
+        if len(events) < batch_size:
+            break
+    return applied
@@ -0,0 +1,105 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .master_cache import master_version
+from .row_cache import stamp_annotations
+
+
+# Conditional GET for document views. One query reads the document's
+# updated_at columns (and those of the parents it prints) plus count/latest
+# stamps of its child rows; if the browser's If-None-Match /
+# If-Modified-Since still matches, the view is skipped and a 304 goes back.
+#
+# Responses are marked "private, no-cache" so the browser keeps them but
+# always revalidates. The ETag also covers the viewer, their CSRF secret and
+# the owner's master-list version, so a re-login or a vendor rename never
+# replays an outdated page.
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+def _document_version(request, user, scope, value, fields, children):
+    qs = scope(user)
+    if qs is None:
+        return None, None
+    annotations = stamp_annotations(qs.model, children)
+    row = (
+        qs.filter(pk=value)
+        .order_by()
+        .annotate(**annotations)
+        .values_list("owner_id", *fields, *annotations)
+        .first()
+    )
+    if row is None:
+        return None, None
+
+    stamps = row[1:]
+    last_modified = max((stamp for stamp in stamps if isinstance(stamp, datetime)), default=None)
+    digest = hashlib.md5(
+        repr((
+            user.pk,
+            request.META.get("CSRF_COOKIE"),
+            request.headers.get("X-Requested-With"),
+            master_version(row[0]),
+            stamps,
+        )).encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return quote_etag(digest), (int(last_modified.timestamp()) if last_modified else None)
+
+
+def _finish(request, response, etag, last_modified):
+    if request.method in ("GET", "HEAD") and etag and response.status_code in (200, 304):
+        response.headers.setdefault("ETag", etag)
+        if last_modified and not response.has_header("Last-Modified"):
+            response.headers["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+        patch_vary_headers(response, ["X-Requested-With"])
+    return response
+
+
+def conditional_document(scope, *, kwarg="pk", fields=("updated_at",), children=None):
+    # scope(user) -> queryset of the documents the user may open (or None);
+    # anything outside it falls through to the view for its 403/404.
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                user = await request.auser()
+                etag, last_modified = await sync_to_async(_document_version)(
+                    request, user, scope, kwargs[kwarg], fields, children
+                )
+                response = None
+                if etag:
+                    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+
+        else:
+
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return view(request, *args, **kwargs)
+                etag, last_modified = _document_version(
+                    request, request.user, scope, kwargs[kwarg], fields, children
+                )
+                response = None
+                if etag:
+                    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+
+        return inner
+
+    return decorator
@@ -1,10 +1,11 @@
+from .master_cache import owner_default_firm
 from .models import Firm, UserExtra
 
 def firm_and_role_context(request):
     if not request.user.is_authenticated:
         return {}
 
-    current_firm = Firm.objects.filter(owner=request.user).first()
+    current_firm = owner_default_firm(request.user)
     current_user_extra = UserExtra.objects.filter(user=request.user).first()
 
     firm_type_choices = []
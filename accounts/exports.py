@@ -0,0 +1,196 @@
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+from .tenant_db import tenant_context
+
+
+# Streaming CSV / XLSX exports for list views. Rows are consumed lazily from
+# the iterable handed in (normally values_list(...).iterator()), so memory
+# stays flat however many rows there are and the first bytes go out at once.
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+_ROWS_PER_WRITE = 500
+_FLUSH_BYTES = 64 * 1024
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# Text starting with these is run as a formula by spreadsheet apps.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def export_format(request):
+    value = (request.GET.get("export") or "").strip().lower()
+    return value if value in EXPORT_FORMATS else None
+
+
+def export_response(request, filename, columns, rows):
+    fmt = export_format(request) or "csv"
+    stream = _xlsx_stream(columns, rows) if fmt == "xlsx" else _csv_stream(columns, rows)
+    response = StreamingHttpResponse(_owner_stream(request.user, stream), content_type=EXPORT_FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def _owner_stream(owner, stream):
+    # The body is read after TenantDatabaseMiddleware has left the owner's
+    # database, so every chunk (and the query it runs) goes back inside it.
+    stream = iter(stream)
+    while True:
+        with tenant_context(owner):
+            chunk = next(stream, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_cell(value):
+    # Only user-entered text is neutralised; numbers keep their sign and a
+    # lone "-" placeholder is not a formula.
+    if isinstance(value, str) and len(value) > 1 and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return _text(value)
+
+
+def _csv_stream(columns, rows):
+    writer = csv.writer(_Echo())
+    # The BOM makes Excel open the file as UTF-8.
+    yield "\ufeff" + writer.writerow(columns)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow([_csv_cell(value) for value in row]))
+        if len(batch) >= _ROWS_PER_WRITE:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+class _ZipBuffer:
+    # Write-only sink for ZipFile. Without tell()/seek() zipfile falls back to
+    # streaming mode (data descriptors after each member).
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="2"><xf/><xf fontId="1" applyFont="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = "</sheetData></worksheet>"
+
+
+def _xlsx_cell(value, style=""):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f"<c{style}><v>{value}</v></c>"
+    text = _text(value)
+    if not text:
+        return "<c/>"
+    text = escape(_ILLEGAL_XML.sub("", text))
+    return f'<c{style} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values, style=""):
+    return "<row>" + "".join(_xlsx_cell(value, style) for value in values) + "</row>"
+
+
+def _xlsx_stream(columns, rows):
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((_SHEET_HEAD + _xlsx_row(columns, ' s="1"')).encode())
+            batch = []
+            for row in rows:
+                batch.append(_xlsx_row(row))
+                if len(batch) >= _ROWS_PER_WRITE:
+                    sheet.write("".join(batch).encode())
+                    batch = []
+                    if buffer.size >= _FLUSH_BYTES:
+                        yield buffer.drain()
+            sheet.write(("".join(batch) + _SHEET_TAIL).encode())
+    yield buffer.drain()
@@ -3,13 +3,17 @@ import re
 from decimal import Decimal, ROUND_HALF_UP
 from django.utils import timezone
 from django import forms
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.db.models import Q
-from django.forms import inlineformset_factory
+from django.forms import BaseInlineFormSet, inlineformset_factory
+from django.forms.models import ModelChoiceIteratorValue
+from django.urls import reverse
+from django.utils.http import urlencode
 
+from .jobs import enqueue
 from .models import (
     Accessory,
     BOM,
@@ -80,7 +84,10 @@ from .models import (
     CostingSnapshot,
     DyeingPOInwardItem,
     ReadyPOInwardItem,
+    MOVEMENT_TYPE_CHOICES,
+    QC_STATUS_CHOICES,
 )
+from .master_cache import master_instance, master_instances
 
 
 # ============================================================
@@ -128,12 +135,16 @@ def _compact_spaces(value):
     return " ".join((value or "").strip().split())
 
 
-def _material_unit_choices(user, current_value=""):
-    qs = MaterialUnit.objects.none()
-    if user is not None:
-        qs = MaterialUnit.objects.filter(owner=user).order_by("name")
+def _material_unit_choices(user, current_value="", cache=None):
+    names = cache.get("unit_names") if cache is not None else None
+    if names is None:
+        names = []
+        if user is not None:
+            names = [unit.name for unit in master_instances(user, "units")]
+        if cache is not None:
+            cache["unit_names"] = names
 
-    choices = [("", "Select unit")] + [(obj.name, obj.name) for obj in qs]
+    choices = [("", "Select unit")] + [(name, name) for name in names]
     values = {value for value, _label in choices}
 
     current_value = (current_value or "").strip()
@@ -143,7 +154,35 @@ def _material_unit_choices(user, current_value=""):
     return choices
 
 
-class MaterialTypeSelect(forms.Select):
+def _use_master_choices(field, user, name, **match):
+    # Options come from the owner's cached master list instead of a query per
+    # render. The field's queryset is left alone and still validates input.
+    if user is None:
+        return
+
+    def choices():
+        options = [] if field.empty_label is None else [("", field.empty_label)]
+        for obj in master_instances(user, name):
+            if all(getattr(obj, attr) == value for attr, value in match.items()):
+                options.append((ModelChoiceIteratorValue(field.prepare_value(obj), obj), field.label_from_instance(obj)))
+        return options
+
+    field.choices = choices
+    field.master_cached = True
+
+
+class _InstanceOptionSelect(forms.Select):
+    # Options normally carry their model instance. When one doesn't, the whole
+    # choice queryset is loaded once for the render instead of one query per
+    # option. Inside a SharedChoiceInlineFormSet the shared choices already
+    # carry their instances, so no form of the formset queries here.
+    def optgroups(self, name, value, attrs=None):
+        self._resolved = None
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self._resolved = None
+
     def _resolve_choice_instance(self, value):
         if value in (None, ""):
             return None
@@ -156,44 +195,176 @@ class MaterialTypeSelect(forms.Select):
         if raw_value in (None, ""):
             return None
 
-        queryset = getattr(self.choices, "queryset", None)
-        if queryset is None:
-            return None
-        return queryset.filter(pk=raw_value).first()
+        resolved = getattr(self, "_resolved", None)
+        if resolved is None:
+            queryset = getattr(self.choices, "queryset", None)
+            resolved = {str(obj.pk): obj for obj in queryset} if queryset is not None else {}
+            self._resolved = resolved
+        return resolved.get(str(raw_value))
+
+    def option_data(self, obj):
+        return {}
 
     def create_option(self, name, value, label, selected, index, subindex=None, attrs=None):
         option = super().create_option(name, value, label, selected, index, subindex=subindex, attrs=attrs)
         obj = self._resolve_choice_instance(value)
         if obj is not None:
-            option.setdefault("attrs", {})["data-kind"] = obj.material_kind or ""
+            option.setdefault("attrs", {}).update(self.option_data(obj))
         return option
 
 
-class MaterialSubTypeSelect(forms.Select):
-    def _resolve_choice_instance(self, value):
-        if value in (None, ""):
-            return None
+class MaterialTypeSelect(_InstanceOptionSelect):
+    def option_data(self, obj):
+        return {"data-kind": obj.material_kind or ""}
 
-        instance = getattr(value, "instance", None)
-        if instance is not None:
-            return instance
 
-        raw_value = getattr(value, "value", value)
-        if raw_value in (None, ""):
-            return None
+class MaterialSubTypeSelect(_InstanceOptionSelect):
+    def option_data(self, obj):
+        return {
+            "data-kind": obj.material_kind or "",
+            "data-material-type": str(obj.material_type_id or ""),
+        }
 
-        queryset = getattr(self.choices, "queryset", None)
-        if queryset is None:
-            return None
-        return queryset.filter(pk=raw_value).first()
 
-    def create_option(self, name, value, label, selected, index, subindex=None, attrs=None):
-        option = super().create_option(name, value, label, selected, index, subindex=subindex, attrs=attrs)
-        obj = self._resolve_choice_instance(value)
-        if obj is not None:
-            option.setdefault("attrs", {})["data-kind"] = obj.material_kind or ""
-            option.setdefault("attrs", {})["data-material-type"] = str(obj.material_type_id or "")
-        return option
+class TypeaheadSelect(forms.Select):
+    # known_instances is an optional callable returning {str(pk): instance}
+    # for values a formset has already loaded in bulk.
+    known_instances = None
+
+    def __init__(self, lookup, params=None, label="text", attrs=None):
+        super().__init__(attrs)
+        self.lookup = lookup
+        self.params = params or {}
+        self.label = label
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        url = reverse("accounts:master_lookup", args=[self.lookup])
+        if self.params:
+            url = f"{url}?{urlencode(self.params, doseq=True)}"
+        attrs["data-typeahead-url"] = url
+        attrs["data-typeahead-label"] = self.label
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        # Only the current value is rendered; typeahead.js fetches the rest from the lookup endpoint.
+        iterator = self.choices
+        field = getattr(iterator, "field", None)
+        if field is None:
+            return super().optgroups(name, value, attrs)
+
+        selected = [item for item in value if str(item).isdigit()]
+        choices = [("", field.empty_label)] if field.empty_label is not None else []
+        known = self.known_instances() if self.known_instances is not None else {}
+        missing = [item for item in selected if str(item) not in known]
+        choices.extend(iterator.choice(known[str(item)]) for item in selected if str(item) in known)
+        if missing:
+            choices.extend(iterator.choice(obj) for obj in iterator.queryset.filter(pk__in=missing))
+        self.choices = choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
+
+
+class _SharedModelChoices:
+    def __init__(self, field):
+        self.field = field
+        self._choices = None
+        self._instances = None
+
+    def choices(self):
+        if self._choices is None:
+            self._choices = list(self.field.iterator(self.field))
+        return self._choices
+
+    def instances(self):
+        if self._instances is None:
+            self._instances = {
+                str(value.value): value.instance
+                for value, _label in self.choices()
+                if getattr(value, "instance", None) is not None
+            }
+        return self._instances
+
+    def to_python(self, value):
+        field = self.field
+        if value in field.empty_values:
+            return None
+        if isinstance(value, field.queryset.model):
+            value = getattr(value, field.to_field_name or "pk")
+        instance = self.instances().get(str(value))
+        if instance is None:
+            raise ValidationError(
+                field.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return instance
+
+
+class SharedChoiceInlineFormSet(BaseInlineFormSet):
+    # Each form builds its own choice querysets in __init__. The first form's
+    # queryset is evaluated once and every other form (and the empty form) with
+    # the same SQL renders and validates against that single result.
+    # Forms that declare uses_choice_cache also get a dict to memoise plain
+    # choice lists such as unit names.
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        if getattr(self.form, "uses_choice_cache", False):
+            kwargs.setdefault("choice_cache", self._choice_cache())
+        return kwargs
+
+    def _choice_cache(self):
+        return self.__dict__.setdefault("_shared_choice_cache", {})
+
+    def _existing_pk_to_python(self, value):
+        # The hidden pk field otherwise runs queryset.get() for every row.
+        if value in forms.Field.empty_values:
+            return None
+        try:
+            pk = self._get_to_python(self._pk_field)(value)
+        except ValidationError:
+            pk = None
+        obj = self._existing_object(pk) if pk is not None else None
+        if obj is None:
+            raise ValidationError("Select a valid choice. That choice is not one of the available choices.", code="invalid_choice")
+        return obj
+
+    def _selected_instances(self, name, field):
+        # Typeahead fields only render their selected value; load those for all
+        # saved rows with one query instead of one per row.
+        shared = self.__dict__.setdefault("_shared_selected", {})
+        if name not in shared:
+            ids = {getattr(obj, f"{name}_id", None) for obj in self.get_queryset()}
+            ids.discard(None)
+            shared[name] = {str(obj.pk): obj for obj in field.queryset.filter(pk__in=ids)} if ids else {}
+        return shared[name]
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        shared = self.__dict__.setdefault("_shared_model_choices", {})
+        for name, field in form.fields.items():
+            if not isinstance(field, forms.ModelChoiceField):
+                continue
+            if isinstance(field.widget, TypeaheadSelect):
+                field.widget.known_instances = lambda name=name, field=field: self._selected_instances(name, field)
+                continue
+            if name == self._pk_field.name:
+                field.to_python = self._existing_pk_to_python
+                continue
+            if isinstance(field.widget, forms.HiddenInput):
+                continue
+            if getattr(field, "master_cached", False):
+                continue
+            if field.queryset.query.is_empty():
+                continue
+            key = (name, str(field.queryset.query))
+            source = shared.get(key)
+            if source is None:
+                source = shared[key] = _SharedModelChoices(field)
+            field.choices = source.choices
+            field.to_python = source.to_python
 
 
 # ============================================================
@@ -239,6 +410,35 @@ class CustomUserCreationForm(UserCreationForm):
         return user
 
 
+class QueuedPasswordResetForm(PasswordResetForm):
+    # Queues who to email and where the link points; the worker makes the
+    # token and renders the email, so no reset link is stored in the job.
+    def send_mail(
+        self,
+        subject_template_name,
+        email_template_name,
+        context,
+        from_email,
+        to_email,
+        html_email_template_name=None,
+    ):
+        enqueue(
+            "password_reset_email",
+            owner=context["user"],
+            priority=2,
+            payload={
+                "email": to_email,
+                "domain": context["domain"],
+                "site_name": context["site_name"],
+                "protocol": context["protocol"],
+                "subject_template_name": subject_template_name,
+                "email_template_name": email_template_name,
+                "html_email_template_name": html_email_template_name or "",
+                "from_email": from_email,
+            },
+        )
+
+
 class DashboardProfileForm(forms.Form):
     first_name = forms.CharField(required=False, max_length=150)
     last_name = forms.CharField(required=False, max_length=150)
@@ -1227,6 +1427,7 @@ class AccessoryForm(forms.ModelForm):
 
         if user is not None:
             self.fields["default_unit"].queryset = MaterialUnit.objects.filter(owner=user).order_by("name")
+            _use_master_choices(self.fields["default_unit"], user, "units")
         else:
             self.fields["default_unit"].queryset = MaterialUnit.objects.none()
 
@@ -1907,6 +2108,9 @@ class YarnPurchaseOrderForm(forms.ModelForm):
         self.fields["vendor"].queryset = Vendor.objects.filter(owner=user, is_active=True).order_by("name") if user else Vendor.objects.none()
         self.fields["firm"].queryset = Firm.objects.filter(owner=user).order_by("firm_name") if user else Firm.objects.none()
         self.fields["terms_template"].queryset = TermsCondition.objects.filter(owner=user, is_active=True).order_by("title") if user else TermsCondition.objects.none()
+        _use_master_choices(self.fields["vendor"], user, "vendors", is_active=True)
+        _use_master_choices(self.fields["firm"], user, "firms")
+        _use_master_choices(self.fields["terms_template"], user, "terms_conditions", is_active=True)
         self.fields["vendor"].empty_label = "Select vendor"
         self.fields["firm"].empty_label = "Select firm"
 
@@ -1928,7 +2132,13 @@ class YarnPurchaseOrderForm(forms.ModelForm):
         })
 
         if self.instance.pk and self.instance.terms_conditions:
-            matched = self.fields["terms_template"].queryset.filter(content=self.instance.terms_conditions).first()
+            matched = next(
+                (
+                    terms for terms in master_instances(user, "terms_conditions")
+                    if terms.is_active and terms.content == self.instance.terms_conditions
+                ),
+                None,
+            )
             if matched:
                 self.initial["terms_template"] = matched.pk
 
@@ -1941,7 +2151,7 @@ class YarnPurchaseOrderForm(forms.ModelForm):
             self.fields["others"].initial = 0
             self.fields["cgst_percent"].initial = 2.5
             self.fields["sgst_percent"].initial = 2.5
-            firm = self.fields["firm"].queryset.first()
+            firm = master_instance(user, "firms") if user else None
             if firm:
                 self.fields["firm"].initial = firm.pk
                 if not self.initial.get("shipping_address"):
@@ -1982,6 +2192,7 @@ class YarnPOInwardForm(forms.ModelForm):
             Vendor.objects.filter(owner=user, is_active=True).order_by("name")
             if user is not None else Vendor.objects.none()
         )
+        _use_master_choices(self.fields["vendor"], user, "vendors", is_active=True)
         self.fields["vendor"].empty_label = "Select inward vendor"
 
         self.fields["inward_type"].required = True
@@ -1989,6 +2200,7 @@ class YarnPOInwardForm(forms.ModelForm):
             InwardType.objects.filter(owner=user).order_by("name")
             if user is not None else InwardType.objects.none()
         )
+        _use_master_choices(self.fields["inward_type"], user, "inward_types")
         self.fields["inward_type"].empty_label = "Select inward type"
 
 
@@ -2005,7 +2217,9 @@ class YarnPurchaseOrderItemForm(forms.ModelForm):
             "count", "gsm", "sl", "hsn_code", "remark", "rate", "final_amount",
         ]
 
-    def __init__(self, *args, user=None, **kwargs):
+    uses_choice_cache = True
+
+    def __init__(self, *args, user=None, choice_cache=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         qs = MaterialType.objects.filter(material_kind="yarn")
@@ -2023,7 +2237,7 @@ class YarnPurchaseOrderItemForm(forms.ModelForm):
             if bound_unit:
                 current_unit = bound_unit
 
-        unit_choices = _material_unit_choices(user, current_unit)
+        unit_choices = _material_unit_choices(user, current_unit, cache=choice_cache)
 
         self.fields["unit"].required = False
         self.fields["unit"].choices = unit_choices
@@ -2043,6 +2257,7 @@ YarnPurchaseOrderItemFormSet = inlineformset_factory(
     YarnPurchaseOrder,
     YarnPurchaseOrderItem,
     form=YarnPurchaseOrderItemForm,
+    formset=SharedChoiceInlineFormSet,
     fields=[
         "material_type", "unit", "quantity", "value", "dia", "gauge", "rolls",
         "count", "gsm", "sl", "hsn_code", "remark", "rate", "final_amount",
@@ -2067,8 +2282,11 @@ class GreigePurchaseOrderItemForm(forms.ModelForm):
             "material", "unit", "quantity", "value", "dia", "gauge", "rolls",
             "count", "gsm", "sl", "hsn_code", "remark", "rate", "final_amount",
         ]
+        widgets = {"material": TypeaheadSelect("materials", params={"kind": "greige"}, label="name")}
 
-    def __init__(self, *args, user=None, **kwargs):
+    uses_choice_cache = True
+
+    def __init__(self, *args, user=None, choice_cache=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         qs = Material.objects.filter(material_kind="greige").order_by("name")
@@ -2082,7 +2300,7 @@ class GreigePurchaseOrderItemForm(forms.ModelForm):
             if bound_unit:
                 current_unit = bound_unit
 
-        unit_choices = _material_unit_choices(user, current_unit)
+        unit_choices = _material_unit_choices(user, current_unit, cache=choice_cache)
 
         self.fields["unit"].required = False
         self.fields["unit"].choices = unit_choices
@@ -2102,6 +2320,7 @@ GreigePurchaseOrderItemFormSet = inlineformset_factory(
     GreigePurchaseOrder,
     GreigePurchaseOrderItem,
     form=GreigePurchaseOrderItemForm,
+    formset=SharedChoiceInlineFormSet,
     fields=[
         "material", "unit", "quantity", "value", "dia", "gauge", "rolls",
         "count", "gsm", "sl", "hsn_code", "remark", "rate", "final_amount",
@@ -2140,6 +2359,7 @@ class GreigePurchaseOrderForm(forms.ModelForm):
             Vendor.objects.filter(owner=user, is_active=True).order_by("name")
             if user else Vendor.objects.none()
         )
+        _use_master_choices(self.fields["vendor"], user, "vendors", is_active=True)
 
         source_ids_qs = YarnPurchaseOrder.objects.filter(
             items__inward_items__isnull=False
@@ -2207,6 +2427,7 @@ class GreigePOInwardForm(forms.ModelForm):
             Vendor.objects.filter(owner=user, is_active=True).order_by("name")
             if user else Vendor.objects.none()
         )
+        _use_master_choices(self.fields["vendor"], user, "vendors", is_active=True)
         self.fields["vendor"].empty_label = "Select vendor"
 
         self.fields["inward_type"].required = True
@@ -2214,6 +2435,7 @@ class GreigePOInwardForm(forms.ModelForm):
             InwardType.objects.filter(owner=user).order_by("name")
             if user else InwardType.objects.none()
         )
+        _use_master_choices(self.fields["inward_type"], user, "inward_types")
         self.fields["inward_type"].empty_label = "Select inward type"
 
 
@@ -2265,10 +2487,12 @@ class DyeingPurchaseOrderForm(forms.ModelForm):
             Vendor.objects.filter(owner=user).order_by("name")
             if user else Vendor.objects.none()
         )
+        _use_master_choices(self.fields["vendor"], user, "vendors")
         self.fields["firm"].queryset = (
             Firm.objects.filter(owner=user).order_by("firm_name")
             if user else Firm.objects.none()
         )
+        _use_master_choices(self.fields["firm"], user, "firms")
 
         self.fields["source_greige_po"].required = source_greige_po is None
         self.fields["vendor"].required = True
@@ -2340,6 +2564,42 @@ class DyeingPOReviewForm(forms.Form):
             self.add_error("rejection_reason", "Rejection reason is required.")
         return cleaned
 
+class POBatchReviewForm(forms.Form):
+    KIND_CHOICES = [("yarn", "Yarn"), ("greige", "Greige"), ("dyeing", "Dyeing")]
+
+    kind = forms.ChoiceField(choices=KIND_CHOICES, widget=forms.HiddenInput)
+    decision = forms.ChoiceField(
+        choices=[("approve", "Approve"), ("reject", "Reject")],
+        widget=forms.HiddenInput,
+    )
+    rejection_reason = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={"rows": 2, "placeholder": "Reason for rejection"}),
+    )
+    po_ids = forms.Field(widget=forms.MultipleHiddenInput, required=False)
+
+    def __init__(self, *args, max_batch=500, **kwargs):
+        self.max_batch = max_batch
+        super().__init__(*args, **kwargs)
+
+    def clean_po_ids(self):
+        values = self.cleaned_data.get("po_ids") or []
+        try:
+            ids = sorted({int(value) for value in values})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid PO selection.")
+        if not ids:
+            raise forms.ValidationError("Select at least one PO.")
+        if len(ids) > self.max_batch:
+            raise forms.ValidationError(f"Select at most {self.max_batch} POs at a time.")
+        return ids
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("decision") == "reject" and not (cleaned.get("rejection_reason") or "").strip():
+            self.add_error("rejection_reason", "Rejection reason is required.")
+        return cleaned
+
 class DyeingPOInwardForm(forms.ModelForm):
     class Meta:
         model = DyeingPOInward
@@ -2379,7 +2639,9 @@ class DyeingPurchaseOrderItemForm(forms.ModelForm):
             "remark": forms.TextInput(attrs={"placeholder": "Enter remarks"}),
         }
 
-    def __init__(self, *args, user=None, **kwargs):
+    uses_choice_cache = True
+
+    def __init__(self, *args, user=None, choice_cache=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.fields["dyeing_master_detail"].required = False
@@ -2416,6 +2678,7 @@ class DyeingPurchaseOrderItemForm(forms.ModelForm):
             DyeingOtherCharge.objects.filter(owner=user).order_by("name")
             if user else DyeingOtherCharge.objects.none()
         )
+        _use_master_choices(self.fields["dyeing_other_charge"], user, "dyeing_other_charges")
 
         self.fields["dyeing_master_detail"].empty_label = "Select Dyeing Master"
         self.fields["finished_material"].empty_label = "Select Finished Material"
@@ -2427,7 +2690,7 @@ class DyeingPurchaseOrderItemForm(forms.ModelForm):
             if bound_unit:
                 current_unit = bound_unit
 
-        unit_choices = _material_unit_choices(user, current_unit)
+        unit_choices = _material_unit_choices(user, current_unit, cache=choice_cache)
         self.fields["unit"] = forms.ChoiceField(required=False, choices=unit_choices)
         self.fields["unit"].widget = forms.Select(choices=unit_choices)
 
@@ -2473,6 +2736,7 @@ DyeingPurchaseOrderItemFormSet = inlineformset_factory(
     DyeingPurchaseOrder,
     DyeingPurchaseOrderItem,
     form=DyeingPurchaseOrderItemForm,
+    formset=SharedChoiceInlineFormSet,
     fields=[
         "dyeing_master_detail",
         "finished_material",
@@ -2538,10 +2802,12 @@ class ReadyPurchaseOrderForm(forms.ModelForm):
             Vendor.objects.filter(owner=user, is_active=True).order_by("name")
             if user else Vendor.objects.none()
         )
+        _use_master_choices(self.fields["vendor"], user, "vendors", is_active=True)
         self.fields["firm"].queryset = (
             Firm.objects.filter(owner=user).order_by("firm_name")
             if user else Firm.objects.none()
         )
+        _use_master_choices(self.fields["firm"], user, "firms")
 
         source_ids_qs = DyeingPurchaseOrder.objects.filter(items__inward_items__isnull=False)
         if user is not None:
@@ -2753,6 +3019,7 @@ DyeingMaterialLinkDetailFormSet = inlineformset_factory(
     DyeingMaterialLink,
     DyeingMaterialLinkDetail,
     form=DyeingMaterialLinkDetailForm,
+    formset=SharedChoiceInlineFormSet,
     extra=1,
     can_delete=True,
 )
@@ -3001,8 +3268,8 @@ class BOMMaterialItemForm(forms.ModelForm):
             "sort_order",
         ]
         widgets = {
-            "material": forms.Select(),
-            "unit": forms.Select(),
+            "material": TypeaheadSelect("materials", params={"kind": "yarn,greige,finished,trim"}),
+            "unit": TypeaheadSelect("units"),
             "cost_per_unit": forms.NumberInput(attrs={"step": "0.01", "min": "0"}),
             "avg": forms.NumberInput(attrs={"step": "0.01", "min": "0"}),
             "cost": forms.NumberInput(attrs={"step": "0.01", "min": "0", "readonly": "readonly"}),
@@ -3047,8 +3314,8 @@ class BOMAccessoryItemForm(forms.ModelForm):
             "sort_order",
         ]
         widgets = {
-            "accessory": forms.Select(),
-            "unit": forms.Select(),
+            "accessory": TypeaheadSelect("accessories"),
+            "unit": TypeaheadSelect("units"),
             "cost_per_unit": forms.NumberInput(attrs={"step": "0.01", "min": "0"}),
             "avg": forms.NumberInput(attrs={"step": "0.01", "min": "0"}),
             "cost": forms.NumberInput(attrs={"step": "0.01", "min": "0", "readonly": "readonly"}),
@@ -3083,6 +3350,7 @@ BOMMaterialItemFormSet = inlineformset_factory(
     BOM,
     BOMMaterialItem,
     form=BOMMaterialItemForm,
+    formset=SharedChoiceInlineFormSet,
     extra=1,
     can_delete=True,
 )
@@ -3099,6 +3367,7 @@ BOMAccessoryItemFormSet = inlineformset_factory(
     BOM,
     BOMAccessoryItem,
     form=BOMAccessoryItemForm,
+    formset=SharedChoiceInlineFormSet,
     extra=1,
     can_delete=True,
 )
@@ -3163,6 +3432,7 @@ BOMJobberTypeProcessFormSet = inlineformset_factory(
     BOM,
     BOMJobberTypeProcess,
     form=BOMJobberTypeProcessForm,
+    formset=SharedChoiceInlineFormSet,
     extra=1,
     can_delete=True,
 )
@@ -3171,6 +3441,7 @@ BOMJobberDetailFormSet = inlineformset_factory(
     BOM,
     BOMJobberDetail,
     form=BOMJobberDetailForm,
+    formset=SharedChoiceInlineFormSet,
     extra=1,
     can_delete=True,
 )
@@ -3204,6 +3475,7 @@ BOMExpenseItemFormSet = inlineformset_factory(
     BOM,
     BOMExpenseItem,
     form=BOMExpenseItemForm,
+    formset=SharedChoiceInlineFormSet,
     extra=1,
     can_delete=True,
 )
@@ -3272,6 +3544,7 @@ class ProgramForm(forms.ModelForm):
 
         if user:
             self.fields["firm"].queryset = Firm.objects.filter(owner=user).order_by("firm_name")
+            _use_master_choices(self.fields["firm"], user, "firms")
             self.fields["bom"].queryset = (
                 BOM.objects.filter(owner=user)
                 .select_related(
@@ -3371,6 +3644,7 @@ class DispatchChallanForm(forms.ModelForm):
             Firm.objects.filter(owner=user).order_by("firm_name")
             if user else Firm.objects.none()
         )
+        _use_master_choices(self.fields["firm"], user, "firms")
 
         self.fields["program"].empty_label = "Select program"
         self.fields["client"].empty_label = "Select client"
@@ -3621,6 +3895,7 @@ class ProgramInvoiceForm(forms.ModelForm):
         self.fields["program"].queryset = Program.objects.filter(owner=user).select_related("bom", "firm").order_by("-id") if user else Program.objects.none()
         self.fields["client"].queryset = Client.objects.filter(owner=user, is_active=True).order_by("name") if user else Client.objects.none()
         self.fields["firm"].queryset = Firm.objects.filter(owner=user).order_by("firm_name") if user else Firm.objects.none()
+        _use_master_choices(self.fields["firm"], user, "firms")
         self.fields["program"].empty_label = "Select program"
         self.fields["client"].empty_label = "Select client"
         self.fields["firm"].empty_label = "Select firm"
@@ -3631,6 +3906,42 @@ class ProgramInvoiceForm(forms.ModelForm):
         return (self.cleaned_data.get("items_json") or "").strip()
 
 
+class ProgramInvoiceBatchForm(forms.Form):
+    month_key = forms.CharField(widget=forms.TextInput(attrs={"type": "month"}))
+    invoice_date = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+    discount_percent = forms.DecimalField(max_digits=6, decimal_places=2, required=False, initial=0, widget=forms.NumberInput(attrs={"step": "0.01", "min": "0"}))
+    gst_percent = forms.DecimalField(max_digits=6, decimal_places=2, required=False, initial=0, widget=forms.NumberInput(attrs={"step": "0.01", "min": "0"}))
+    igst_percent = forms.DecimalField(max_digits=6, decimal_places=2, required=False, initial=0, widget=forms.NumberInput(attrs={"step": "0.01", "min": "0"}))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.is_bound:
+            today = timezone.localdate()
+            self.fields["month_key"].initial = f"{today:%Y-%m}"
+            self.fields["invoice_date"].initial = today
+
+    def clean_month_key(self):
+        value = (self.cleaned_data.get("month_key") or "").strip()
+        if not re.match(r"^\d{4}-\d{2}$", value):
+            raise forms.ValidationError("Month must be in YYYY-MM format.")
+        return value
+
+    def _clean_percent(self, field_name, label):
+        value = self.cleaned_data.get(field_name) or Decimal("0")
+        if value < 0:
+            raise forms.ValidationError(f"{label} cannot be negative.")
+        return value
+
+    def clean_discount_percent(self):
+        return self._clean_percent("discount_percent", "Discount")
+
+    def clean_gst_percent(self):
+        return self._clean_percent("gst_percent", "GST")
+
+    def clean_igst_percent(self):
+        return self._clean_percent("igst_percent", "IGST")
+
+
 class MaintenanceRecordForm(forms.ModelForm):
     class Meta:
         model = MaintenanceRecord
@@ -3693,6 +4004,7 @@ ProgramJobberDetailFormSet = inlineformset_factory(
     Program,
     ProgramJobberDetail,
     form=ProgramJobberDetailForm,
+    formset=SharedChoiceInlineFormSet,
     extra=1,
     can_delete=True,
 )
@@ -3709,7 +4021,7 @@ class ProgramStartFabricForm(forms.ModelForm):
     class Meta:
         model = ProgramStartFabric
         fields = ["material", "unit", "used", "avg", "length", "width", "count", "pp_count", "lot_no", "lot_count", "available_qty", "used_qty", "sort_order"]
-        widgets = {"sort_order": forms.HiddenInput()}
+        widgets = {"material": TypeaheadSelect("materials"), "unit": TypeaheadSelect("units"), "sort_order": forms.HiddenInput()}
     def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields["material"].queryset = Material.objects.order_by("name")
@@ -3732,7 +4044,7 @@ class ProgramStartJobberForm(forms.ModelForm):
         self.fields["jobber_type"].queryset = JobberType.objects.filter(owner=user).order_by("name") if user else JobberType.objects.none()
         self.fields["jobber"].required = False
         self.fields["jobber_type"].required = False
-ProgramStartFabricFormSet = inlineformset_factory(ProgramStart, ProgramStartFabric, form=ProgramStartFabricForm, extra=1, can_delete=True)
+ProgramStartFabricFormSet = inlineformset_factory(ProgramStart, ProgramStartFabric, form=ProgramStartFabricForm, formset=SharedChoiceInlineFormSet, extra=1, can_delete=True)
 ProgramStartSizeFormSet = inlineformset_factory(
     ProgramStart,
     ProgramStartSize,
@@ -3740,7 +4052,7 @@ ProgramStartSizeFormSet = inlineformset_factory(
     extra=0,
     can_delete=True,
 )
-ProgramStartJobberFormSet = inlineformset_factory(ProgramStart, ProgramStartJobber, form=ProgramStartJobberForm, extra=1, can_delete=True)
+ProgramStartJobberFormSet = inlineformset_factory(ProgramStart, ProgramStartJobber, form=ProgramStartJobberForm, formset=SharedChoiceInlineFormSet, extra=1, can_delete=True)
 class InventoryLotForm(forms.ModelForm):
     class Meta:
         model = InventoryLot
@@ -3750,6 +4062,47 @@ class InventoryRollForm(forms.ModelForm):
         model = InventoryRoll
         fields = ["roll_no", "length_qty", "width", "gsm", "weight_qty", "accepted_qty", "status"]
 InventoryRollFormSet = inlineformset_factory(InventoryLot, InventoryRoll, form=InventoryRollForm, extra=1, can_delete=True)
+class InventoryMovementForm(forms.Form):
+    MOVEMENT_CHOICES = [choice for choice in MOVEMENT_TYPE_CHOICES if choice[0] != "receipt"]
+
+    movement_type = forms.ChoiceField(choices=MOVEMENT_CHOICES)
+    quantity = forms.DecimalField(max_digits=12, decimal_places=2, required=False, widget=forms.NumberInput(attrs={"step": "0.01"}))
+    movement_date = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+    location_name = forms.CharField(max_length=120, required=False)
+    remarks = forms.CharField(required=False, widget=forms.Textarea(attrs={"rows": 2}))
+
+    def __init__(self, *args, lot=None, **kwargs):
+        self.lot = lot
+        super().__init__(*args, **kwargs)
+        if not self.is_bound:
+            self.fields["movement_date"].initial = timezone.localdate()
+
+    def clean(self):
+        cleaned = super().clean()
+        movement_type = cleaned.get("movement_type")
+        quantity = cleaned.get("quantity") or Decimal("0")
+        available = (self.lot.available_qty or Decimal("0")) if self.lot else Decimal("0")
+
+        if movement_type == "transfer":
+            location_name = (cleaned.get("location_name") or "").strip()
+            if not location_name:
+                self.add_error("location_name", "Enter the location the lot is moving to.")
+            elif self.lot and location_name == self.lot.location_name:
+                self.add_error("location_name", "Lot is already at this location.")
+            cleaned["location_name"] = location_name
+            cleaned["quantity"] = available
+        elif movement_type == "adjustment":
+            if quantity == 0:
+                self.add_error("quantity", "Adjustment quantity cannot be zero.")
+            elif available + quantity < 0:
+                self.add_error("quantity", f"Only {available} is available in this lot.")
+        elif quantity <= 0:
+            self.add_error("quantity", "Quantity must be greater than zero.")
+        elif movement_type in ("issue", "dispatch") and quantity > available:
+            self.add_error("quantity", f"Only {available} is available in this lot.")
+        elif movement_type == "return" and self.lot and quantity > (self.lot.used_qty or Decimal("0")):
+            self.add_error("quantity", f"Only {self.lot.used_qty} has been issued from this lot.")
+        return cleaned
 class QRCodeRecordForm(forms.ModelForm):
     class Meta:
         model = QRCodeRecord
@@ -3784,6 +4137,48 @@ class QualityCheckDefectForm(forms.ModelForm):
         fields = ["defect_name", "severity", "affected_qty", "remarks"]
 QualityCheckParameterFormSet = inlineformset_factory(QualityCheck, QualityCheckParameter, form=QualityCheckParameterForm, extra=1, can_delete=True)
 QualityCheckDefectFormSet = inlineformset_factory(QualityCheck, QualityCheckDefect, form=QualityCheckDefectForm, extra=1, can_delete=True)
+class RollQCBatchForm(forms.Form):
+    inspection_date = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+    expected_width = forms.DecimalField(max_digits=8, decimal_places=2, required=False)
+    expected_gsm = forms.DecimalField(max_digits=8, decimal_places=2, required=False)
+    tolerance_percent = forms.DecimalField(max_digits=5, decimal_places=2, required=False, initial=Decimal("5"))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.is_bound:
+            self.fields["inspection_date"].initial = timezone.localdate()
+class RollQCForm(forms.Form):
+    roll_id = forms.IntegerField(widget=forms.HiddenInput)
+    status = forms.ChoiceField(choices=QC_STATUS_CHOICES)
+    accepted_qty = forms.DecimalField(max_digits=12, decimal_places=2, required=False, widget=forms.NumberInput(attrs={"step": "0.01"}))
+    width = forms.DecimalField(max_digits=8, decimal_places=2, required=False, widget=forms.NumberInput(attrs={"step": "0.01"}))
+    gsm = forms.DecimalField(max_digits=8, decimal_places=2, required=False, widget=forms.NumberInput(attrs={"step": "0.01"}))
+    defect_name = forms.CharField(max_length=120, required=False)
+    severity = forms.ChoiceField(choices=QualityCheckDefect._meta.get_field("severity").choices, required=False)
+    remarks = forms.CharField(max_length=255, required=False)
+
+    def __init__(self, *args, rolls=None, **kwargs):
+        self.rolls = rolls or {}
+        super().__init__(*args, **kwargs)
+
+    def clean(self):
+        cleaned = super().clean()
+        roll = self.rolls.get(cleaned.get("roll_id"))
+        if roll is None:
+            raise ValidationError("This roll is no longer part of the lot.")
+        cleaned["roll"] = roll
+        status = cleaned.get("status")
+        quantity = roll.qc_qty
+        accepted = cleaned.get("accepted_qty")
+        if status == "approved":
+            cleaned["accepted_qty"] = quantity
+        elif status == "partial":
+            if accepted is None or accepted <= 0 or accepted >= quantity:
+                self.add_error("accepted_qty", f"Enter an accepted quantity between 0 and {quantity}.")
+        else:
+            cleaned["accepted_qty"] = Decimal("0")
+        return cleaned
+RollQCFormSet = forms.formset_factory(RollQCForm, extra=0)
 class CostingSnapshotForm(forms.ModelForm):
     class Meta:
         model = CostingSnapshot
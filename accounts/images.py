@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+# Downscaled copies of uploaded photos and logos, stored next to the original
+# as "<name>.<variant>-<token>.<ext>". The token hashes the original's name and
+# the variant spec, so a new upload or a changed spec gets a new URL and old
+# copies are simply never referenced again. Derivatives are written when the
+# upload is saved and, for files uploaded before this existed, on first use.
+IMAGE_VARIANTS = {
+    # Program cards and form previews.
+    "thumb": {"max_side": 480, "quality": 80},
+    # Program print page and the ReportLab PDF builders.
+    "print": {"max_side": 800, "quality": 85},
+}
+
+
+def _derivative_name(name, variant):
+    spec = IMAGE_VARIANTS[variant]
+    token = hashlib.md5(f"{name}|{variant}|{sorted(spec.items())}".encode(), usedforsecurity=False).hexdigest()[:10]
+    root, ext = posixpath.splitext(name)
+    ext = ext.lower() if ext.lower() in (".png", ".webp") else ".jpg"
+    return f"{root}.{variant}-{token}{ext}"
+
+
+def _render(source, variant, ext):
+    spec = IMAGE_VARIANTS[variant]
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((spec["max_side"], spec["max_side"]), Image.Resampling.LANCZOS)
+        out = BytesIO()
+        if ext == ".jpg":
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.save(out, "JPEG", quality=spec["quality"], optimize=True, progressive=True)
+        elif ext == ".png":
+            image.save(out, "PNG", optimize=True)
+        else:
+            image.save(out, "WEBP", quality=spec["quality"])
+    return out.getvalue()
+
+
+def ensure_derivative(field, variant):
+    # Returns the storage name of the variant, creating it if needed, or None
+    # when there is no usable original (the caller falls back to it).
+    if not field or not getattr(field, "name", None):
+        return None
+    storage = field.storage
+    name = _derivative_name(field.name, variant)
+    if storage.exists(name):
+        return name
+    try:
+        with field.open("rb") as source:
+            data = _render(source, variant, posixpath.splitext(name)[1])
+    except Exception:
+        logger.warning("Could not build %s derivative for %s", variant, field.name, exc_info=True)
+        return None
+    if storage.exists(name):
+        return name
+    # Another request may have written it meanwhile; storage then picks a new
+    # name, which is still a valid copy.
+    return storage.save(name, ContentFile(data))
+
+
+def image_url(field, variant):
+    if not field or not getattr(field, "name", None):
+        return ""
+    name = ensure_derivative(field, variant)
+    return field.storage.url(name) if name else field.url
+
+
+def image_path(field, variant):
+    # Local filesystem path for ReportLab; None when the file is not available.
+    if not field or not getattr(field, "name", None):
+        return None
+    name = ensure_derivative(field, variant) or field.name
+    try:
+        return field.storage.path(name)
+    except NotImplementedError:
+        return None
+
+
+def _build_on_upload(field_name):
+    def handler(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and field_name not in update_fields):
+            return
+        field = getattr(instance, field_name)
+        if field and getattr(field, "name", None):
+            transaction.on_commit(lambda: [ensure_derivative(field, variant) for variant in IMAGE_VARIANTS])
+    return handler
+
+
+def connect_image_signals():
+    from .models import BOMImage, Firm
+
+    post_save.connect(_build_on_upload("image"), sender=BOMImage, weak=False, dispatch_uid="images:bomimage")
+    post_save.connect(_build_on_upload("logo"), sender=Firm, weak=False, dispatch_uid="images:firm")
@@ -0,0 +1,239 @@
+import logging
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import BackgroundJob
+from .tenant_db import tenant_context
+
+logger = logging.getLogger(__name__)
+
+
+# Background jobs stored in the main database and run by "manage.py
+# run_jobs". Views enqueue a task by name and hand back its status URL;
+# handlers live in accounts.tasks and receive the BackgroundJob row, with the
+# owner's tenant database active. Whatever a handler returns (JSON) is kept as
+# the job result, an exception schedules a retry with exponential backoff
+# until max_attempts is used up.
+#
+# A worker claims a job with a conditional UPDATE from "queued" to
+# "running", so any number of workers can poll the same table. Handlers must
+# be safe to run twice: a worker that dies mid-job leaves it "running" until
+# requeue_stale_jobs() puts it back.
+JOB_TASKS = {}
+JOB_TASK_MODULE = "accounts.tasks"
+JOB_RETRY_DELAY = 30
+JOB_STALE_AFTER = 15 * 60
+JOB_KEEP_DAYS = 7
+_CLAIM_BATCH = 20
+
+
+def job_task(name):
+    def register(func):
+        JOB_TASKS[name] = func
+        return func
+
+    return register
+
+
+def load_tasks():
+    import_module(JOB_TASK_MODULE)
+    return JOB_TASKS
+
+
+def _queued_duplicate(dedupe_key):
+    return BackgroundJob.objects.filter(status="queued", dedupe_key=dedupe_key).first()
+
+
+def _merge_duplicate(job, priority, run_at):
+    # The queued job takes over the more urgent of the two schedules.
+    updates = {}
+    if priority > job.priority:
+        updates["priority"] = priority
+    if run_at < job.run_at:
+        updates["run_at"] = run_at
+    if updates:
+        BackgroundJob.objects.filter(pk=job.pk, status="queued").update(**updates, updated_at=timezone.now())
+        for field, value in updates.items():
+            setattr(job, field, value)
+    return job
+
+
+def _create_or_merge(task, owner, payload, priority, run_at, dedupe_key, max_attempts):
+    if dedupe_key:
+        job = _queued_duplicate(dedupe_key)
+        if job is not None:
+            return _merge_duplicate(job, priority, run_at)
+
+    try:
+        with transaction.atomic():
+            return BackgroundJob.objects.create(
+                owner_id=getattr(owner, "pk", owner),
+                task=task,
+                payload=payload or {},
+                priority=priority,
+                run_at=run_at,
+                dedupe_key=dedupe_key,
+                max_attempts=max_attempts,
+            )
+    except IntegrityError:
+        job = _queued_duplicate(dedupe_key) if dedupe_key else None
+        if job is None:
+            raise
+        return _merge_duplicate(job, priority, run_at)
+
+
+def enqueue(task, *, owner=None, payload=None, priority=0, run_at=None, dedupe_key="", max_attempts=3):
+    job = _create_or_merge(task, owner, payload, priority, run_at or timezone.now(), dedupe_key, max_attempts)
+    if getattr(settings, "BACKGROUND_JOBS_EAGER", False) and job.run_at <= timezone.now():
+        # No run_jobs worker: run once the enqueueing transaction has
+        # committed, still within the request.
+        transaction.on_commit(lambda: _run_eagerly(job.pk))
+    return job
+
+
+def _run_eagerly(pk):
+    load_tasks()
+    # No worker will come back for a retry, so the attempts are used up now.
+    job = _claim(pk, "eager")
+    while job is not None:
+        run_job(job)
+        if job.status == "failed":
+            logger.error("Background job %s #%s failed after %s attempts:\n%s", job.task, job.pk, job.attempts, job.last_error)
+        job = _claim(pk, "eager") if job.status == "queued" else None
+    # Nor does anyone run purge_finished_jobs().
+    purge_finished_jobs()
+
+
+def _claim(pk, worker):
+    now = timezone.now()
+    claimed = BackgroundJob.objects.filter(pk=pk, status="queued").update(
+        status="running",
+        worker=worker,
+        attempts=F("attempts") + 1,
+        started_at=now,
+        finished_at=None,
+        updated_at=now,
+    )
+    return BackgroundJob.objects.get(pk=pk) if claimed else None
+
+
+def claim_next(worker, tasks=None):
+    due = BackgroundJob.objects.filter(status="queued", run_at__lte=timezone.now())
+    if tasks:
+        due = due.filter(task__in=tasks)
+    for pk in due.order_by("-priority", "run_at", "id").values_list("pk", flat=True)[:_CLAIM_BATCH]:
+        job = _claim(pk, worker)
+        if job is not None:
+            return job
+    return None
+
+
+def _settle(job, **fields):
+    now = timezone.now()
+    fields["updated_at"] = now
+    if fields["status"] != "queued":
+        fields["finished_at"] = now
+    try:
+        with transaction.atomic():
+            BackgroundJob.objects.filter(pk=job.pk, status="running").update(**fields)
+    except IntegrityError:
+        # A fresh job with the same dedupe key is already queued and will do
+        # the work this retry would have done.
+        fields.update(status="failed", finished_at=now)
+        BackgroundJob.objects.filter(pk=job.pk, status="running").update(**fields)
+    for field, value in fields.items():
+        setattr(job, field, value)
+    return job
+
+
+def run_job(job):
+    handler = JOB_TASKS.get(job.task)
+    try:
+        if handler is None:
+            raise LookupError(f"No background task named {job.task!r}.")
+        with tenant_context(job.owner_id):
+            result = handler(job)
+    except Exception:
+        logger.warning("Background job %s #%s failed (attempt %s)", job.task, job.pk, job.attempts, exc_info=True)
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = timedelta(seconds=JOB_RETRY_DELAY * 2 ** max(job.attempts - 1, 0))
+            return _settle(job, status="queued", run_at=timezone.now() + delay, last_error=error)
+        return _settle(job, status="failed", last_error=error)
+    return _settle(job, status="done", result=result, last_error="")
+
+
+def execute_job(pk):
+    # Pool entry point: runs one claimed job on this thread's / process's own
+    # database connection.
+    close_old_connections()
+    try:
+        return run_job(BackgroundJob.objects.get(pk=pk)).status
+    finally:
+        close_old_connections()
+
+
+def requeue_stale_jobs(stale_after=JOB_STALE_AFTER):
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = BackgroundJob.objects.filter(status="running", started_at__lt=cutoff)
+    count = 0
+    for job in stale:
+        error = f"Worker {job.worker or '?'} did not finish within {stale_after}s."
+        if job.attempts < job.max_attempts:
+            _settle(job, status="queued", run_at=timezone.now(), last_error=error)
+        else:
+            _settle(job, status="failed", last_error=error)
+        count += 1
+    return count
+
+
+def purge_finished_jobs(keep_days=JOB_KEEP_DAYS):
+    cutoff = timezone.now() - timedelta(days=keep_days)
+    finished = BackgroundJob.objects.filter(status__in=("done", "failed"), finished_at__lt=cutoff)
+    for result in finished.exclude(result=None).values_list("result", flat=True):
+        name = result.get("file") if isinstance(result, dict) else None
+        if name:
+            job_file_storage().delete(name)
+    return finished.delete()[0]
+
+
+def job_file_storage():
+    # Outside MEDIA_ROOT: job files are only handed out by the job_file view,
+    # which checks the job's owner.
+    return FileSystemStorage(location=settings.JOB_FILES_ROOT, base_url=None)
+
+
+def job_file_name(job, filename):
+    return f"{job.pk}/{filename}"
+
+
+def job_status_url(job):
+    return reverse("accounts:job_status", args=[job.pk])
+
+
+def job_payload(job):
+    data = {
+        "id": job.pk,
+        "task": job.task,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_at": job.run_at,
+        "finished_at": job.finished_at,
+        "status_url": job_status_url(job),
+    }
+    if job.status == "done":
+        data["result"] = job.result
+        if isinstance(job.result, dict) and job.result.get("file"):
+            data["file_url"] = reverse("accounts:job_file", args=[job.pk])
+    elif job.last_error:
+        data["error"] = job.last_error.strip().splitlines()[-1]
+    return data
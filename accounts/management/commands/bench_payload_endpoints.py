@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import MonthlyCostFact, Program
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent throughput of the JSON payload endpoints through the WSGI handler "
+        "(fixed pool of worker threads) and the ASGI handler (concurrent requests on one event loop). "
+        "Read-only; runs in process against the configured database as the given owner."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", required=True, help="Username whose data the endpoints read.")
+        parser.add_argument("--requests", type=int, default=400, help="Requests per run.")
+        parser.add_argument("--workers", type=int, default=4, help="WSGI worker threads.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight under ASGI.")
+        parser.add_argument(
+            "--db-latency-ms",
+            type=float,
+            default=0.0,
+            help="Delay added to every query, to stand in for a database over the network.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["owner"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['owner']!r} does not exist.")
+
+        month_key = f"{timezone.localdate():%Y-%m}"
+        MonthlyCostFact.trend(user, month_key)
+        paths = [
+            f"{reverse('accounts:maintenance_month_payload')}?month_key={month_key}",
+            f"{reverse('accounts:maintenance_trend_payload')}?month_key={month_key}",
+        ]
+        program = Program.objects.filter(owner=user).order_by("-id").first()
+        if program is not None:
+            paths.append(reverse("accounts:invoice_program_payload", args=[program.pk]))
+
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        cookie = f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+        latency = options["db_latency_ms"] / 1000
+        if latency:
+            connection_created.connect(self._add_latency(latency), weak=False, dispatch_uid="bench_payload_latency")
+            connections.close_all()
+
+        try:
+            targets = [paths[index % len(paths)] for index in range(options["requests"])]
+            wsgi_elapsed, wsgi_codes = self._run_wsgi(targets, cookie, options["workers"])
+            asgi_elapsed, asgi_codes = asyncio.run(self._run_asgi(targets, cookie, options["concurrency"]))
+        finally:
+            connection_created.disconnect(dispatch_uid="bench_payload_latency")
+            session.delete()
+
+        for label, elapsed, codes in (
+            (f"WSGI x{options['workers']} threads", wsgi_elapsed, wsgi_codes),
+            (f"ASGI x{options['concurrency']} in flight", asgi_elapsed, asgi_codes),
+        ):
+            failed = sum(1 for code in codes if code != 200)
+            self.stdout.write(
+                f"{label:>24}: {len(codes)} requests in {elapsed:.2f}s = {len(codes) / elapsed:,.0f} req/s"
+                + (f" ({failed} not 200)" if failed else "")
+            )
+        self.stdout.write(f"{'speedup':>24}: {wsgi_elapsed / asgi_elapsed:.2f}x")
+
+    @staticmethod
+    def _add_latency(latency):
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            # Fired on every reconnect of a thread's wrapper; add it once.
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.append(delay)
+
+        return install
+
+    def _run_wsgi(self, targets, cookie, workers):
+        application = get_wsgi_application()
+        local = threading.local()
+
+        def call(target):
+            path, _, query = target.partition("?")
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                "QUERY_STRING": query,
+                "SERVER_NAME": "localhost",
+                "SERVER_PORT": "80",
+                "HTTP_HOST": "localhost",
+                "HTTP_COOKIE": cookie,
+                "wsgi.url_scheme": "http",
+                "wsgi.input": BytesIO(),
+                "wsgi.errors": BytesIO(),
+            }
+
+            def start_response(status, headers, exc_info=None):
+                local.status = int(status.split(" ", 1)[0])
+
+            body = application(environ, start_response)
+            try:
+                b"".join(body)
+            finally:
+                if hasattr(body, "close"):
+                    body.close()
+            return local.status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            codes = list(pool.map(call, targets))
+        return time.perf_counter() - started, codes
+
+    async def _run_asgi(self, targets, cookie, concurrency):
+        application = get_asgi_application()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def call(target):
+            path, _, query = target.partition("?")
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": query.encode(),
+                "root_path": "",
+                "headers": [(b"host", b"localhost"), (b"cookie", cookie.encode())],
+                "client": ("127.0.0.1", 0),
+                "server": ("localhost", 80),
+            }
+            status = None
+            sent_request = False
+            finished = asyncio.Event()
+
+            async def receive():
+                # The body once, then a disconnect after the response is done.
+                nonlocal sent_request
+                if not sent_request:
+                    sent_request = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await finished.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                elif message["type"] == "http.response.body" and not message.get("more_body"):
+                    finished.set()
+
+            async with limit:
+                await application(scope, receive, send)
+            return status
+
+        started = time.perf_counter()
+        codes = await asyncio.gather(*(call(target) for target in targets))
+        return time.perf_counter() - started, codes
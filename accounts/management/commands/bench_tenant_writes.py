@@ -0,0 +1,94 @@
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from accounts.models import InventoryLot, InventoryMovement
+from accounts.tenant_db import create_missing_tables, register_sqlite_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent inward-style write throughput with every tenant in one SQLite file "
+        "versus one file per tenant. Runs against scratch databases in a temporary directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenants", type=int, default=4, help="Concurrent tenants (one writer thread each).")
+        parser.add_argument("--transactions", type=int, default=200, help="Transactions per tenant.")
+        parser.add_argument("--rows", type=int, default=5, help="Movement rows written per transaction.")
+        parser.add_argument("--hold-ms", type=float, default=2.0, help="Work done inside each transaction, in milliseconds.")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory(prefix="tenant-bench-") as tmp:
+            shared = self._register("bench_shared", Path(tmp) / "shared.sqlite3")
+            aliases = [shared] * options["tenants"]
+            shared_result = self._run(aliases, options)
+
+            aliases = [
+                self._register(f"bench_tenant_{index}", Path(tmp) / f"tenant_{index}.sqlite3")
+                for index in range(options["tenants"])
+            ]
+            tenant_result = self._run(aliases, options)
+
+        for label, (elapsed, committed) in (("shared file", shared_result), ("file per tenant", tenant_result)):
+            self.stdout.write(
+                f"{label:>16}: {committed} transactions in {elapsed:.2f}s = {committed / elapsed:,.0f} tx/s"
+            )
+        self.stdout.write(f"{'speedup':>16}: {shared_result[0] / tenant_result[0]:.2f}x")
+
+    def _register(self, alias, path):
+        register_sqlite_database(alias, path)
+        create_missing_tables(alias, [InventoryLot, InventoryMovement])
+        return alias
+
+    def _run(self, aliases, options):
+        barrier = threading.Barrier(len(aliases) + 1)
+        counts = [0] * len(aliases)
+        errors = []
+
+        def writer(index, alias):
+            try:
+                barrier.wait()
+                for number in range(options["transactions"]):
+                    with transaction.atomic(using=alias):
+                        lot = InventoryLot(
+                            owner_id=index + 1,
+                            lot_code=f"B{index}-{number}-{alias}",
+                            material_id=1,
+                            received_qty=Decimal("100.00"),
+                            available_qty=Decimal("100.00"),
+                        )
+                        InventoryLot.objects.using(alias).bulk_create([lot])
+                        InventoryMovement.objects.using(alias).bulk_create([
+                            InventoryMovement(
+                                owner_id=index + 1,
+                                movement_no=f"BM{index}-{number}-{row}-{alias}",
+                                lot=lot,
+                                quantity=Decimal("20.00"),
+                            )
+                            for row in range(options["rows"])
+                        ])
+                        time.sleep(options["hold_ms"] / 1000)
+                    counts[index] += 1
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer, args=(index, alias)) for index, alias in enumerate(aliases)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if errors:
+            raise errors[0]
+        return elapsed, sum(counts)
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = "Issue a read-only API token for an owner. The key is printed once and only its hash is stored."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, required=True, help="Owner id the token reads data for.")
+        parser.add_argument("--name", required=True, help="Label for the consumer, e.g. 'planning sheet'.")
+
+    def handle(self, *args, **options):
+        owner = get_user_model().objects.filter(id=options["owner"]).first()
+        if owner is None:
+            raise CommandError(f"No user with id {options['owner']}.")
+
+        token, key = ApiToken.issue(owner, options["name"])
+        self.stdout.write(f"{token.name}: {key}")
+        self.stdout.write("Send it as 'Authorization: Token <key>'.")
@@ -0,0 +1,40 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.models import ReportRefreshState
+from accounts.tenant_db import tenant_context
+
+
+class Command(BaseCommand):
+    help = "Refresh the pre-aggregated report fact tables for months touched since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, action="append", help="Only refresh this owner id (repeatable).")
+        parser.add_argument("--full", action="store_true", help="Drop and rebuild every month, monthly cost facts included, picking up deletions and rate edits.")
+        parser.add_argument("--interval", type=int, default=0, help="Keep running, refreshing every N seconds.")
+
+    def handle(self, *args, **options):
+        full = options["full"]
+        while True:
+            self.refresh_all(options["owner"], full)
+            if options["interval"] <= 0:
+                break
+            full = False
+            time.sleep(options["interval"])
+
+    def refresh_all(self, owner_ids, full):
+        owners = get_user_model().objects.filter(is_active=True).order_by("id")
+        if owner_ids:
+            owners = owners.filter(id__in=owner_ids)
+
+        for owner in owners:
+            started = time.monotonic()
+            with tenant_context(owner):
+                month_keys = ReportRefreshState.run(owner, full=full)
+            if month_keys:
+                self.stdout.write(
+                    f"{owner.username}: rebuilt {len(month_keys)} month(s) "
+                    f"{month_keys[0]}..{month_keys[-1]} in {time.monotonic() - started:.2f}s"
+                )
@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+# accounts.jobs imports the models, so it is only imported once Django is set
+# up: spawned pool processes import this module before _init_process runs.
+
+
+def _init_process():
+    import django
+
+    django.setup()
+
+    from accounts.jobs import load_tasks
+
+    load_tasks()
+
+
+def _execute(pk):
+    from accounts.jobs import execute_job
+
+    return execute_job(pk)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (accounts.jobs) on a thread or process pool. Polls until "
+        "stopped, or with --burst exits once nothing is due."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Jobs run at the same time (default 2).")
+        parser.add_argument(
+            "--pool",
+            choices=("thread", "process"),
+            default="thread",
+            help="Run jobs on threads (default) or separate processes, for CPU-bound PDF builds.",
+        )
+        parser.add_argument("--task", action="append", help="Only run jobs of this task (repeatable).")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds between checks for due jobs.")
+        parser.add_argument("--burst", action="store_true", help="Exit when no job is due instead of polling.")
+        parser.add_argument("--stale-after", type=int, help="Requeue jobs left running this many seconds.")
+        parser.add_argument("--keep-days", type=int, help="Delete finished jobs and their files after this many days.")
+
+    def handle(self, *args, **options):
+        from accounts.jobs import (
+            JOB_KEEP_DAYS,
+            JOB_STALE_AFTER,
+            JOB_TASKS,
+            claim_next,
+            load_tasks,
+            purge_finished_jobs,
+            requeue_stale_jobs,
+        )
+
+        workers = options["workers"]
+        if workers < 1:
+            raise CommandError("--workers must be at least 1.")
+        load_tasks()
+        unknown = sorted(set(options["task"] or ()) - set(JOB_TASKS))
+        if unknown:
+            raise CommandError(f"Unknown tasks: {', '.join(unknown)}. Known: {', '.join(sorted(JOB_TASKS))}.")
+
+        stale_after = options["stale_after"] or JOB_STALE_AFTER
+        keep_days = options["keep_days"] or JOB_KEEP_DAYS
+        name = f"{socket.gethostname()}:{os.getpid()}"
+
+        if options["pool"] == "process":
+            # Spawned, not forked: children open their own database connections.
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+        self.stdout.write(f"{name}: {options['pool']} pool of {workers}, tasks: {', '.join(options['task'] or JOB_TASKS)}")
+        running = {}
+        next_housekeeping = 0.0
+        try:
+            with executor:
+                while True:
+                    if time.monotonic() >= next_housekeeping:
+                        requeued = requeue_stale_jobs(stale_after)
+                        purged = purge_finished_jobs(keep_days)
+                        if requeued or purged:
+                            self.stdout.write(f"Requeued {requeued} stale job(s), purged {purged} finished job(s).")
+                        next_housekeeping = time.monotonic() + 60
+
+                    while len(running) < workers:
+                        job = claim_next(name, options["task"])
+                        if job is None:
+                            break
+                        running[executor.submit(_execute, job.pk)] = job
+
+                    if not running:
+                        if options["burst"]:
+                            break
+                        time.sleep(options["poll"])
+                        continue
+
+                    done, _pending = wait(running, timeout=options["poll"], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = running.pop(future)
+                        try:
+                            status = future.result()
+                        except Exception as exc:
+                            # The job row stays "running" and is requeued once stale.
+                            status = f"crashed ({exc!r})"
+                        self.stdout.write(f"{job.task} #{job.pk}: {status}")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped once the running jobs finished.")
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.tenant_db import copy_owner_rows, tenant_db_path
+
+
+class Command(BaseCommand):
+    help = "Copy each owner's operational rows (POs, inwards, programs, lots, invoices) into their own tenant SQLite file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, action="append", help="Only split this owner id (repeatable).")
+        parser.add_argument("--purge", action="store_true", help="Delete the copied rows from the central database afterwards.")
+
+    def handle(self, *args, **options):
+        owners = get_user_model().objects.order_by("id")
+        if options["owner"]:
+            owners = owners.filter(id__in=options["owner"])
+
+        for owner in owners:
+            copied = copy_owner_rows(owner.pk, purge=options["purge"])
+            total = sum(copied.values())
+            self.stdout.write(f"{owner.username}: {total} rows -> {tenant_db_path(owner.pk)}")
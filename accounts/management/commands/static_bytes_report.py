@@ -0,0 +1,96 @@
+import re
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from accounts.staticfiles import compress_bytes
+
+
+# The bundles each page used to carry inline in its HTML.
+PAGE_BUNDLES = {
+    "accounts:yarnpo_list": ("css/yarn_po_list.css", "js/po_review_modal.js"),
+    "accounts:greigepo_list": ("css/greige_po_list.css", "js/po_review_modal.js"),
+    "accounts:dyeingpo_list": ("css/dyeing_po_list.css",),
+    "accounts:program_list": ("css/program_list.css",),
+}
+
+_ASSET_REF = re.compile(r'<(?:link[^>]+href|script[^>]+src)="([^"]+)"')
+_HASH_SUFFIX = re.compile(r"\.[0-9a-f]{12}(\.[^./]+)$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Report bytes transferred per list page before and after moving their inline CSS/JS "
+        "into hashed, pre-compressed static bundles: first visit (empty cache) and repeat visit "
+        "(assets still cached). Renders each page in process as the given owner."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", required=True, help="Username to render the pages as.")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["owner"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['owner']!r} does not exist.")
+
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(user)
+
+        header = f"{'page':<26}{'html':>9}{'before 1st':>12}{'before rpt':>12}{'after 1st':>12}{'after rpt':>12}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for url_name, bundles in PAGE_BUNDLES.items():
+            response = client.get(reverse(url_name))
+            if response.status_code != 200:
+                self.stdout.write(f"{url_name:<26}HTTP {response.status_code}")
+                continue
+            html = response.content
+            assets = {}
+            for name in self._asset_names(html.decode()):
+                data = self._asset_bytes(name)
+                if data is not None:
+                    assets[name] = data
+            inline = sum(len(self._asset_bytes(name) or b"") for name in bundles)
+
+            # Before: the bundles sat inside every HTML response and the shared
+            # assets went out uncompressed; repeat visits are credited with a
+            # fully cached set of shared assets.
+            before_repeat = len(html) + inline
+            before_first = before_repeat + sum(len(data) for name, data in assets.items() if name not in bundles)
+            after_first = len(html) + sum(self._wire_size(data) for data in assets.values())
+            after_repeat = len(html)
+            self.stdout.write(
+                f"{url_name.split(':')[-1]:<26}{len(html):>9,}{before_first:>12,}{before_repeat:>12,}"
+                f"{after_first:>12,}{after_repeat:>12,}"
+            )
+
+    @staticmethod
+    def _asset_names(html):
+        # Static URLs referenced by the page, mapped back to their source names.
+        prefix = "/" + settings.STATIC_URL.strip("/") + "/"
+        names = []
+        for ref in _ASSET_REF.findall(html):
+            path = urlsplit(ref).path
+            if path.startswith(prefix):
+                name = _HASH_SUFFIX.sub(r"\1", path[len(prefix):])
+                if name not in names:
+                    names.append(name)
+        return names
+
+    @staticmethod
+    def _asset_bytes(name):
+        path = finders.find(name)
+        if not path:
+            return None
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    @staticmethod
+    def _wire_size(data):
+        return min([len(data), *(len(variant) for variant in compress_bytes(data).values())])
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from accounts.tenant_db import routing_enabled, tenant_context
+from accounts.views import sync_generated_po_items
+
+
+class Command(BaseCommand):
+    help = "Resync generated greige, dyeing and ready PO lines whose upstream inwards changed since the PO was last synced."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, action="append", help="Only sync POs of this owner id (repeatable).")
+        parser.add_argument("--all", action="store_true", help="Resync every generated PO, not only those whose source inwards changed or were deleted.")
+
+    def handle(self, *args, **options):
+        owners = [None]
+        if options["owner"]:
+            owners = get_user_model().objects.filter(id__in=options["owner"]).order_by("id")
+        elif routing_enabled():
+            # Each owner's POs live in their own database.
+            owners = get_user_model().objects.filter(is_active=True).order_by("id")
+
+        for owner in owners:
+            with tenant_context(owner):
+                synced = sync_generated_po_items(owner=owner, force=options["all"])
+            label = owner.username if owner is not None else "all owners"
+            summary = ", ".join(f"{name}: {count}" for name, count in synced.items())
+            self.stdout.write(f"{label}: {summary}")
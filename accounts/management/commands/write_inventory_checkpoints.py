@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import InventoryBalanceCheckpoint, InventoryLot, InventoryMovement
+from accounts.tenant_db import tenant_context
+
+
+class Command(BaseCommand):
+    help = "Write per-lot inventory balance checkpoints so stock-as-of queries only replay a short tail of movements."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Checkpoint date (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument("--owner", type=int, action="append", help="Only write checkpoints for this owner id (repeatable).")
+        parser.add_argument(
+            "--backfill-openings",
+            action="store_true",
+            help="First post opening movements for lots whose movements do not add up to their stock (lots made before the ledger).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            as_of_date = date.fromisoformat(options["date"]) if options["date"] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--date must be in YYYY-MM-DD format.")
+
+        owners = get_user_model().objects.filter(is_active=True).order_by("id")
+        if options["owner"]:
+            owners = owners.filter(id__in=options["owner"])
+
+        for owner in owners:
+            with tenant_context(owner):
+                self.write_owner(owner, as_of_date, options["backfill_openings"])
+
+    def write_owner(self, owner, as_of_date, backfill_openings):
+        if backfill_openings:
+            lots = InventoryLot.objects.filter(owner=owner).select_related("dyeing_inward_item__inward")
+            openings = InventoryMovement.post_many(InventoryLot.opening_movements(lots))
+            if openings:
+                self.stdout.write(f"{owner.username}: {len(openings)} opening movement(s) posted")
+        count = InventoryBalanceCheckpoint.write(owner, as_of_date)
+        if count:
+            self.stdout.write(f"{owner.username}: {count} lot balance(s) checkpointed at {as_of_date:%d-%m-%Y}")
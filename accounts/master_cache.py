@@ -0,0 +1,141 @@
+import time
+
+from django.core.cache import caches
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import (
+    Accessory,
+    DyeingOtherCharge,
+    Expense,
+    Firm,
+    InwardType,
+    JobberType,
+    MaterialShade,
+    MaterialSubType,
+    MaterialType,
+    MaterialUnit,
+    TermsCondition,
+    Vendor,
+)
+
+
+# Per-owner master lists, kept as plain tuples in the "masters" cache.
+# Every owner has a version key; any save or delete of one of their masters
+# moves it on, so stale lists are never read again and simply expire.
+MASTER_CACHE_ALIAS = "masters"
+
+MASTERS = {
+    "units": (MaterialUnit, ("name",), ("name",)),
+    "material_types": (MaterialType, ("material_kind", "name"), ("name",)),
+    "material_sub_types": (MaterialSubType, ("material_kind", "material_type", "name"), ("name",)),
+    "material_shades": (MaterialShade, ("material_kind", "name", "code"), ("name",)),
+    "jobber_types": (JobberType, ("name",), ("name",)),
+    "inward_types": (InwardType, ("name",), ("name",)),
+    "expenses": (Expense, ("name",), ("name",)),
+    "accessories": (Accessory, ("name", "default_unit"), ("name",)),
+    "dyeing_other_charges": (DyeingOtherCharge, ("name",), ("name",)),
+    "terms_conditions": (TermsCondition, ("title", "content", "is_active"), ("title",)),
+    "vendors": (
+        Vendor,
+        ("name", "contact_person", "phone", "email", "gst_number", "address", "is_active"),
+        ("name",),
+    ),
+    "firms": (
+        Firm,
+        (
+            "firm_name", "firm_type", "address_line", "city", "state", "pincode", "phone", "email",
+            "website", "gst_number", "pan_number", "tan_number", "cin_number", "bank_name",
+            "account_holder_name", "account_number", "ifsc_code", "branch_name", "logo",
+        ),
+        ("firm_name",),
+    ),
+}
+
+
+def _cache():
+    return caches[MASTER_CACHE_ALIAS]
+
+
+def _owner_id(owner):
+    return getattr(owner, "pk", owner)
+
+
+def _version_key(owner_id):
+    return f"masters:{owner_id}:version"
+
+
+def _attnames(name):
+    model, fields, _ordering = MASTERS[name]
+    wanted = {"id", "owner", *fields}
+    return [f.attname for f in model._meta.concrete_fields if f.name in wanted]
+
+
+def master_version(owner):
+    owner_id = _owner_id(owner)
+    cache = _cache()
+    version = cache.get(_version_key(owner_id))
+    if version is None:
+        cache.add(_version_key(owner_id), time.time_ns(), None)
+        version = cache.get(_version_key(owner_id))
+    return version
+
+
+def bump_master_version(owner):
+    _cache().set(_version_key(_owner_id(owner)), time.time_ns(), None)
+
+
+def master_rows(owner, name):
+    owner_id = _owner_id(owner)
+    if owner_id is None:
+        return []
+
+    cache = _cache()
+    key = f"masters:{owner_id}:{master_version(owner_id)}:{name}"
+    rows = cache.get(key)
+    if rows is None:
+        model, _fields, ordering = MASTERS[name]
+        rows = list(
+            model.objects.filter(owner_id=owner_id)
+            .order_by(*ordering, "id")
+            .values_list(*_attnames(name))
+        )
+        cache.set(key, rows)
+    return rows
+
+
+def master_instances(owner, name):
+    # Rebuilt as if loaded from the database; fields outside the cached set
+    # are deferred and load on first access.
+    model = MASTERS[name][0]
+    attnames = _attnames(name)
+    db = router.db_for_read(model)
+    return [model.from_db(db, attnames, row) for row in master_rows(owner, name)]
+
+
+def master_instance(owner, name, pk=None):
+    for obj in master_instances(owner, name):
+        if pk is None or obj.pk == pk:
+            return obj
+    return None
+
+
+def owner_default_firm(owner):
+    # The owner's first firm by id, as Firm.objects.filter(owner=...).first()
+    # returned it; the cached list itself is ordered by name.
+    return min(master_instances(owner, "firms"), key=lambda firm: firm.pk, default=None)
+
+
+def _bump_for_instance(sender, instance, **kwargs):
+    # Bump after commit so a concurrent render cannot cache the old rows
+    # under the new version.
+    owner_id = getattr(instance, "owner_id", None)
+    if owner_id is not None:
+        transaction.on_commit(lambda: bump_master_version(owner_id))
+
+
+def connect_master_signals():
+    for model, _fields, _ordering in MASTERS.values():
+        uid = f"master_cache:{model._meta.label_lower}"
+        post_save.connect(_bump_for_instance, sender=model, dispatch_uid=uid)
+        post_delete.connect(_bump_for_instance, sender=model, dispatch_uid=uid)
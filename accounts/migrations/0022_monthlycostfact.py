@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_maintenancerecord_programinvoice_programinvoiceitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCostFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month_key', models.CharField(max_length=7)),
+                ('yarn_inward_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('yarn_inward_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('greige_inward_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('greige_inward_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('dyeing_inward_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('dyeing_inward_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ready_inward_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoice_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoice_count', models.PositiveIntegerField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month_key'],
+                'unique_together': {('owner', 'month_key')},
+            },
+        ),
+    ]
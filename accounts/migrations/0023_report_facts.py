@@ -0,0 +1,114 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_monthlycostfact'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportRefreshState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('refreshed_through', models.DateTimeField(blank=True, null=True)),
+                ('last_month_count', models.PositiveIntegerField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ClientSalesFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month_key', models.CharField(max_length=7)),
+                ('client_name', models.CharField(blank=True, default='', max_length=180)),
+                ('dispatch_count', models.PositiveIntegerField(default=0)),
+                ('dispatch_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoice_count', models.PositiveIntegerField(default=0)),
+                ('invoice_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.client')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month_key', 'client_name'],
+                'indexes': [models.Index(fields=['owner', 'month_key'], name='accounts_cl_owner_i_022057_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='JobberOutputFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month_key', models.CharField(max_length=7)),
+                ('jobber_name', models.CharField(blank=True, default='', max_length=120)),
+                ('jobber_type_name', models.CharField(blank=True, default='', max_length=80)),
+                ('challan_count', models.PositiveIntegerField(default=0)),
+                ('issued_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('inward_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('jobber', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.jobber')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month_key', 'jobber_name'],
+                'indexes': [models.Index(fields=['owner', 'month_key'], name='accounts_jo_owner_i_b1aed4_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PurchaseReportFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stage', models.CharField(choices=[('yarn', 'Yarn'), ('greige', 'Greige'), ('dyeing', 'Dyeing'), ('ready', 'Ready')], max_length=10)),
+                ('month_key', models.CharField(max_length=7)),
+                ('vendor_name', models.CharField(blank=True, default='', max_length=180)),
+                ('material_name', models.CharField(blank=True, default='', max_length=150)),
+                ('ordered_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ordered_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('inward_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('inward_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.vendor')),
+            ],
+            options={
+                'ordering': ['-month_key', 'stage', 'vendor_name', 'material_name'],
+                'indexes': [models.Index(fields=['owner', 'month_key', 'stage'], name='accounts_pu_owner_i_07b85f_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StageYieldFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month_key', models.CharField(max_length=7)),
+                ('vendor_name', models.CharField(blank=True, default='', max_length=180)),
+                ('greige_input_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expected_output_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('dyeing_received_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('dyeing_accepted_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('dyeing_rejected_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ready_inward_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.vendor')),
+            ],
+            options={
+                'ordering': ['-month_key', 'vendor_name'],
+                'indexes': [models.Index(fields=['owner', 'month_key'], name='accounts_st_owner_i_f038dd_idx')],
+            },
+        ),
+    ]
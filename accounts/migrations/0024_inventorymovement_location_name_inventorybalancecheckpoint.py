@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_report_facts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryBalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location_name', models.CharField(blank=True, default='', max_length=120)),
+                ('as_of_date', models.DateField()),
+                ('balance_qty', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['-as_of_date', 'lot_id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='location_name',
+            field=models.CharField(blank=True, default='', max_length=120),
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['owner', 'movement_date'], name='accounts_in_owner_i_778016_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['lot', 'movement_date'], name='accounts_in_lot_id_c1a298_idx'),
+        ),
+        migrations.AddField(
+            model_name='inventorybalancecheckpoint',
+            name='lot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to='accounts.inventorylot'),
+        ),
+        migrations.AddField(
+            model_name='inventorybalancecheckpoint',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='inventorybalancecheckpoint',
+            index=models.Index(fields=['owner', 'as_of_date'], name='accounts_in_owner_i_49efb8_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='inventorybalancecheckpoint',
+            unique_together={('lot', 'location_name', 'as_of_date')},
+        ),
+    ]
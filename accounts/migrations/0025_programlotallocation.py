@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_inventorymovement_location_name_inventorybalancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgramLotAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lot', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='program_allocations', to='accounts.inventorylot')),
+                ('start_fabric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_allocations', to='accounts.programstartfabric')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
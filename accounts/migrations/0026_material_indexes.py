@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_programlotallocation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['material_kind', 'name'], name='accounts_ma_materia_7573e3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['name'], name='accounts_ma_name_a0a31f_idx'),
+        ),
+    ]
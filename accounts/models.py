@@ -1,10 +1,18 @@
+import hashlib
+import secrets
+from datetime import date, timedelta
 from decimal import Decimal
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db import models
-from django.db.models import Sum
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Min, Q, Sum, Value, When
+from django.db.models.functions import Greatest
 from django.utils import timezone
 
+from .images import image_url
+
 
 # ============================================================
 # USER
@@ -120,6 +128,12 @@ class Material(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["material_kind", "name"]),
+            models.Index(fields=["name"]),
+        ]
+
     def __str__(self):
         mt = getattr(self.material_type, "name", "")
         return f"{mt} - {self.name}" if mt else self.name
@@ -1492,12 +1506,19 @@ class Program(OwnedModel):
     def avg_price(self):
         return self.bom.price or Decimal("0")
 
+    def _preview_image(self):
+        # images are ordered by (sort_order, id), so a prefetch is reused here.
+        for bom_image in self.bom.images.all():
+            return bom_image.image
+        return None
+
     @property
     def preview_image_url(self):
-        first_image = self.bom.images.order_by("sort_order", "id").first()
-        if first_image and first_image.image:
-            return first_image.image.url
-        return ""
+        return image_url(self._preview_image(), "thumb")
+
+    @property
+    def print_image_url(self):
+        return image_url(self._preview_image(), "print")
 
     @property
     def assigned_jobber_names(self):
@@ -1920,6 +1941,15 @@ MOVEMENT_TYPE_CHOICES = [
     ("dispatch", "Dispatch"),
 ]
 
+MOVEMENT_DIRECTIONS = {
+    "receipt": 1,
+    "return": 1,
+    "issue": -1,
+    "dispatch": -1,
+    "adjustment": 1,
+    "transfer": 1,
+}
+
 
 class InventoryLot(OwnedModel):
     lot_code = models.CharField(max_length=40, unique=True)
@@ -1981,6 +2011,141 @@ class InventoryLot(OwnedModel):
         self.available_qty = available if available > 0 else Decimal("0")
         super().save(*args, **kwargs)
 
+    @classmethod
+    def apply_roll_qc(cls, lots):
+        from .change_feed import record_changes
+
+        lots = {lot.pk: lot for lot in lots}
+        roll_qty = Case(When(length_qty__gt=0, then=F("length_qty")), default=F("weight_qty"))
+        totals = (
+            InventoryRoll.objects.filter(lot_id__in=lots.keys())
+            .values("lot_id")
+            .annotate(
+                roll_count=Count("id"),
+                pending_count=Count("id", filter=Q(status="pending")),
+                approved_count=Count("id", filter=Q(status="approved")),
+                rejected_count=Count("id", filter=Q(status="rejected")),
+                hold_count=Count("id", filter=Q(status="hold")),
+                accepted=Sum("accepted_qty", filter=Q(status__in=["approved", "partial"])),
+                pending=Sum(roll_qty, filter=Q(status="pending")),
+                rejected=Sum(roll_qty - F("accepted_qty"), filter=Q(status__in=["rejected", "partial"])),
+                hold=Sum(roll_qty, filter=Q(status="hold")),
+            )
+        )
+
+        # Lots whose rolls are all still pending keep the quantities they came in with;
+        # in a partly graded lot the ungraded rolls stay accepted at their full length.
+        changes = {}
+        for row in totals:
+            if row["pending_count"] == row["roll_count"]:
+                continue
+            if row["pending_count"]:
+                qc_status = "pending"
+            elif row["approved_count"] == row["roll_count"]:
+                qc_status = "approved"
+            elif row["rejected_count"] == row["roll_count"]:
+                qc_status = "rejected"
+            elif row["hold_count"]:
+                qc_status = "hold"
+            else:
+                qc_status = "partial"
+            changes[row["lot_id"]] = {
+                "accepted_qty": (row["accepted"] or Decimal("0")) + (row["pending"] or Decimal("0")),
+                "rejected_qty": row["rejected"] or Decimal("0"),
+                "hold_qty": row["hold"] or Decimal("0"),
+                "qc_status": qc_status,
+            }
+        if not changes:
+            return []
+
+        def per_lot(field):
+            output_field = cls._meta.get_field(field)
+            return Case(
+                *[When(pk=pk, then=Value(values[field], output_field=output_field)) for pk, values in changes.items()],
+                output_field=output_field,
+            )
+
+        cls.objects.filter(pk__in=changes.keys()).update(
+            accepted_qty=per_lot("accepted_qty"),
+            rejected_qty=per_lot("rejected_qty"),
+            hold_qty=per_lot("hold_qty"),
+            qc_status=per_lot("qc_status"),
+            available_qty=Greatest(
+                per_lot("accepted_qty") - F("used_qty"),
+                Value(Decimal("0"), output_field=cls._meta.get_field("available_qty")),
+            ),
+            updated_at=timezone.now(),
+        )
+
+        movements = []
+        for pk, values in changes.items():
+            lot = lots[pk]
+            delta = values["accepted_qty"] - (lot.accepted_qty or Decimal("0"))
+            for field, value in values.items():
+                setattr(lot, field, value)
+            available = lot.accepted_qty - (lot.used_qty or Decimal("0"))
+            lot.available_qty = available if available > 0 else Decimal("0")
+            if delta:
+                movements.append(InventoryMovement.build(
+                    lot, "adjustment", delta,
+                    ref_model="QualityCheck",
+                    remarks="Accepted quantity changed by roll QC.",
+                ))
+        InventoryMovement.post_many(movements)
+        record_changes([lots[pk] for pk in changes], "update")
+        return [lots[pk] for pk in changes]
+
+    @classmethod
+    def opening_movements(cls, lots):
+        # Lots that predate the movement ledger: the receipt and issue that make
+        # their movements add up to accepted_qty and used_qty, dated no later
+        # than the lot's inward or first movement. Callers post them; a lot whose
+        # ledger already adds up gets none.
+        lots = list(lots)
+        if not lots:
+            return []
+        totals = {
+            row["lot_id"]: row
+            for row in InventoryMovement.objects.filter(lot_id__in=[lot.pk for lot in lots])
+            .values("lot_id")
+            .annotate(
+                accepted=Sum("quantity", filter=Q(movement_type__in=["receipt", "adjustment"])),
+                used=Sum("quantity", filter=Q(movement_type__in=["issue", "dispatch", "return"])),
+                first_date=Min("movement_date"),
+            )
+            .order_by()
+        }
+
+        movements = []
+        for lot in lots:
+            row = totals.get(lot.pk, {})
+            if lot.dyeing_inward_item_id:
+                inward = lot.dyeing_inward_item.inward
+                opening_date = inward.inward_date
+                ref = {"ref_model": "DyeingPOInward", "ref_number": inward.inward_number}
+            else:
+                opening_date = timezone.localdate(lot.created_at)
+                ref = {"ref_model": "InventoryLot", "ref_number": lot.lot_code}
+            if row.get("first_date"):
+                opening_date = min(opening_date, row["first_date"])
+
+            received = (lot.accepted_qty or Decimal("0")) - (row.get("accepted") or Decimal("0"))
+            used = (lot.used_qty or Decimal("0")) + (row.get("used") or Decimal("0"))
+            if received:
+                movements.append(InventoryMovement.build(
+                    lot, "receipt" if received > 0 else "adjustment", received,
+                    movement_date=opening_date, remarks="Opening balance.", **ref,
+                ))
+            if used:
+                movements.append(InventoryMovement.build(
+                    lot, "issue" if used > 0 else "return", abs(used),
+                    movement_date=opening_date,
+                    ref_model="InventoryLot",
+                    ref_number=lot.lot_code,
+                    remarks="Opening balance.",
+                ))
+        return movements
+
     def __str__(self):
         return self.lot_code
 
@@ -1999,6 +2164,10 @@ class InventoryRoll(models.Model):
         ordering = ["id"]
         unique_together = [("lot", "roll_no")]
 
+    @property
+    def qc_qty(self):
+        return self.length_qty or self.weight_qty or Decimal("0")
+
     def __str__(self):
         return f"{self.lot.lot_code} / {self.roll_no}"
 
@@ -2101,6 +2270,50 @@ class QualityCheck(OwnedModel):
     class Meta:
         ordering = ["-inspection_date", "-id"]
 
+    @classmethod
+    def record_roll_results(cls, lot, results, inspected_by=None, inspection_date=None):
+        if not results:
+            return []
+        inspection_date = inspection_date or timezone.localdate()
+        checks = cls.objects.bulk_create([
+            cls(
+                owner_id=lot.owner_id,
+                qc_number=qc_number,
+                stage=lot.stage,
+                lot=lot,
+                roll=result["roll"],
+                inspection_date=inspection_date,
+                status="submitted",
+                result=result["status"],
+                inspected_by=inspected_by,
+                remarks=result.get("remarks") or "",
+            )
+            for qc_number, result in zip(next_quality_check_numbers(len(results)), results)
+        ], batch_size=500)
+        QualityCheckParameter.objects.bulk_create([
+            QualityCheckParameter(quality_check=check, **values)
+            for check, result in zip(checks, results)
+            for values in result.get("parameters", ())
+        ], batch_size=500)
+        QualityCheckDefect.objects.bulk_create([
+            QualityCheckDefect(quality_check=check, **values)
+            for check, result in zip(checks, results)
+            for values in result.get("defects", ())
+        ], batch_size=500)
+
+        rolls = []
+        for result in results:
+            roll = result["roll"]
+            roll.status = result["status"]
+            roll.accepted_qty = result["accepted_qty"]
+            for field in ("width", "gsm"):
+                if result.get(field) is not None:
+                    setattr(roll, field, result[field])
+            rolls.append(roll)
+        InventoryRoll.objects.bulk_update(rolls, ["status", "accepted_qty", "width", "gsm"], batch_size=500)
+        InventoryLot.apply_roll_qc([lot])
+        return checks
+
     def __str__(self):
         return self.qc_number
 
@@ -2162,15 +2375,287 @@ class InventoryMovement(OwnedModel):
     movement_date = models.DateField(default=timezone.localdate)
     ref_model = models.CharField(max_length=80, blank=True, default="")
     ref_number = models.CharField(max_length=80, blank=True, default="")
+    location_name = models.CharField(max_length=120, blank=True, default="")
     remarks = models.TextField(blank=True, default="")
 
     class Meta:
         ordering = ["-movement_date", "-id"]
+        indexes = [
+            models.Index(fields=["owner", "movement_date"]),
+            models.Index(fields=["lot", "movement_date"]),
+        ]
+
+    @classmethod
+    def build(cls, lot, movement_type, quantity, movement_date=None, location_name=None, **extra):
+        quantity = Decimal(quantity or 0)
+        if MOVEMENT_DIRECTIONS.get(movement_type, 1) < 0:
+            quantity = -abs(quantity)
+        return cls(
+            owner_id=lot.owner_id,
+            lot=lot,
+            movement_type=movement_type,
+            quantity=quantity,
+            movement_date=movement_date or timezone.localdate(),
+            location_name=lot.location_name if location_name is None else location_name,
+            **extra,
+        )
+
+    @classmethod
+    def post_many(cls, movements):
+        movements = [movement for movement in movements if movement.quantity]
+        if not movements:
+            return []
+        for movement, movement_no in zip(movements, next_inventory_movement_numbers(len(movements))):
+            movement.movement_no = movement_no
+        created = cls.objects.bulk_create(movements, batch_size=500)
+
+        earliest = {}
+        for movement in movements:
+            if movement.owner_id not in earliest or movement.movement_date < earliest[movement.owner_id]:
+                earliest[movement.owner_id] = movement.movement_date
+        for owner_id, movement_date in earliest.items():
+            InventoryBalanceCheckpoint.objects.filter(owner_id=owner_id, as_of_date__gte=movement_date).delete()
+        return created
+
+    @classmethod
+    def post(cls, lot, movement_type, quantity, **kwargs):
+        created = cls.post_many([cls.build(lot, movement_type, quantity, **kwargs)])
+        return created[0] if created else None
 
     def __str__(self):
         return self.movement_no
 
 
+class InventoryBalanceCheckpoint(OwnedModel):
+    lot = models.ForeignKey("InventoryLot", on_delete=models.CASCADE, related_name="balance_checkpoints")
+    location_name = models.CharField(max_length=120, blank=True, default="")
+    as_of_date = models.DateField()
+    balance_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-as_of_date", "lot_id"]
+        unique_together = [("lot", "location_name", "as_of_date")]
+        indexes = [models.Index(fields=["owner", "as_of_date"])]
+
+    @classmethod
+    def latest_date(cls, owner, as_of_date):
+        return (
+            cls.objects.filter(owner=owner, as_of_date__lte=as_of_date)
+            .aggregate(latest=models.Max("as_of_date"))
+            .get("latest")
+        )
+
+    @classmethod
+    def write(cls, owner, as_of_date):
+        previous_date = cls.latest_date(owner, as_of_date - timedelta(days=1))
+        balances = {}
+        if previous_date:
+            for row in cls.objects.filter(owner=owner, as_of_date=previous_date).values("lot_id", "location_name", "balance_qty"):
+                balances[(row["lot_id"], row["location_name"])] = row["balance_qty"]
+
+        tail = InventoryMovement.objects.filter(owner=owner, movement_date__lte=as_of_date)
+        if previous_date:
+            tail = tail.filter(movement_date__gt=previous_date)
+        for row in tail.values("lot_id", "location_name").annotate(total=Sum("quantity")).order_by():
+            key = (row["lot_id"], row["location_name"])
+            balances[key] = balances.get(key, Decimal("0")) + (row["total"] or Decimal("0"))
+
+        with transaction.atomic():
+            cls.objects.filter(owner=owner, as_of_date=as_of_date).delete()
+            cls.objects.bulk_create(
+                [
+                    cls(owner=owner, lot_id=lot_id, location_name=location_name, as_of_date=as_of_date, balance_qty=balance)
+                    for (lot_id, location_name), balance in balances.items()
+                    if balance
+                ],
+                batch_size=500,
+            )
+        return len(balances)
+
+    @classmethod
+    def balances_as_of(cls, owner, as_of_date, group_by="lot", lot=None, material=None, location_name=None):
+        group_field = {"lot": "lot_id", "material": "lot__material_id", "location": "location_name"}[group_by]
+        filters = {}
+        if lot is not None:
+            filters["lot"] = lot
+        if material is not None:
+            filters["lot__material"] = material
+        if location_name is not None:
+            filters["location_name"] = location_name
+
+        checkpoint_date = cls.latest_date(owner, as_of_date)
+        balances = {}
+        if checkpoint_date:
+            checkpoints = (
+                cls.objects.filter(owner=owner, as_of_date=checkpoint_date, **filters)
+                .values(group_field)
+                .annotate(total=Sum("balance_qty"))
+                .order_by()
+            )
+            for row in checkpoints:
+                balances[row[group_field]] = row["total"] or Decimal("0")
+
+        tail = InventoryMovement.objects.filter(owner=owner, movement_date__lte=as_of_date, **filters)
+        if checkpoint_date:
+            tail = tail.filter(movement_date__gt=checkpoint_date)
+        tail_count = 0
+        for row in tail.values(group_field).annotate(total=Sum("quantity"), count=Count("id")).order_by():
+            balances[row[group_field]] = balances.get(row[group_field], Decimal("0")) + (row["total"] or Decimal("0"))
+            tail_count += row["count"]
+        return balances, checkpoint_date, tail_count
+
+    def __str__(self):
+        return f"{self.lot_id} - {self.as_of_date}"
+
+
+LOT_ALLOCATION_STRATEGY_CHOICES = [
+    ("fifo", "FIFO"),
+    ("shade", "Shade Consistent"),
+]
+
+
+def _lock_inventory_lots(queryset):
+    return list(queryset.select_for_update().order_by("id"))
+
+
+class ProgramLotAllocation(models.Model):
+    start_fabric = models.ForeignKey("ProgramStartFabric", on_delete=models.CASCADE, related_name="lot_allocations")
+    lot = models.ForeignKey("InventoryLot", on_delete=models.PROTECT, related_name="program_allocations")
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    @staticmethod
+    def required_qty(fabric, program):
+        if fabric.used_qty and fabric.used_qty > 0:
+            return fabric.used_qty
+        return ((fabric.avg or Decimal("0")) * (program.total_qty or Decimal("0"))).quantize(Decimal("0.01"))
+
+    @staticmethod
+    def _save_lots(lots):
+        from .change_feed import record_changes
+
+        now = timezone.now()
+        for lot in lots:
+            available = (lot.accepted_qty or Decimal("0")) - (lot.used_qty or Decimal("0"))
+            lot.available_qty = available if available > 0 else Decimal("0")
+            lot.updated_at = now
+        InventoryLot.objects.bulk_update(lots, ["used_qty", "available_qty", "updated_at"], batch_size=500)
+        record_changes(lots, "update")
+
+    @staticmethod
+    def _order_candidates(candidates, required, strategy):
+        if strategy != "shade" or not candidates:
+            return candidates
+
+        shades = {}
+        for lot in candidates:
+            shades.setdefault(lot.shade_reference or lot.dye_lot_no or lot.lot_code, []).append(lot)
+        covering = [lots for lots in shades.values() if sum((lot.available_qty for lot in lots), Decimal("0")) >= required]
+        if covering:
+            best = min(covering, key=lambda lots: lots[0].id)
+        else:
+            best = max(shades.values(), key=lambda lots: sum((lot.available_qty for lot in lots), Decimal("0")))
+        best_ids = {lot.id for lot in best}
+        return best + [lot for lot in candidates if lot.id not in best_ids]
+
+    @classmethod
+    def release(cls, start_record):
+        allocations = list(
+            cls.objects.filter(start_fabric__start_record=start_record).select_related("start_fabric")
+        )
+        if not allocations:
+            return 0
+
+        lots = {
+            lot.id: lot
+            for lot in _lock_inventory_lots(InventoryLot.objects.filter(pk__in={row.lot_id for row in allocations}))
+        }
+        movements = []
+        for allocation in allocations:
+            lot = lots[allocation.lot_id]
+            lot.used_qty = max((lot.used_qty or Decimal("0")) - allocation.quantity, Decimal("0"))
+            movements.append(InventoryMovement.build(
+                lot, "return", allocation.quantity,
+                ref_model="ProgramStart",
+                ref_number=start_record.program.program_no,
+                remarks="Released by program start re-allocation.",
+            ))
+        cls._save_lots(list(lots.values()))
+        cls.objects.filter(pk__in=[allocation.pk for allocation in allocations]).delete()
+        InventoryMovement.post_many(movements)
+        return len(allocations)
+
+    @classmethod
+    def allocate(cls, start_record, strategy="fifo"):
+        program = start_record.program
+        fabrics = list(start_record.fabric_rows.filter(material__isnull=False).order_by("sort_order", "id"))
+        requirements = {fabric.pk: cls.required_qty(fabric, program) for fabric in fabrics}
+        fabrics = [fabric for fabric in fabrics if requirements[fabric.pk] > 0]
+        if not fabrics:
+            return []
+
+        lots = _lock_inventory_lots(
+            InventoryLot.objects.filter(
+                owner=start_record.owner,
+                material_id__in={fabric.material_id for fabric in fabrics},
+                is_closed=False,
+                available_qty__gt=0,
+            ).exclude(qc_status__in=["rejected", "hold"])
+        )
+        lots_by_material = {}
+        for lot in lots:
+            lots_by_material.setdefault(lot.material_id, []).append(lot)
+
+        allocations = []
+        movements = []
+        touched = {}
+        shortfalls = []
+        for fabric in fabrics:
+            required = requirements[fabric.pk]
+            candidates = [lot for lot in lots_by_material.get(fabric.material_id, []) if lot.available_qty > 0]
+            requested_codes = [code.strip() for code in (fabric.lot_no or "").split(",") if code.strip()]
+            if requested_codes:
+                requested = [lot for lot in candidates if lot.lot_code in requested_codes]
+                candidates = requested + [lot for lot in candidates if lot.lot_code not in requested_codes]
+            candidates = cls._order_candidates(candidates, required, strategy)
+
+            remaining = required
+            picked = []
+            for lot in candidates:
+                if remaining <= 0:
+                    break
+                take = min(lot.available_qty, remaining)
+                lot.used_qty = (lot.used_qty or Decimal("0")) + take
+                lot.available_qty -= take
+                remaining -= take
+                touched[lot.id] = lot
+                picked.append(lot)
+                allocations.append(cls(start_fabric=fabric, lot=lot, quantity=take))
+                movements.append(InventoryMovement.build(
+                    lot, "issue", take,
+                    ref_model="ProgramStart",
+                    ref_number=program.program_no,
+                ))
+
+            fabric.lot_no = ", ".join(lot.lot_code for lot in picked)[:150]
+            fabric.lot_count = len(picked)
+            fabric.available_qty = required - remaining
+            if remaining > 0:
+                shortfalls.append((fabric, remaining))
+
+        cls._save_lots(list(touched.values()))
+        ProgramStartFabric.objects.bulk_update(fabrics, ["lot_no", "lot_count", "available_qty"])
+        cls.objects.bulk_create(allocations, batch_size=500)
+        InventoryMovement.post_many(movements)
+        return shortfalls
+
+    def __str__(self):
+        return f"{self.start_fabric_id} - {self.lot_id} - {self.quantity}"
+
+
 class CostingSnapshot(OwnedModel):
     bom = models.ForeignKey(
         "BOM",
@@ -2256,6 +2741,10 @@ class ProgramInvoice(OwnedModel):
 
     @classmethod
     def next_invoice_no(cls, owner):
+        return cls.next_invoice_numbers(owner, 1)[0]
+
+    @classmethod
+    def next_invoice_numbers(cls, owner, count):
         today = timezone.localdate()
         prefix = f"INV-{today:%y%m}-"
         last_no = (
@@ -2270,10 +2759,18 @@ class ProgramInvoice(OwnedModel):
                 next_seq = int(last_no.rsplit("-", 1)[-1]) + 1
             except Exception:
                 next_seq = cls.objects.filter(owner=owner, invoice_no__startswith=prefix).count() + 1
-        return f"{prefix}{next_seq:04d}"
+        return [f"{prefix}{seq:04d}" for seq in range(next_seq, next_seq + count)]
 
     def recompute_totals(self, save=False):
         sub_total = self.items.aggregate(total=Sum("amount")).get("total") or Decimal("0")
+        self.apply_totals(sub_total)
+        if save and self.pk:
+            self.save(update_fields=[
+                "sub_total", "discount_amount", "after_discount_amount", "gst_amount", "igst_amount", "final_amount", "updated_at"
+            ])
+
+    def apply_totals(self, sub_total):
+        sub_total = Decimal(sub_total or 0)
         discount_percent = self.discount_percent or Decimal("0")
         self.sub_total = sub_total
         self.discount_amount = (sub_total * discount_percent / Decimal("100")).quantize(Decimal("0.01"))
@@ -2284,10 +2781,7 @@ class ProgramInvoice(OwnedModel):
         self.gst_amount = (base_amount * gst_percent / Decimal("100")).quantize(Decimal("0.01"))
         self.igst_amount = (base_amount * igst_percent / Decimal("100")).quantize(Decimal("0.01"))
         self.final_amount = (base_amount + self.gst_amount + self.igst_amount).quantize(Decimal("0.01"))
-        if save and self.pk:
-            self.save(update_fields=[
-                "sub_total", "discount_amount", "after_discount_amount", "gst_amount", "igst_amount", "final_amount", "updated_at"
-            ])
+        return self.final_amount
 
     def save(self, *args, **kwargs):
         if not self.invoice_no and self.owner_id:
@@ -2357,16 +2851,639 @@ class MaintenanceRecord(OwnedModel):
         return self.month_display
 
 
+def month_key_range(month_key):
+    year, month = month_key.split("-")
+    year = int(year)
+    month = int(month)
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+class MonthlyCostFact(OwnedModel):
+    month_key = models.CharField(max_length=7)
+    yarn_inward_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    yarn_inward_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    greige_inward_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    greige_inward_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    dyeing_inward_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    dyeing_inward_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ready_inward_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-month_key"]
+        unique_together = [("owner", "month_key")]
+
+    @property
+    def cost_total(self):
+        return (self.ready_inward_qty or Decimal("0")) + (self.expense_total or Decimal("0"))
+
+    @classmethod
+    def _inward_totals(cls, item_model, owner, start, end, rate_path=None):
+        qs = item_model.objects.filter(
+            inward__owner=owner,
+            inward__inward_date__gte=start,
+            inward__inward_date__lt=end,
+        )
+        aggregates = {"qty": Sum("quantity")}
+        if rate_path:
+            aggregates["value"] = Sum(
+                F("quantity") * F(rate_path),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            )
+        totals = qs.aggregate(**aggregates)
+        qty = totals.get("qty") or Decimal("0")
+        value = Decimal(totals.get("value") or 0).quantize(Decimal("0.01"))
+        return qty, value
+
+    @classmethod
+    def refresh(cls, owner, month_key):
+        start, end = month_key_range(month_key)
+        yarn_qty, yarn_value = cls._inward_totals(YarnPOInwardItem, owner, start, end, "po_item__rate")
+        greige_qty, greige_value = cls._inward_totals(GreigePOInwardItem, owner, start, end, "po_item__rate")
+        dyeing_qty, dyeing_value = cls._inward_totals(DyeingPOInwardItem, owner, start, end, "po_item__rate")
+        ready_qty, _ = cls._inward_totals(ReadyPOInwardItem, owner, start, end)
+        invoices = ProgramInvoice.objects.filter(
+            owner=owner,
+            invoice_date__gte=start,
+            invoice_date__lt=end,
+        ).aggregate(total=Sum("final_amount"), count=Count("id"))
+        expense_total = (
+            MaintenanceRecord.objects.filter(owner=owner, month_key=month_key)
+            .values_list("expense_total", flat=True)
+            .first()
+        )
+        fact, _ = cls.objects.update_or_create(
+            owner=owner,
+            month_key=month_key,
+            defaults={
+                "yarn_inward_qty": yarn_qty,
+                "yarn_inward_value": yarn_value,
+                "greige_inward_qty": greige_qty,
+                "greige_inward_value": greige_value,
+                "dyeing_inward_qty": dyeing_qty,
+                "dyeing_inward_value": dyeing_value,
+                "ready_inward_qty": ready_qty,
+                "expense_total": expense_total or Decimal("0"),
+                "invoice_total": invoices.get("total") or Decimal("0"),
+                "invoice_count": invoices.get("count") or 0,
+            },
+        )
+        return fact
+
+    @classmethod
+    def refresh_for_dates(cls, owner, *dates):
+        month_keys = {f"{value:%Y-%m}" for value in dates if value}
+        for month_key in sorted(month_keys):
+            cls.refresh(owner, month_key)
+
+    @classmethod
+    def for_month(cls, owner, month_key):
+        fact = cls.objects.filter(owner=owner, month_key=month_key).first()
+        return fact or cls.refresh(owner, month_key)
+
+    @classmethod
+    async def afor_month(cls, owner, month_key):
+        fact = await cls.objects.filter(owner=owner, month_key=month_key).afirst()
+        return fact or await sync_to_async(cls.refresh)(owner, month_key)
+
+    @staticmethod
+    def trend_month_keys(last_month_key, months=12):
+        year, month = (int(part) for part in last_month_key.split("-"))
+        month_keys = []
+        for _ in range(months):
+            month_keys.append(f"{year:04d}-{month:02d}")
+            month -= 1
+            if month == 0:
+                year, month = year - 1, 12
+        month_keys.reverse()
+        return month_keys
+
+    @classmethod
+    def trend(cls, owner, last_month_key, months=12):
+        month_keys = cls.trend_month_keys(last_month_key, months)
+        facts = {fact.month_key: fact for fact in cls.objects.filter(owner=owner, month_key__in=month_keys)}
+        return [facts.get(month_key) or cls.refresh(owner, month_key) for month_key in month_keys]
+
+    @classmethod
+    async def atrend(cls, owner, last_month_key, months=12):
+        month_keys = cls.trend_month_keys(last_month_key, months)
+        facts = {fact.month_key: fact async for fact in cls.objects.filter(owner=owner, month_key__in=month_keys)}
+        return [facts.get(month_key) or await sync_to_async(cls.refresh)(owner, month_key) for month_key in month_keys]
+
+    def __str__(self):
+        return f"{self.owner_id} - {self.month_key}"
+
+
+# ============================================================
+# REPORTS
+# ============================================================
+REPORT_STAGE_CHOICES = (
+    ("yarn", "Yarn"),
+    ("greige", "Greige"),
+    ("dyeing", "Dyeing"),
+    ("ready", "Ready"),
+)
+
+def _month_filter(path, month_key):
+    start, end = month_key_range(month_key)
+    return {f"{path}__gte": start, f"{path}__lt": end}
+
+
+class PurchaseReportFact(OwnedModel):
+    stage = models.CharField(max_length=10, choices=REPORT_STAGE_CHOICES)
+    month_key = models.CharField(max_length=7)
+    vendor = models.ForeignKey("Vendor", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    vendor_name = models.CharField(max_length=180, blank=True, default="")
+    material_name = models.CharField(max_length=150, blank=True, default="")
+    ordered_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ordered_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    inward_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    inward_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-month_key", "stage", "vendor_name", "material_name"]
+        indexes = [models.Index(fields=["owner", "month_key", "stage"])]
+
+    @classmethod
+    def stage_sources(cls):
+        return {
+            "yarn": (YarnPurchaseOrderItem, YarnPOInwardItem, "material__name", "final_amount", "po_item__rate"),
+            "greige": (GreigePurchaseOrderItem, GreigePOInwardItem, "fabric_name", "final_amount", "po_item__rate"),
+            "dyeing": (DyeingPurchaseOrderItem, DyeingPOInwardItem, "fabric_name", "line_final_amount", "po_item__rate"),
+            "ready": (ReadyPurchaseOrderItem, ReadyPOInwardItem, "fabric_name", None, None),
+        }
+
+    @classmethod
+    def build_rows(cls, owner, month_key):
+        value_field = models.DecimalField(max_digits=14, decimal_places=2)
+        buckets = {}
+
+        def bucket(stage, vendor_id, vendor_name, material_name):
+            key = (stage, vendor_id, material_name or "")
+            if key not in buckets:
+                buckets[key] = cls(
+                    owner=owner,
+                    stage=stage,
+                    month_key=month_key,
+                    vendor_id=vendor_id,
+                    vendor_name=vendor_name or "",
+                    material_name=material_name or "",
+                )
+            return buckets[key]
+
+        for stage, (item_model, inward_model, label_path, amount_path, rate_path) in cls.stage_sources().items():
+            ordered = (
+                item_model.objects.filter(po__owner=owner, **_month_filter("po__po_date", month_key))
+                .values("po__vendor_id", "po__vendor__name", label_path)
+                .annotate(
+                    qty=Sum("quantity"),
+                    value=Sum(amount_path) if amount_path else models.Value(Decimal("0"), output_field=value_field),
+                )
+            )
+            for row in ordered:
+                fact = bucket(stage, row["po__vendor_id"], row["po__vendor__name"], row[label_path])
+                fact.ordered_qty = row["qty"] or Decimal("0")
+                fact.ordered_value = row["value"] or Decimal("0")
+
+            inward_label = f"po_item__{label_path}"
+            inwards = (
+                inward_model.objects.filter(inward__owner=owner, **_month_filter("inward__inward_date", month_key))
+                .values("po_item__po__vendor_id", "po_item__po__vendor__name", inward_label)
+                .annotate(
+                    qty=Sum("quantity"),
+                    value=(
+                        Sum(F("quantity") * F(rate_path), output_field=value_field)
+                        if rate_path
+                        else models.Value(Decimal("0"), output_field=value_field)
+                    ),
+                )
+            )
+            for row in inwards:
+                fact = bucket(stage, row["po_item__po__vendor_id"], row["po_item__po__vendor__name"], row[inward_label])
+                fact.inward_qty = row["qty"] or Decimal("0")
+                fact.inward_value = Decimal(row["value"] or 0).quantize(Decimal("0.01"))
+
+        return list(buckets.values())
+
+    def __str__(self):
+        return f"{self.month_key} - {self.stage} - {self.vendor_name}"
+
+
+class StageYieldFact(OwnedModel):
+    month_key = models.CharField(max_length=7)
+    vendor = models.ForeignKey("Vendor", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    vendor_name = models.CharField(max_length=180, blank=True, default="")
+    greige_input_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expected_output_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    dyeing_received_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    dyeing_accepted_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    dyeing_rejected_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ready_inward_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-month_key", "vendor_name"]
+        indexes = [models.Index(fields=["owner", "month_key"])]
+
+    @classmethod
+    def build_rows(cls, owner, month_key):
+        buckets = {}
+
+        def bucket(vendor_id, vendor_name):
+            if vendor_id not in buckets:
+                buckets[vendor_id] = cls(owner=owner, month_key=month_key, vendor_id=vendor_id, vendor_name=vendor_name or "")
+            return buckets[vendor_id]
+
+        planned = (
+            DyeingPurchaseOrderItem.objects.filter(po__owner=owner, **_month_filter("po__po_date", month_key))
+            .values("po__vendor_id", "po__vendor__name")
+            .annotate(input_qty=Sum("quantity"), expected_qty=Sum("expected_output_qty"))
+        )
+        for row in planned:
+            fact = bucket(row["po__vendor_id"], row["po__vendor__name"])
+            fact.greige_input_qty = row["input_qty"] or Decimal("0")
+            fact.expected_output_qty = row["expected_qty"] or Decimal("0")
+
+        dyed = (
+            DyeingPOInwardItem.objects.filter(
+                inward__owner=owner,
+                **_month_filter("po_item__po__po_date", month_key),
+            )
+            .values("po_item__po__vendor_id", "po_item__po__vendor__name")
+            .annotate(
+                received=Sum("received_qty"),
+                accepted=Sum("accepted_qty"),
+                rejected=Sum("rejected_qty"),
+            )
+        )
+        for row in dyed:
+            fact = bucket(row["po_item__po__vendor_id"], row["po_item__po__vendor__name"])
+            fact.dyeing_received_qty = row["received"] or Decimal("0")
+            fact.dyeing_accepted_qty = row["accepted"] or Decimal("0")
+            fact.dyeing_rejected_qty = row["rejected"] or Decimal("0")
+
+        source_vendor = "po_item__source_dyeing_po_item__po__vendor"
+        ready = (
+            ReadyPOInwardItem.objects.filter(
+                inward__owner=owner,
+                **_month_filter("po_item__source_dyeing_po_item__po__po_date", month_key),
+            )
+            .values(f"{source_vendor}_id", f"{source_vendor}__name")
+            .annotate(qty=Sum("quantity"))
+        )
+        for row in ready:
+            fact = bucket(row[f"{source_vendor}_id"], row[f"{source_vendor}__name"])
+            fact.ready_inward_qty = row["qty"] or Decimal("0")
+
+        return list(buckets.values())
+
+    def __str__(self):
+        return f"{self.month_key} - {self.vendor_name}"
+
+
+class JobberOutputFact(OwnedModel):
+    month_key = models.CharField(max_length=7)
+    jobber = models.ForeignKey("Jobber", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    jobber_name = models.CharField(max_length=120, blank=True, default="")
+    jobber_type_name = models.CharField(max_length=80, blank=True, default="")
+    challan_count = models.PositiveIntegerField(default=0)
+    issued_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    inward_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-month_key", "jobber_name"]
+        indexes = [models.Index(fields=["owner", "month_key"])]
+
+    @classmethod
+    def build_rows(cls, owner, month_key):
+        rows = (
+            ProgramJobberChallan.objects.filter(owner=owner, **_month_filter("challan_date", month_key))
+            .values("jobber_id", "jobber__name", "jobber_type__name")
+            .annotate(count=Count("id"), issued=Sum("total_issued_qty"), inward=Sum("inward_qty"))
+        )
+        return [
+            cls(
+                owner=owner,
+                month_key=month_key,
+                jobber_id=row["jobber_id"],
+                jobber_name=row["jobber__name"] or "",
+                jobber_type_name=row["jobber_type__name"] or "",
+                challan_count=row["count"] or 0,
+                issued_qty=row["issued"] or Decimal("0"),
+                inward_qty=row["inward"] or Decimal("0"),
+            )
+            for row in rows
+        ]
+
+    def __str__(self):
+        return f"{self.month_key} - {self.jobber_name}"
+
+
+class ClientSalesFact(OwnedModel):
+    month_key = models.CharField(max_length=7)
+    client = models.ForeignKey("Client", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    client_name = models.CharField(max_length=180, blank=True, default="")
+    dispatch_count = models.PositiveIntegerField(default=0)
+    dispatch_qty = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_count = models.PositiveIntegerField(default=0)
+    invoice_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-month_key", "client_name"]
+        indexes = [models.Index(fields=["owner", "month_key"])]
+
+    @classmethod
+    def build_rows(cls, owner, month_key):
+        buckets = {}
+
+        def bucket(client_id, client_name):
+            if client_id not in buckets:
+                buckets[client_id] = cls(owner=owner, month_key=month_key, client_id=client_id, client_name=client_name or "")
+            return buckets[client_id]
+
+        dispatches = (
+            DispatchChallan.objects.filter(owner=owner, **_month_filter("challan_date", month_key))
+            .values("client_id", "client__name")
+            .annotate(count=Count("id"), qty=Sum("program__total_qty"))
+        )
+        for row in dispatches:
+            fact = bucket(row["client_id"], row["client__name"])
+            fact.dispatch_count = row["count"] or 0
+            fact.dispatch_qty = row["qty"] or Decimal("0")
+
+        invoices = (
+            ProgramInvoice.objects.filter(owner=owner, **_month_filter("invoice_date", month_key))
+            .values("client_id", "client__name")
+            .annotate(count=Count("id"), value=Sum("final_amount"))
+        )
+        for row in invoices:
+            fact = bucket(row["client_id"], row["client__name"])
+            fact.invoice_count = row["count"] or 0
+            fact.invoice_value = row["value"] or Decimal("0")
+
+        return list(buckets.values())
+
+    def __str__(self):
+        return f"{self.month_key} - {self.client_name}"
+
+
+REPORT_FACT_MODELS = (PurchaseReportFact, StageYieldFact, JobberOutputFact, ClientSalesFact)
+
+
+class ReportStaleMonth(OwnedModel):
+    # Months a document moved out of or was deleted from. updated_at only
+    # points the incremental refresh at a document's current month.
+    month_key = models.CharField(max_length=7)
+
+    class Meta:
+        ordering = ["month_key"]
+        unique_together = [("owner", "month_key")]
+
+    @classmethod
+    def mark(cls, owner_id, month_keys, using=None):
+        if owner_id is None or not month_keys:
+            return
+        cls.objects.using(using).bulk_create(
+            [cls(owner_id=owner_id, month_key=month_key) for month_key in sorted(month_keys)],
+            ignore_conflicts=True,
+        )
+
+    def __str__(self):
+        return f"{self.owner_id} - {self.month_key}"
+
+
+class ReportRefreshState(OwnedModel):
+    refreshed_through = models.DateTimeField(null=True, blank=True)
+    last_month_count = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def source_dates(cls):
+        return (
+            (YarnPurchaseOrder, "po_date"),
+            (YarnPOInward, "inward_date"),
+            (GreigePurchaseOrder, "po_date"),
+            (GreigePOInward, "inward_date"),
+            (DyeingPurchaseOrder, "po_date"),
+            (DyeingPOInward, "inward_date"),
+            (DyeingPOInward, "po__po_date"),
+            (ReadyPurchaseOrder, "po_date"),
+            (ReadyPOInward, "inward_date"),
+            (ReadyPOInward, "po__source_dyeing_po__po_date"),
+            (ProgramJobberChallan, "challan_date"),
+            (DispatchChallan, "challan_date"),
+            (ProgramInvoice, "invoice_date"),
+        )
+
+    @classmethod
+    def changed_month_keys(cls, owner, since=None):
+        month_keys = set(ReportStaleMonth.objects.filter(owner=owner).values_list("month_key", flat=True))
+        for model, date_path in cls.source_dates():
+            qs = model.objects.filter(owner=owner)
+            if since is not None:
+                qs = qs.filter(updated_at__gt=since)
+            month_keys.update(f"{value:%Y-%m}" for value in qs.dates(date_path, "month"))
+        return sorted(month_keys)
+
+    @classmethod
+    def rebuild_month(cls, owner, month_key):
+        for fact_model in REPORT_FACT_MODELS:
+            fact_model.objects.filter(owner=owner, month_key=month_key).delete()
+            fact_model.objects.bulk_create(fact_model.build_rows(owner, month_key), batch_size=500)
+        MonthlyCostFact.refresh(owner, month_key)
+
+    @classmethod
+    def run(cls, owner, full=False):
+        state, _ = cls.objects.get_or_create(owner=owner)
+        started_at = timezone.now()
+        since = None if full else state.refreshed_through
+
+        with transaction.atomic():
+            if full:
+                for fact_model in REPORT_FACT_MODELS:
+                    fact_model.objects.filter(owner=owner).delete()
+                # Months without source rows are rebuilt on first read by for_month().
+                MonthlyCostFact.objects.filter(owner=owner).delete()
+            month_keys = cls.changed_month_keys(owner, since)
+            for month_key in month_keys:
+                cls.rebuild_month(owner, month_key)
+            ReportStaleMonth.objects.filter(owner=owner, month_key__in=month_keys).delete()
+            state.refreshed_through = started_at
+            state.last_month_count = len(month_keys)
+            state.save(update_fields=["refreshed_through", "last_month_count", "updated_at"])
+        return month_keys
+
+    def __str__(self):
+        return f"{self.owner_id} - {self.refreshed_through}"
+
+
+class ApiToken(OwnedModel):
+    name = models.CharField(max_length=80)
+    key_prefix = models.CharField(max_length=8)
+    key_hash = models.CharField(max_length=64, unique=True)
+    is_active = models.BooleanField(default=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["name", "id"]
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, owner, name):
+        # Only the hash is stored; the key itself is shown once.
+        key = secrets.token_urlsafe(32)
+        token = cls.objects.create(owner=owner, name=name, key_prefix=key[:8], key_hash=cls.hash_key(key))
+        return token, key
+
+    @classmethod
+    def authenticate(cls, key):
+        if not key:
+            return None
+        token = cls.objects.select_related("owner").filter(key_hash=cls.hash_key(key), is_active=True).first()
+        if token is None or not token.owner.is_active:
+            return None
+        now = timezone.now()
+        if token.last_used_at is None or now - token.last_used_at > timedelta(minutes=5):
+            cls.objects.filter(pk=token.pk).update(last_used_at=now)
+            token.last_used_at = now
+        return token
+
+    def __str__(self):
+        return f"{self.name} ({self.key_prefix}…)"
+
+
+class ChangeEvent(models.Model):
+    # Append-only. seq is an AUTOINCREMENT key, so it only ever grows and is
+    # never reused; SQLite runs one writer at a time, so seq order is also
+    # commit order and readers cannot skip over a late commit.
+    OPERATION_CHOICES = [
+        ("insert", "Insert"),
+        ("update", "Update"),
+        ("delete", "Delete"),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="change_events",
+    )
+    model_label = models.CharField(max_length=80)
+    object_pk = models.BigIntegerField()
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["seq"]
+        indexes = [
+            models.Index(fields=["owner", "seq"]),
+            models.Index(fields=["owner", "model_label", "seq"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.operation} {self.model_label}:{self.object_pk}"
+
+
+class ChangeFeedCursor(OwnedModel):
+    name = models.CharField(max_length=80)
+    last_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = [("owner", "name")]
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_seq}"
+
+
+class BackgroundJob(models.Model):
+    # Rows of the accounts.jobs queue, drained by "manage.py run_jobs".
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="background_jobs",
+    )
+    task = models.CharField(max_length=80)
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    # Higher runs first; within a priority, the earliest run_at wins.
+    priority = models.SmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    # While a job with this key is still queued, enqueueing the same key
+    # returns that job instead of adding another.
+    dedupe_key = models.CharField(max_length=200, blank=True, default="")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    last_error = models.TextField(blank=True, default="")
+    worker = models.CharField(max_length=120, blank=True, default="")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+            models.Index(fields=["owner", "task", "status"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status="queued") & ~models.Q(dedupe_key=""),
+                name="backgroundjob_queued_dedupe_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ("done", "failed")
+
+
 def next_quality_check_number():
+    return next_quality_check_numbers(1)[0]
+
+
+def next_quality_check_numbers(count):
     last = QualityCheck.objects.order_by("-id").first()
-    return f"QC-{((last.id + 1) if last else 1):05d}"
+    start = (last.id + 1) if last else 1
+    return [f"QC-{number:05d}" for number in range(start, start + count)]
 
 
 def next_inventory_movement_number():
+    return next_inventory_movement_numbers(1)[0]
+
+
+def next_inventory_movement_numbers(count):
     last = InventoryMovement.objects.order_by("-id").first()
-    return f"MOV-{((last.id + 1) if last else 1):05d}"
+    start = (last.id + 1) if last else 1
+    return [f"MOV-{number:05d}" for number in range(start, start + count)]
 
 
 def next_qr_code_number():
+    return next_qr_code_numbers(1)[0]
+
+
+def next_qr_code_numbers(count):
     last = QRCodeRecord.objects.order_by("-id").first()
-    return f"QR-{((last.id + 1) if last else 1):05d}"
\ No newline at end of file
+    start = (last.id + 1) if last else 1
+    return [f"QR-{number:05d}" for number in range(start, start + count)]
\ No newline at end of file
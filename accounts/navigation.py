@@ -25,7 +25,7 @@ APP_SIDEBAR_GROUPS = [
     {
         "label": "Reports",
         "items": [
-            {"label": "Reports", "url_name": None, "icon": "report", "is_placeholder": True},
+            {"label": "Reports", "url_name": "accounts:report_home", "icon": "report"},
             {"label": "Settings", "url_name": None, "icon": "settings", "trigger": "settings"},
         ],
     },
@@ -0,0 +1,64 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import router
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import ReportRefreshState, ReportStaleMonth
+
+
+# Incremental report refreshes find their months through updated_at, which
+# only shows where a document is now. These hooks record the months a
+# document leaves, by a date edit or a delete, as ReportStaleMonth rows for
+# the next refresh. Own date fields are remembered when the row is loaded;
+# dates on parent documents are looked up on delete only.
+_date_paths = {}
+
+
+def _own_month_keys(instance, paths):
+    # __dict__, not getattr: a deferred date field must not cost a query.
+    values = (instance.__dict__.get(path) for path in paths if "__" not in path)
+    return {f"{value:%Y-%m}" for value in values if value}
+
+
+def _path_value(instance, path):
+    value = instance
+    for name in path.split("__"):
+        try:
+            value = getattr(value, name)
+        except ObjectDoesNotExist:
+            return None
+        if value is None:
+            return None
+    return value
+
+
+def _mark(instance, month_keys):
+    alias = instance._state.db or router.db_for_write(ReportStaleMonth, instance=instance)
+    ReportStaleMonth.mark(instance.owner_id, month_keys, using=alias)
+
+
+def _remember(sender, instance, **kwargs):
+    instance._report_month_keys = _own_month_keys(instance, _date_paths[sender])
+
+
+def _on_save(sender, instance, created, raw=False, **kwargs):
+    month_keys = _own_month_keys(instance, _date_paths[sender])
+    if not raw and not created:
+        _mark(instance, instance.__dict__.get("_report_month_keys", set()) - month_keys)
+    instance._report_month_keys = month_keys
+
+
+def _on_delete(sender, instance, **kwargs):
+    values = (_path_value(instance, path) for path in _date_paths[sender])
+    _mark(instance, {f"{value:%Y-%m}" for value in values if value})
+
+
+def connect_report_signals():
+    paths = {}
+    for model, date_path in ReportRefreshState.source_dates():
+        paths.setdefault(model, []).append(date_path)
+    _date_paths.update(paths)
+    for model in paths:
+        uid = f"report_months:{model._meta.label_lower}"
+        post_init.connect(_remember, sender=model, dispatch_uid=uid)
+        post_save.connect(_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=uid)
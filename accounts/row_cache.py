@@ -0,0 +1,127 @@
+import hashlib
+from types import SimpleNamespace
+
+from django.core.cache import caches
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .master_cache import master_version
+
+
+# Pre-rendered list cards (one per PO / program) in the local "rows" cache.
+# A card is keyed by a stamp of everything it shows: the document's own
+# updated_at, the updated_at of the parents it prints, count/latest
+# updated_at of its child rows, the owner's master-list version (vendor and
+# firm names) and the viewer variant. Any edit moves the stamp, so nothing is
+# ever deleted explicitly; stale cards just age out of the cache.
+#
+# Saves that pass update_fields must include "updated_at", otherwise the
+# stamp does not move.
+ROW_CACHE_ALIAS = "rows"
+
+# Cards are rendered once for every viewer; the per-request CSRF token is
+# swapped in afterwards.
+_CSRF_PLACEHOLDER = "__row_cache_csrf_token__"
+
+
+def _cache():
+    return caches[ROW_CACHE_ALIAS]
+
+
+def _child_subqueries(model, path, field):
+    # "inwards__items" on YarnPurchaseOrder -> YarnPOInwardItem rows with
+    # inward__po = outer pk; a leading forward step ("bom__images") moves
+    # the outer reference to that foreign key.
+    outer, lookups, current = [], [], model
+    for part in path.split("__"):
+        relation = current._meta.get_field(part)
+        if relation.many_to_one and not lookups:
+            outer.append(part)
+        elif relation.one_to_many:
+            lookups.insert(0, relation.field.name)
+        else:
+            raise ValueError(f"Unsupported row stamp path {path!r} on {model.__name__}.")
+        current = relation.related_model
+
+    lookup = "__".join(lookups)
+    rows = (
+        current._base_manager
+        .filter(**{lookup: OuterRef("__".join(outer) or "pk")})
+        .order_by()
+        .values(lookup)
+    )
+    subqueries = [Subquery(rows.annotate(n=Count("pk")).values("n"))]
+    if field:
+        subqueries.append(Subquery(rows.annotate(latest=Max(field)).values("latest")))
+    return subqueries
+
+
+def stamp_annotations(model, children):
+    # {"items": None, "inwards": "updated_at"} -> subquery annotations giving
+    # the count (and latest value of the named field) of each child relation.
+    annotations = {}
+    for index, (path, field) in enumerate((children or {}).items()):
+        for offset, subquery in enumerate(_child_subqueries(model, path, field)):
+            annotations[f"_row_stamp_{index}_{offset}"] = subquery
+    return annotations
+
+
+def _stamp_key(name, pk, variant, stamp):
+    digest = hashlib.md5(repr(stamp).encode(), usedforsecurity=False).hexdigest()
+    return f"rows:{name}:{pk}:{variant}:{digest}"
+
+
+def cached_rows(
+    request,
+    queryset,
+    template_name,
+    *,
+    name,
+    load,
+    context_name,
+    fields=("updated_at",),
+    children=None,
+    variant="",
+    context=None,
+    attrs=(),
+):
+    # Returns one object per row of queryset, in order, each with .pk, .html
+    # and the requested plain attrs. Only rows whose stamp is not cached are
+    # loaded (load(pks) -> instances) and rendered.
+    annotations = stamp_annotations(queryset.model, children)
+    columns = ["pk", "owner_id", *attrs, *fields]
+    stamp_rows = list(
+        queryset.prefetch_related(None).annotate(**annotations).values_list(*columns, *annotations)
+    )
+
+    versions = {}
+    keys = []
+    for row in stamp_rows:
+        owner_id = row[1]
+        if owner_id not in versions:
+            versions[owner_id] = master_version(owner_id)
+        keys.append(_stamp_key(name, row[0], variant, (versions[owner_id], row[2 + len(attrs):])))
+
+    cache = _cache()
+    rendered = cache.get_many(keys)
+    missing = {row[0]: key for row, key in zip(stamp_rows, keys) if key not in rendered}
+    if missing:
+        fresh = {}
+        base_context = {**(context or {}), "csrf_token": _CSRF_PLACEHOLDER}
+        for obj in load(list(missing)):
+            html = render_to_string(template_name, {**base_context, context_name: obj})
+            fresh[missing[obj.pk]] = html
+        cache.set_many(fresh)
+        rendered.update(fresh)
+
+    token = get_token(request)
+    return [
+        SimpleNamespace(
+            pk=row[0],
+            html=mark_safe(rendered.get(key, "").replace(_CSRF_PLACEHOLDER, token)),
+            **dict(zip(attrs, row[2:2 + len(attrs)])),
+        )
+        for row, key in zip(stamp_rows, keys)
+    ]
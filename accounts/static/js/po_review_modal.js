@@ -0,0 +1,120 @@
+(function () {
+  // Review modal shared by the PO list pages. Each page marks its modal with
+  // data-review-modal, the attribute its "Review" links carry
+  // (data-review-trigger) and the class of its loading placeholder.
+  function init(modal) {
+    const mount = modal.querySelector("[data-review-mount]");
+    if (!mount) return;
+
+    const triggerSelector = "[" + modal.dataset.reviewTrigger + "]";
+    const loadingClass = modal.dataset.reviewLoadingClass;
+
+    function setMessage(message) {
+      mount.innerHTML = '<div class="' + loadingClass + '">' + message + '</div>';
+    }
+
+    function setLoading(message) {
+      setMessage(message || "Loading review panel...");
+    }
+
+    function openModal() {
+      modal.classList.add("show");
+      modal.setAttribute("aria-hidden", "false");
+      document.body.classList.add("modal-open");
+    }
+
+    function closeModal() {
+      modal.classList.remove("show");
+      modal.setAttribute("aria-hidden", "true");
+      document.body.classList.remove("modal-open");
+      setLoading("Loading review panel...");
+    }
+
+    async function loadReviewPanel(url) {
+      try {
+        setLoading("Loading review panel...");
+        openModal();
+
+        const response = await fetch(url, {
+          headers: { "X-Requested-With": "XMLHttpRequest" }
+        });
+
+        const html = await response.text();
+        mount.innerHTML = html;
+      } catch (error) {
+        setMessage("Unable to load review panel.");
+      }
+    }
+
+    document.addEventListener("click", function (e) {
+      const reviewTrigger = e.target.closest(triggerSelector);
+      if (reviewTrigger) {
+        e.preventDefault();
+        e.stopPropagation();
+        loadReviewPanel(reviewTrigger.getAttribute("data-review-url"));
+        return false;
+      }
+
+      const closeTrigger = e.target.closest("[data-review-close]");
+      if (closeTrigger && modal.contains(closeTrigger)) {
+        e.preventDefault();
+        e.stopPropagation();
+        closeModal();
+        return false;
+      }
+    });
+
+    modal.addEventListener("click", function (e) {
+      if (e.target === modal) {
+        closeModal();
+      }
+    });
+
+    document.addEventListener("keydown", function (e) {
+      if (e.key === "Escape" && modal.classList.contains("show")) {
+        closeModal();
+      }
+    });
+
+    document.addEventListener("submit", async function (e) {
+      const form = e.target.closest("[data-yarn-review-form]");
+      if (!form || !modal.contains(form)) return;
+
+      e.preventDefault();
+
+      const formData = new FormData(form);
+      const submitter = e.submitter;
+
+      if (submitter && submitter.name) {
+        formData.set(submitter.name, submitter.value);
+      }
+
+      try {
+        const response = await fetch(form.action, {
+          method: "POST",
+          body: formData,
+          headers: { "X-Requested-With": "XMLHttpRequest" }
+        });
+
+        const contentType = response.headers.get("content-type") || "";
+
+        if (contentType.includes("application/json")) {
+          const data = await response.json();
+
+          if (data.ok) {
+            closeModal();
+            window.location.reload();
+            return;
+          }
+        }
+
+        const html = await response.text();
+        mount.innerHTML = html;
+      } catch (error) {
+        setMessage("Unable to submit review.");
+      }
+    });
+  }
+
+  document.querySelectorAll("[data-review-modal]").forEach(init);
+})();
@@ -0,0 +1,100 @@
+(() => {
+  // Selects rendered by TypeaheadSelect only carry their current option.
+  // A search box is added in front of each one and options are fetched
+  // page by page from the master lookup endpoint as the user types.
+  const DELAY = 250;
+
+  function lookupUrl(select, q, page) {
+    const url = new URL(select.dataset.typeaheadUrl, window.location.origin);
+    if (q) url.searchParams.set("q", q);
+    url.searchParams.set("page", page);
+    return url.toString();
+  }
+
+  function fillOptions(select, results, append) {
+    const labelKey = select.dataset.typeaheadLabel || "text";
+    const current = select.value;
+    if (!append) {
+      Array.from(select.options).forEach((option) => {
+        if (option.value && option.value !== current) option.remove();
+      });
+    }
+    const existing = new Set(Array.from(select.options).map((option) => option.value));
+    results.forEach((row) => {
+      const value = String(row.id);
+      if (existing.has(value)) return;
+      const option = new Option(row[labelKey] || row.text, value);
+      Object.keys(row).forEach((key) => {
+        if (key !== "id" && key !== "text" && row[key] !== null && typeof row[key] !== "object") {
+          option.dataset[key] = row[key];
+        }
+      });
+      select.add(option);
+    });
+  }
+
+  function load(select, q, page) {
+    const state = select._typeahead;
+    const token = ++state.token;
+    return fetch(lookupUrl(select, q, page), { credentials: "same-origin", headers: { "X-Requested-With": "XMLHttpRequest" } })
+      .then((response) => (response.ok ? response.json() : null))
+      .then((data) => {
+        if (!data || token !== state.token) return;
+        fillOptions(select, data.results || [], page > 1);
+        state.page = data.page;
+        state.hasMore = !!data.has_more;
+        state.query = q;
+        state.more.hidden = !state.hasMore;
+      });
+  }
+
+  function enhance(select) {
+    if (select._typeahead || !select.dataset.typeaheadUrl) return;
+    if (select.closest("template")) return;
+
+    const search = document.createElement("input");
+    search.type = "search";
+    search.className = "typeahead-search";
+    search.placeholder = "Search…";
+    search.autocomplete = "off";
+
+    const more = document.createElement("button");
+    more.type = "button";
+    more.className = "typeahead-more";
+    more.textContent = "More";
+    more.hidden = true;
+
+    select.parentNode.insertBefore(search, select);
+    select.parentNode.insertBefore(more, select.nextSibling);
+    select._typeahead = { token: 0, page: 0, hasMore: false, query: "", loaded: false, more: more };
+
+    let timer = null;
+    search.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => load(select, search.value.trim(), 1), DELAY);
+    });
+    more.addEventListener("click", () => {
+      const state = select._typeahead;
+      if (state.hasMore) load(select, state.query, state.page + 1);
+    });
+    const firstLoad = () => {
+      if (select._typeahead.loaded) return;
+      select._typeahead.loaded = true;
+      load(select, "", 1);
+    };
+    select.addEventListener("focus", firstLoad);
+    search.addEventListener("focus", firstLoad);
+  }
+
+  function scan(scope) {
+    if (scope.matches && scope.matches("select[data-typeahead-url]")) enhance(scope);
+    if (scope.querySelectorAll) scope.querySelectorAll("select[data-typeahead-url]").forEach(enhance);
+  }
+
+  document.addEventListener("DOMContentLoaded", () => {
+    scan(document);
+    new MutationObserver((mutations) => {
+      mutations.forEach((mutation) => mutation.addedNodes.forEach(scan));
+    }).observe(document.body, { childList: true, subtree: true });
+  });
+})();
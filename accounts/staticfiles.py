@@ -0,0 +1,156 @@
+import gzip
+import mimetypes
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # optional; without it only .gz siblings are written
+    brotli = None
+
+
+# collectstatic writes content-hashed copies of every file (app.1a2b3c4d5e6f.css)
+# plus a .gz and, when brotli is installed, a .br next to each text asset.
+# StaticAssetMiddleware serves those straight from STATIC_ROOT: the smallest
+# encoding the browser accepts, and a one-year immutable lifetime for hashed
+# names since their content can never change under the same URL.
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map", ".xml", ".ico"}
+COMPRESS_MIN_BYTES = 256
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+UNHASHED_CACHE_CONTROL = "public, max-age=300"
+
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+_HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+
+
+def compress_bytes(data):
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data)
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Originals are kept for anything that still asks for them by name.
+        for name in {*paths, *self.hashed_files.values()}:
+            self._write_compressed(name)
+
+    def _write_compressed(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        path = self.path(name)
+        with open(path, "rb") as fh:
+            data = fh.read()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return
+        for suffix, compressed in compress_bytes(data).items():
+            if len(compressed) < len(data):
+                with open(path + suffix, "wb") as fh:
+                    fh.write(compressed)
+
+
+def _accepted_encodings(request):
+    header = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssetMiddleware:
+    # Sits ahead of the session/auth middleware so asset requests never touch
+    # the database. Only active once collectstatic has filled STATIC_ROOT and
+    # DEBUG is off; in development runserver keeps serving from the app dirs.
+    # Async capable, so under ASGI it does not force the rest of the chain
+    # (and the async payload views) onto a worker thread.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        prefix = settings.STATIC_URL or ""
+        if "://" in prefix:
+            prefix = ""
+        self.prefix = "/" + prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.root = str(settings.STATIC_ROOT) if settings.STATIC_ROOT else ""
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        name = self.asset_name(request)
+        if name is not None:
+            response = self.serve(request, name)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        name = self.asset_name(request)
+        if name is not None:
+            # Only the stat/open calls go to a thread.
+            response = await sync_to_async(self.serve, thread_sensitive=False)(request, name)
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    def asset_name(self, request):
+        if self.prefix and self.root and not settings.DEBUG and request.path_info.startswith(self.prefix):
+            return request.path_info[len(self.prefix):]
+        return None
+
+    def serve(self, request, name):
+        if request.method not in ("GET", "HEAD") or not name or name.endswith(("/", ".gz", ".br")):
+            return None
+        try:
+            path = safe_join(self.root, name)
+        except ValueError:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        served, encoding = path, None
+        accepted = _accepted_encodings(request)
+        for coding, suffix in _ENCODINGS:
+            if coding in accepted and os.path.isfile(path + suffix):
+                served, encoding = path + suffix, coding
+                break
+
+        stat = os.stat(served)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers = {
+            "Vary": "Accept-Encoding",
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if _HASHED_NAME.search(name) else UNHASHED_CACHE_CONTROL,
+            "ETag": etag,
+        }
+        if request.META.get("HTTP_IF_NONE_MATCH") == etag:
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(name)
+            response = FileResponse(
+                open(served, "rb"),
+                filename=os.path.basename(path),
+                content_type=content_type or "application/octet-stream",
+            )
+            response["Content-Length"] = stat.st_size
+            response["Last-Modified"] = http_date(stat.st_mtime)
+            if encoding:
+                response["Content-Encoding"] = encoding
+        for header, value in headers.items():
+            response[header] = value
+        return response
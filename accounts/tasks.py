@@ -0,0 +1,132 @@
+from django.contrib.auth.tokens import default_token_generator
+from django.core.files.base import ContentFile
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import Prefetch
+from django.template import loader
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .jobs import job_file_name, job_file_storage, job_task
+from .models import (
+    DispatchChallan,
+    GreigePurchaseOrder,
+    GreigePurchaseOrderItem,
+    YarnPurchaseOrder,
+    YarnPurchaseOrderItem,
+)
+from .views import (
+    _build_dispatch_challan_pdf_response,
+    _build_greige_po_pdf_response,
+    _build_qr_label_sheet_response,
+    _build_simple_yarn_po_pdf_response,
+    _build_yarn_po_pdf_response,
+    _qr_label_records,
+    _qr_label_target,
+    _sync_phase2_lots_from_dyeing,
+    sync_generated_po_items,
+)
+
+
+# Handlers for accounts.jobs, registered by task name. Each gets the
+# BackgroundJob row and returns a JSON-serialisable result.
+
+
+@job_task("sync_phase2_lots")
+def sync_phase2_lots(job):
+    return {"created": _sync_phase2_lots_from_dyeing(job.owner)}
+
+
+@job_task("sync_generated_po_items")
+def sync_generated_po_items_task(job):
+    return sync_generated_po_items(owner=job.owner)
+
+
+@job_task("password_reset_email")
+def password_reset_email(job):
+    # Same context PasswordResetForm.save() builds; the token is made here so
+    # the job row never holds a usable reset link.
+    payload = job.payload
+    user = job.owner
+    context = {
+        "email": payload["email"],
+        "domain": payload["domain"],
+        "site_name": payload["site_name"],
+        "uid": urlsafe_base64_encode(force_bytes(user.pk)),
+        "user": user,
+        "token": default_token_generator.make_token(user),
+        "protocol": payload["protocol"],
+    }
+    subject = "".join(loader.render_to_string(payload["subject_template_name"], context).splitlines())
+    body = loader.render_to_string(payload["email_template_name"], context)
+    message = EmailMultiAlternatives(subject, body, payload.get("from_email"), [payload["email"]])
+    if payload.get("html_email_template_name"):
+        message.attach_alternative(
+            loader.render_to_string(payload["html_email_template_name"], context), "text/html"
+        )
+    return {"sent": message.send()}
+
+
+def _yarn_po_pdf(pk):
+    po = (
+        YarnPurchaseOrder.objects
+        .select_related("vendor", "firm", "owner")
+        .prefetch_related(
+            Prefetch("items", queryset=YarnPurchaseOrderItem.objects.select_related("material", "material_type"))
+        )
+        .get(pk=pk)
+    )
+    try:
+        return _build_yarn_po_pdf_response(po)
+    except Exception:
+        return _build_simple_yarn_po_pdf_response(po)
+
+
+def _greige_po_pdf(pk):
+    po = (
+        GreigePurchaseOrder.objects
+        .select_related("vendor", "source_yarn_po", "source_yarn_po__firm", "owner", "reviewed_by")
+        .prefetch_related(
+            Prefetch(
+                "items",
+                queryset=GreigePurchaseOrderItem.objects.select_related("material", "source_yarn_po_item")
+            )
+        )
+        .get(pk=pk)
+    )
+    return _build_greige_po_pdf_response(po)
+
+
+def _dispatch_pdf(pk):
+    challan = DispatchChallan.objects.select_related(
+        "program", "program__bom", "program__firm", "client", "firm"
+    ).get(pk=pk)
+    return _build_dispatch_challan_pdf_response(challan)
+
+
+def _qr_labels_pdf(scope):
+    def build(pk, base_url):
+        target, title = _qr_label_target(scope, pk)
+        return _build_qr_label_sheet_response(_qr_label_records(scope, target), title, base_url)
+
+    return build
+
+
+PDF_DOCUMENTS = {
+    "yarn_po": _yarn_po_pdf,
+    "greige_po": _greige_po_pdf,
+    "dispatch_challan": _dispatch_pdf,
+    "qr_labels_lot": _qr_labels_pdf("lot"),
+    "qr_labels_inward": _qr_labels_pdf("inward"),
+}
+
+
+@job_task("document_pdf")
+def document_pdf(job):
+    # The enqueueing view has already checked access; the file is only
+    # served back to the job's owner through job_file.
+    payload = job.payload
+    response = PDF_DOCUMENTS[payload["document"]](payload["pk"], **payload.get("options", {}))
+    if response.status_code != 200:
+        raise RuntimeError(f"PDF build returned HTTP {response.status_code}.")
+    name = job_file_storage().save(job_file_name(job, payload["filename"]), ContentFile(response.content))
+    return {"file": name, "filename": payload["filename"], "size": len(response.content)}
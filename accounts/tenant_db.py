@@ -0,0 +1,247 @@
+import contextvars
+import copy
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+# Optional per-owner database routing (settings.TENANT_DB_ROUTING).
+#
+# Each owner's operational data lives in its own SQLite file. Auth, firms and
+# masters stay in the central database, which every tenant connection
+# ATTACHes: unqualified table names resolve to the tenant file first and fall
+# through to the central file, so joins such as po -> vendor keep working.
+# SQLite cannot enforce foreign keys into an attached database, so tenant
+# connections run with foreign key checks off.
+#
+# Requests are wrapped in one tenant transaction by TenantDatabaseMiddleware;
+# transaction.atomic() without using= still refers to the central database.
+TENANT_MODELS = frozenset({
+    "yarnpurchaseorder", "yarnpurchaseorderitem", "yarnpoinward", "yarnpoinwarditem",
+    "greigepurchaseorder", "greigepurchaseorderitem", "greigepoinward", "greigepoinwarditem",
+    "dyeingpurchaseorder", "dyeingpurchaseorderitem", "dyeingpoinward", "dyeingpoinwarditem",
+    "readypurchaseorder", "readypurchaseorderitem", "readypoinward", "readypoinwarditem",
+    "program", "programjobberdetail", "programsizedetail",
+    "programstart", "programstartfabric", "programstartsize", "programstartjobber",
+    "programjobberchallan", "programjobberchallansize", "programlotallocation",
+    "dispatchchallan", "programinvoice", "programinvoiceitem", "costingsnapshot",
+    "inventorylot", "inventoryroll", "inventorymovement", "inventorybalancecheckpoint",
+    "qrcoderecord", "qualitycheck", "qualitycheckparameter", "qualitycheckdefect",
+    "maintenancerecord", "monthlycostfact", "purchasereportfact", "stageyieldfact",
+    "jobberoutputfact", "clientsalesfact", "reportrefreshstate", "reportstalemonth",
+    "changeevent", "changefeedcursor",
+})
+
+TENANT_ALIAS_PREFIX = "tenant_"
+
+_current_owner = contextvars.ContextVar("tenant_owner_id", default=None)
+_ready = set()
+_lock = threading.Lock()
+
+
+def routing_enabled():
+    return getattr(settings, "TENANT_DB_ROUTING", False)
+
+
+def is_tenant_model(model):
+    return model._meta.app_label == "accounts" and model._meta.model_name in TENANT_MODELS
+
+
+def tenant_models():
+    from django.apps import apps
+
+    return [model for model in apps.get_app_config("accounts").get_models() if is_tenant_model(model)]
+
+
+def tenant_alias(owner_id):
+    return f"{TENANT_ALIAS_PREFIX}{owner_id}"
+
+
+def tenant_db_path(owner_id):
+    return Path(settings.TENANT_DB_DIR) / f"owner_{owner_id}.sqlite3"
+
+
+def current_tenant_alias():
+    owner_id = _current_owner.get()
+    return None if owner_id is None else tenant_alias(owner_id)
+
+
+def register_sqlite_database(alias, path, attach=None):
+    # Registers a SQLite alias at runtime, cloned from the central settings.
+    if alias in connections.settings:
+        return alias
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    config = copy.deepcopy(connections.settings[DEFAULT_DB_ALIAS])
+    config["NAME"] = str(path)
+    options = config.setdefault("OPTIONS", {})
+    options["transaction_mode"] = "IMMEDIATE"
+    init_commands = [options.get("init_command") or "", "PRAGMA foreign_keys = OFF"]
+    if attach:
+        init_commands.append(f"ATTACH DATABASE '{attach}' AS central")
+    options["init_command"] = "; ".join(command.strip("; ") for command in init_commands if command)
+
+    connections.settings[alias] = config
+    settings.DATABASES[alias] = config
+    return alias
+
+
+def create_missing_tables(alias, models):
+    # Tenant files only hold operational tables, created straight from the
+    # current models. The schema editor turns foreign key checks back on when
+    # it finishes, so the connection is closed to pick up init_command again.
+    connection = connections[alias]
+    existing = set(connection.introspection.table_names())
+    missing = [model for model in models if model._meta.db_table not in existing]
+    if missing:
+        with connection.schema_editor() as editor:
+            for model in missing:
+                editor.create_model(model)
+    connection.close()
+    return missing
+
+
+def ensure_tenant_database(owner_id):
+    alias = tenant_alias(owner_id)
+    if alias in _ready:
+        return alias
+    with _lock:
+        if alias not in _ready:
+            central = connections.settings[DEFAULT_DB_ALIAS]["NAME"]
+            register_sqlite_database(alias, tenant_db_path(owner_id), attach=central)
+            create_missing_tables(alias, tenant_models())
+            _ready.add(alias)
+    return alias
+
+
+def owner_lookup(model):
+    # Shortest path of required foreign keys from a tenant model to its owner,
+    # e.g. "owner" or "po__owner".
+    queue = [(model, "")]
+    seen = {model}
+    while queue:
+        current, prefix = queue.pop(0)
+        fields = current._meta.concrete_fields
+        if any(field.name == "owner" for field in fields):
+            return f"{prefix}owner"
+        for field in fields:
+            related = field.related_model
+            if field.many_to_one and not field.null and related not in seen and is_tenant_model(related):
+                seen.add(related)
+                queue.append((related, f"{prefix}{field.name}__"))
+    return None
+
+
+def copy_owner_rows(owner_id, purge=False, chunk_size=500):
+    # Copies every operational row of one owner into their tenant file with
+    # plain INSERT ... SELECT from the attached central database, so ids and
+    # timestamps are kept as they are. Re-running replaces the copied rows.
+    alias = ensure_tenant_database(owner_id)
+    copied = {}
+    plans = []
+    for model in tenant_models():
+        lookup = owner_lookup(model)
+        if lookup is None:
+            continue
+        ids = list(
+            model._base_manager.using(DEFAULT_DB_ALIAS)
+            .filter(**{lookup: owner_id})
+            .values_list("pk", flat=True)
+        )
+        plans.append((model, ids))
+        copied[model._meta.object_name] = len(ids)
+
+    tenant = connections[alias]
+    with transaction.atomic(using=alias), tenant.cursor() as cursor:
+        for model, ids in plans:
+            table = tenant.ops.quote_name(model._meta.db_table)
+            pk = tenant.ops.quote_name(model._meta.pk.column)
+            columns = ", ".join(tenant.ops.quote_name(field.column) for field in model._meta.local_concrete_fields)
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"INSERT OR REPLACE INTO main.{table} ({columns}) "
+                    f"SELECT {columns} FROM central.{table} WHERE {pk} IN ({placeholders})",
+                    chunk,
+                )
+
+    if purge:
+        central = connections[DEFAULT_DB_ALIAS]
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), central.cursor() as cursor:
+            for model, ids in reversed(plans):
+                table = central.ops.quote_name(model._meta.db_table)
+                pk = central.ops.quote_name(model._meta.pk.column)
+                for start in range(0, len(ids), chunk_size):
+                    chunk = ids[start:start + chunk_size]
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({placeholders})", chunk)
+
+    return copied
+
+
+@contextmanager
+def tenant_context(owner):
+    owner_id = getattr(owner, "pk", owner)
+    if not routing_enabled() or owner_id is None:
+        yield None
+        return
+
+    alias = ensure_tenant_database(owner_id)
+    token = _current_owner.set(owner_id)
+    try:
+        yield alias
+    finally:
+        _current_owner.reset(token)
+
+
+class TenantRouter:
+    def _db_for(self, model, **hints):
+        if not is_tenant_model(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and is_tenant_model(instance) and instance._state.db:
+            return instance._state.db
+        return current_tenant_alias() or DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Tenant schemas come from create_missing_tables(), not migrations.
+        return not db.startswith(TENANT_ALIAS_PREFIX)
+
+
+class TenantDatabaseMiddleware:
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = getattr(request, "user", None)
+        if not routing_enabled() or user is None or not user.is_authenticated:
+            return self.get_response(request)
+
+        with tenant_context(user.pk) as alias:
+            if request.method in self.SAFE_METHODS:
+                return self.get_response(request)
+
+            # Error responses roll the tenant writes back, the way the views'
+            # own atomic blocks did when everything lived in one database.
+            with transaction.atomic(using=alias):
+                response = self.get_response(request)
+                if response.status_code >= 400:
+                    transaction.set_rollback(True, using=alias)
+            return response
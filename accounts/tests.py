@@ -0,0 +1,551 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .change_feed import changed_pks, consume_changes, read_changes
+from .forms import YarnPurchaseOrderItemFormSet
+from .jobs import JOB_TASKS, claim_next, enqueue, job_task, run_job
+from .views import _sync_dyeing_po_items_from_source, _sync_phase2_lots_from_dyeing, sync_generated_po_items
+from .models import (
+    ApiToken,
+    BackgroundJob,
+    BOM,
+    ChangeEvent,
+    ChangeFeedCursor,
+    Client,
+    CostingSnapshot,
+    DispatchChallan,
+    DyeingPOInward,
+    DyeingPOInwardItem,
+    DyeingPurchaseOrder,
+    DyeingPurchaseOrderItem,
+    Firm,
+    GreigePOInward,
+    GreigePOInwardItem,
+    GreigePurchaseOrder,
+    GreigePurchaseOrderItem,
+    InventoryBalanceCheckpoint,
+    InventoryLot,
+    InventoryMovement,
+    Material,
+    MaterialType,
+    Program,
+    ProgramInvoice,
+    ProgramLotAllocation,
+    ProgramStart,
+    ProgramStartFabric,
+    Vendor,
+    YarnPurchaseOrder,
+    YarnPurchaseOrderItem,
+)
+
+
+class SharedChoiceInlineFormSetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="pw")
+        vendor = Vendor.objects.create(owner=self.user, name="Vendor")
+        self.yarn_type = MaterialType.objects.create(owner=self.user, name="Cotton", material_kind="yarn")
+        self.po = YarnPurchaseOrder.objects.create(
+            owner=self.user, system_number="YPO-1", po_date=timezone.localdate(), vendor=vendor
+        )
+        self.item = YarnPurchaseOrderItem.objects.create(
+            po=self.po, material_type=self.yarn_type, quantity=Decimal("10"), rate=Decimal("2")
+        )
+
+    def _data(self, **row):
+        data = {
+            "items-TOTAL_FORMS": "1",
+            "items-INITIAL_FORMS": "1",
+            "items-MIN_NUM_FORMS": "0",
+            "items-MAX_NUM_FORMS": "1000",
+            "items-0-id": str(self.item.pk),
+            "items-0-po": str(self.po.pk),
+            "items-0-material_type": str(self.yarn_type.pk),
+            "items-0-quantity": "12",
+            "items-0-rate": "2",
+            "items-0-value": "24",
+            "items-0-final_amount": "24",
+        }
+        data.update(row)
+        return data
+
+    def _formset(self, data):
+        return YarnPurchaseOrderItemFormSet(
+            data, instance=self.po, prefix="items", form_kwargs={"user": self.user}
+        )
+
+    def test_edit_existing_row_round_trip(self):
+        formset = self._formset(self._data())
+        self.assertTrue(formset.is_valid(), formset.errors)
+        self.assertEqual(formset.forms[0].cleaned_data["id"], self.item)
+        formset.save()
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, Decimal("12"))
+        self.assertEqual(self.po.items.count(), 1)
+
+    def test_unknown_row_pk_is_rejected(self):
+        formset = self._formset(self._data(**{"items-0-id": str(self.item.pk + 100)}))
+        self.assertFalse(formset.is_valid())
+        self.assertIn("id", formset.forms[0].errors)
+
+
+class ProgramLotAllocationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="pw")
+        self.firm = Firm.objects.create(owner=self.user, firm_name="Firm")
+        self.material = Material.objects.create(name="Red Jersey", material_kind="finished")
+        self.lots = [
+            InventoryLot.objects.create(owner=self.user, lot_code=code, material=self.material, accepted_qty=qty)
+            for code, qty in (("L1", Decimal("30")), ("L2", Decimal("50")))
+        ]
+
+    def _start(self, program_no, used_qty):
+        bom = BOM.objects.create(owner=self.user, bom_code=f"B-{program_no}", sku=f"SKU-{program_no}", product_name="Tee")
+        program = Program.objects.create(
+            owner=self.user, program_no=program_no, bom=bom, firm=self.firm, total_qty=Decimal("10")
+        )
+        start = ProgramStart.objects.create(owner=self.user, program=program)
+        ProgramStartFabric.objects.create(start_record=start, material=self.material, used_qty=used_qty)
+        return start
+
+    def _assert_lots_consistent(self):
+        for lot in InventoryLot.objects.all():
+            allocated = lot.program_allocations.aggregate(total=Sum("quantity"))["total"] or Decimal("0")
+            self.assertEqual(lot.used_qty, allocated)
+            self.assertLessEqual(lot.used_qty, lot.accepted_qty)
+            self.assertEqual(lot.available_qty, lot.accepted_qty - lot.used_qty)
+
+    def test_fifo_allocation_never_oversubscribes_a_lot(self):
+        self.assertEqual(ProgramLotAllocation.allocate(self._start("P1", Decimal("60"))), [])
+        shortfalls = ProgramLotAllocation.allocate(self._start("P2", Decimal("60")))
+
+        self.assertEqual([remaining for _, remaining in shortfalls], [Decimal("40")])
+        self.assertEqual(
+            list(ProgramLotAllocation.objects.values_list("lot__lot_code", "quantity")),
+            [("L1", Decimal("30")), ("L2", Decimal("30")), ("L2", Decimal("20"))],
+        )
+        self._assert_lots_consistent()
+
+    def test_resaving_a_start_releases_its_previous_allocation(self):
+        start = self._start("P1", Decimal("60"))
+        fabric = start.fabric_rows.get()
+        self.client.force_login(self.user)
+        url = reverse("accounts:program_start_save", args=[start.program.pk])
+
+        for used_qty in ("60", "20"):
+            response = self.client.post(url, {
+                "is_started": "on",
+                "remarks": "",
+                "fabrics-TOTAL_FORMS": "1",
+                "fabrics-INITIAL_FORMS": "1",
+                "fabrics-MIN_NUM_FORMS": "0",
+                "fabrics-MAX_NUM_FORMS": "1000",
+                "fabrics-0-id": str(fabric.pk),
+                "fabrics-0-material": str(self.material.pk),
+                "fabrics-0-used": "0",
+                "fabrics-0-avg": "0",
+                "fabrics-0-lot_count": "0",
+                "fabrics-0-available_qty": "0",
+                "fabrics-0-used_qty": used_qty,
+                "fabrics-0-sort_order": "0",
+                "sizes-TOTAL_FORMS": "0",
+                "sizes-INITIAL_FORMS": "0",
+                "jobbers-TOTAL_FORMS": "0",
+                "jobbers-INITIAL_FORMS": "0",
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()["ok"])
+
+        self.assertEqual(
+            list(ProgramLotAllocation.objects.values_list("lot__lot_code", "quantity")),
+            [("L1", Decimal("20"))],
+        )
+        self._assert_lots_consistent()
+        # Issues post negative quantities; the 60 issued first was returned in full.
+        net_movement = InventoryMovement.objects.filter(ref_model="ProgramStart").aggregate(total=Sum("quantity"))["total"]
+        self.assertEqual(net_movement, Decimal("-20"))
+
+
+class BatchInvoiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="pw")
+        firm = Firm.objects.create(owner=self.user, firm_name="Firm")
+        self.today = timezone.localdate()
+        self.programs = []
+        for program_no, qty in (("P1", Decimal("10")), ("P2", Decimal("5"))):
+            bom = BOM.objects.create(owner=self.user, bom_code=f"B-{program_no}", sku=f"SKU-{program_no}", product_name="Tee")
+            self.programs.append(Program.objects.create(
+                owner=self.user, program_no=program_no, bom=bom, firm=firm, total_qty=qty
+            ))
+        CostingSnapshot.objects.create(owner=self.user, program=self.programs[0], target_selling_price=Decimal("9"))
+        CostingSnapshot.objects.create(owner=self.user, program=self.programs[0], target_selling_price=Decimal("12.50"))
+        first, second = (Client.objects.create(owner=self.user, name=name) for name in ("Acme", "Zenith"))
+        for index in range(3):
+            DispatchChallan.objects.create(
+                owner=self.user, challan_no=f"DC{index}", program=self.programs[0], client=first, challan_date=self.today
+            )
+        DispatchChallan.objects.create(
+            owner=self.user, challan_no="DC9", program=self.programs[1], client=second, challan_date=self.today
+        )
+        self.client.force_login(self.user)
+
+    def _create(self):
+        return self.client.post(reverse("accounts:invoice_batch_add"), {
+            "month_key": f"{self.today:%Y-%m}",
+            "invoice_date": self.today.isoformat(),
+            "gst_percent": "5",
+            "action": "create",
+        })
+
+    def test_one_invoice_per_client_and_program_at_latest_price(self):
+        self.assertEqual(self._create().status_code, 302)
+
+        invoices = list(ProgramInvoice.objects.order_by("program__program_no"))
+        self.assertEqual([invoice.items.count() for invoice in invoices], [3, 1])
+        self.assertEqual(len({invoice.invoice_no for invoice in invoices}), 2)
+        first = invoices[0]
+        self.assertEqual(first.client.name, "Acme")
+        self.assertEqual(first.sub_total, Decimal("375.00"))
+        self.assertEqual(set(first.items.values_list("price", flat=True)), {Decimal("12.50")})
+        self.assertEqual(first.final_amount, Decimal("393.75"))
+
+    def test_invoiced_challans_are_not_billed_again(self):
+        self._create()
+        self._create()
+        self.assertEqual(ProgramInvoice.objects.count(), 2)
+        self.assertFalse(DispatchChallan.objects.filter(invoice_items__isnull=True).exists())
+
+
+class InventoryLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="pw")
+        self.today = timezone.localdate()
+        self.material = Material.objects.create(name="Red Jersey", material_kind="finished")
+        self.lot = InventoryLot.objects.create(
+            owner=self.user, lot_code="L1", material=self.material, accepted_qty=Decimal("100")
+        )
+        InventoryMovement.post(self.lot, "receipt", Decimal("100"), movement_date=self.today - timedelta(days=10))
+        InventoryMovement.post(self.lot, "issue", Decimal("30"), movement_date=self.today - timedelta(days=5))
+        InventoryMovement.post(self.lot, "issue", Decimal("20"), movement_date=self.today)
+
+    def _ledger_total(self, lot):
+        return lot.movements.aggregate(total=Sum("quantity"))["total"] or Decimal("0")
+
+    def test_checkpoint_gives_the_same_balance_as_a_full_replay(self):
+        as_of = self.today - timedelta(days=3)
+        replayed, checkpoint_date, replayed_count = InventoryBalanceCheckpoint.balances_as_of(self.user, as_of)
+        self.assertEqual(replayed, {self.lot.pk: Decimal("70")})
+        self.assertIsNone(checkpoint_date)
+
+        InventoryBalanceCheckpoint.write(self.user, self.today - timedelta(days=5))
+        balances, checkpoint_date, tail_count = InventoryBalanceCheckpoint.balances_as_of(self.user, as_of)
+        self.assertEqual(balances, replayed)
+        self.assertEqual(checkpoint_date, self.today - timedelta(days=5))
+        self.assertLess(tail_count, replayed_count)
+
+    def test_backdated_movement_drops_later_checkpoints(self):
+        InventoryBalanceCheckpoint.write(self.user, self.today)
+        InventoryMovement.post(self.lot, "adjustment", Decimal("-5"), movement_date=self.today - timedelta(days=2))
+
+        self.assertFalse(InventoryBalanceCheckpoint.objects.filter(as_of_date__gte=self.today - timedelta(days=2)).exists())
+        balances, _, _ = InventoryBalanceCheckpoint.balances_as_of(self.user, self.today)
+        self.assertEqual(balances, {self.lot.pk: Decimal("45")})
+
+    def test_manual_movements_keep_the_lot_and_ledger_in_step(self):
+        self.lot.used_qty = Decimal("50")
+        self.lot.save()
+        self.client.force_login(self.user)
+        url = reverse("accounts:inventory_lot_movement_add", args=[self.lot.pk])
+        for movement_type, quantity in (("issue", "10"), ("adjustment", "-15"), ("return", "4"), ("adjustment", "-100")):
+            self.client.post(url, {"movement_type": movement_type, "quantity": quantity, "movement_date": self.today.isoformat()})
+
+        self.lot.refresh_from_db()
+        self.assertEqual(self.lot.available_qty, Decimal("29"))
+        self.assertEqual(self._ledger_total(self.lot), self.lot.accepted_qty - self.lot.used_qty)
+
+    def test_dyeing_sync_keeps_manual_adjustments(self):
+        vendor = Vendor.objects.create(owner=self.user, name="Vendor")
+        yarn_po = YarnPurchaseOrder.objects.create(owner=self.user, system_number="YPO-1", po_date=self.today, vendor=vendor)
+        greige_po = GreigePurchaseOrder.objects.create(
+            owner=self.user, system_number="GPO-1", po_date=self.today, vendor=vendor, source_yarn_po=yarn_po
+        )
+        dyeing_po = DyeingPurchaseOrder.objects.create(
+            owner=self.user, system_number="DPO-1", po_date=self.today, vendor=vendor, source_greige_po=greige_po
+        )
+        po_item = DyeingPurchaseOrderItem.objects.create(
+            po=dyeing_po, finished_material=self.material, fabric_name=self.material.name, quantity=Decimal("40")
+        )
+        inward = DyeingPOInward.objects.create(owner=self.user, po=dyeing_po, inward_number="DI-1", inward_date=self.today)
+        inward_item = DyeingPOInwardItem.objects.create(
+            inward=inward, po_item=po_item, dye_lot_no="DL-1", quantity=Decimal("35"), accepted_qty=Decimal("34")
+        )
+
+        _sync_phase2_lots_from_dyeing(self.user)
+        lot = InventoryLot.objects.get(lot_code="DL-1")
+        InventoryMovement.post(lot, "adjustment", Decimal("-4"))
+        lot.accepted_qty -= Decimal("4")
+        lot.save()
+        inward_item.accepted_qty = Decimal("36")
+        inward_item.save()
+        _sync_phase2_lots_from_dyeing(self.user)
+        _sync_phase2_lots_from_dyeing(self.user)
+
+        lot.refresh_from_db()
+        self.assertEqual(lot.accepted_qty, Decimal("32"))
+        self.assertEqual(self._ledger_total(lot), lot.accepted_qty - lot.used_qty)
+
+    def test_stock_as_of_rejects_non_numeric_ids(self):
+        self.client.force_login(self.user)
+        url = reverse("accounts:inventory_stock_as_of")
+        self.assertEqual(self.client.get(url, {"lot": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"material": "abc"}).status_code, 400)
+        response = self.client.get(url, {"lot": str(self.lot.pk)})
+        self.assertEqual(response.json()["total_qty"], "50.00")
+
+
+class GeneratedPOSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="pw")
+        self.today = timezone.localdate()
+        vendor = Vendor.objects.create(owner=self.user, name="Vendor")
+        yarn_po = YarnPurchaseOrder.objects.create(owner=self.user, system_number="YPO-1", po_date=self.today, vendor=vendor)
+        self.greige_po = GreigePurchaseOrder.objects.create(
+            owner=self.user, system_number="GPO-1", po_date=self.today, vendor=vendor, source_yarn_po=yarn_po
+        )
+        self.greige_items = [
+            GreigePurchaseOrderItem.objects.create(po=self.greige_po, fabric_name=name, quantity=Decimal("50"))
+            for name in ("Jersey", "Rib")
+        ]
+        self.inwards = []
+        for number, quantities in (("GI-1", ("30", "20")), ("GI-2", ("5", "0"))):
+            inward = GreigePOInward.objects.create(
+                owner=self.user, po=self.greige_po, inward_number=number, inward_date=self.today
+            )
+            for item, quantity in zip(self.greige_items, quantities):
+                GreigePOInwardItem.objects.create(inward=inward, po_item=item, quantity=Decimal(quantity))
+            self.inwards.append(inward)
+        self.dyeing_po = DyeingPurchaseOrder.objects.create(
+            owner=self.user, system_number="DPO-1", po_date=self.today, vendor=vendor, source_greige_po=self.greige_po
+        )
+        _sync_dyeing_po_items_from_source(self.dyeing_po)
+
+    def _lines(self):
+        return list(self.dyeing_po.items.order_by("source_greige_po_item_id").values_list("fabric_name", "quantity"))
+
+    def test_resync_updates_lines_in_place_and_keeps_edits(self):
+        line = self.dyeing_po.items.get(source_greige_po_item=self.greige_items[0])
+        line.fabric_name = "Navy Jersey"
+        line.save()
+
+        self.inwards[1].items.filter(po_item=self.greige_items[0]).update(quantity=Decimal("10"))
+        _sync_dyeing_po_items_from_source(self.dyeing_po)
+
+        self.assertEqual(self._lines(), [("Navy Jersey", Decimal("40")), ("Rib", Decimal("20"))])
+        self.assertTrue(self.dyeing_po.items.filter(pk=line.pk).exists())
+
+    def test_unchanged_pos_are_not_resynced(self):
+        self.assertEqual(sync_generated_po_items(owner=self.user)["DyeingPurchaseOrder"], 0)
+
+    def test_deleted_source_inward_is_picked_up(self):
+        self.inwards[0].delete()
+
+        self.assertEqual(sync_generated_po_items(owner=self.user)["DyeingPurchaseOrder"], 1)
+        self.assertEqual(self._lines(), [("Jersey", Decimal("5"))])
+        self.dyeing_po.refresh_from_db()
+        self.assertEqual(self.dyeing_po.total_weight, Decimal("5"))
+        self.assertEqual(sync_generated_po_items(owner=self.user)["DyeingPurchaseOrder"], 0)
+
+
+class ApiCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="pw")
+        vendor = Vendor.objects.create(owner=self.user, name="Vendor")
+        self.pos = [
+            YarnPurchaseOrder.objects.create(
+                owner=self.user, system_number=f"YPO-{index}", po_date=timezone.localdate(), vendor=vendor
+            )
+            for index in range(5)
+        ]
+        # Same timestamp for all rows: the pk has to break the tie.
+        YarnPurchaseOrder.objects.update(updated_at=timezone.now())
+        other = User.objects.create_user("other", password="pw")
+        YarnPurchaseOrder.objects.create(
+            owner=other, system_number="YPO-X", po_date=timezone.localdate(),
+            vendor=Vendor.objects.create(owner=other, name="Other"),
+        )
+        _, key = ApiToken.issue(self.user, "sheet")
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {key}"}
+        self.url = reverse("accounts:api_list", args=["yarn-pos"])
+
+    def _page(self, cursor=None):
+        params = {"limit": "2", "fields": "system_number"}
+        if cursor:
+            params["cursor"] = cursor
+        response = self.client.get(self.url, params, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_cover_every_row_once(self):
+        seen = []
+        cursor = None
+        while True:
+            page = self._page(cursor)
+            seen.extend(row["id"] for row in page["results"])
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+        self.assertEqual(seen, [po.pk for po in self.pos])
+
+    def test_row_updated_while_paging_comes_round_again(self):
+        first = self._page()
+        YarnPurchaseOrder.objects.filter(pk=first["results"][0]["id"]).update(updated_at=timezone.now() + timedelta(seconds=1))
+        rest = []
+        cursor = first["next_cursor"]
+        while cursor:
+            page = self._page(cursor)
+            rest.extend(row["id"] for row in page["results"])
+            cursor = page["next_cursor"] if page["has_more"] else None
+        self.assertEqual(rest, [po.pk for po in self.pos[2:]] + [self.pos[0].pk])
+
+    def test_bad_cursor_and_missing_token_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {"cursor": "not-a-cursor"}, **self.auth).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="pw")
+        vendor = Vendor.objects.create(owner=self.user, name="Vendor")
+        self.po = YarnPurchaseOrder.objects.create(
+            owner=self.user, system_number="YPO-1", po_date=timezone.localdate(), vendor=vendor
+        )
+        self.item = YarnPurchaseOrderItem.objects.create(po=self.po, quantity=Decimal("5"))
+
+    def _events(self):
+        return [(event.model_label, event.object_pk, event.operation) for event in read_changes(self.user)]
+
+    def test_writes_are_recorded_for_the_owner_in_commit_order(self):
+        item_pk = self.item.pk
+        self.item.delete()
+        try:
+            with transaction.atomic():
+                self.po.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(self._events(), [
+            ("accounts.yarnpurchaseorder", self.po.pk, "insert"),
+            ("accounts.yarnpurchaseorderitem", item_pk, "insert"),
+            ("accounts.yarnpurchaseorderitem", item_pk, "delete"),
+        ])
+        self.assertFalse(ChangeEvent.objects.exclude(owner=self.user).exists())
+
+    def test_consumer_resumes_from_its_cursor(self):
+        seen = []
+        self.assertEqual(consume_changes(self.user, "sheet", seen.extend, batch_size=1), 2)
+        self.assertEqual(consume_changes(self.user, "sheet", seen.extend), 0)
+
+        self.item.quantity = Decimal("6")
+        self.item.save()
+
+        def fail(events):
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            consume_changes(self.user, "sheet", fail)
+        self.assertEqual(consume_changes(self.user, "sheet", seen.extend), 1)
+        self.assertEqual(ChangeFeedCursor.objects.get(owner=self.user, name="sheet").last_seq, seen[-1].seq)
+        self.assertEqual(changed_pks(seen, YarnPurchaseOrderItem), ({self.item.pk}, set()))
+
+
+@override_settings(BACKGROUND_JOBS_EAGER=False)
+class BackgroundJobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="pw")
+        self.calls = []
+
+        @job_task("test_record")
+        def record(job):
+            self.calls.append(job.payload)
+            return {"seen": len(self.calls)}
+
+        @job_task("test_fail")
+        def fail(job):
+            raise RuntimeError("boom")
+
+        self.addCleanup(JOB_TASKS.pop, "test_record")
+        self.addCleanup(JOB_TASKS.pop, "test_fail")
+
+    def test_queued_job_with_same_key_is_reused(self):
+        first = enqueue("test_record", owner=self.user, dedupe_key="k")
+        second = enqueue("test_record", owner=self.user, priority=5, dedupe_key="k")
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(BackgroundJob.objects.get(pk=first.pk).priority, 5)
+        run_job(claim_next("w1"))
+        self.assertNotEqual(enqueue("test_record", owner=self.user, dedupe_key="k").pk, first.pk)
+
+    def test_a_job_is_claimed_once_in_priority_order(self):
+        low = enqueue("test_record", owner=self.user, payload={"n": 1})
+        high = enqueue("test_record", owner=self.user, payload={"n": 2}, priority=1)
+
+        self.assertEqual(claim_next("w1").pk, high.pk)
+        self.assertEqual(claim_next("w2").pk, low.pk)
+        self.assertIsNone(claim_next("w3"))
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        job = enqueue("test_fail", owner=self.user, max_attempts=2)
+
+        job = run_job(claim_next("w1"))
+        self.assertEqual(job.status, "queued")
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIsNone(claim_next("w1"))
+
+        BackgroundJob.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        job = run_job(claim_next("w1"))
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.assertIn("boom", job.last_error)
+
+    @override_settings(BACKGROUND_JOBS_EAGER=True)
+    def test_eager_job_uses_up_its_attempts_inline(self):
+        with self.assertLogs("accounts.jobs", "ERROR"), self.captureOnCommitCallbacks(execute=True):
+            job = enqueue("test_fail", owner=self.user, max_attempts=3)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 3))
+
+    @override_settings(
+        BACKGROUND_JOBS_EAGER=True,
+        STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+        },
+    )
+    def test_lot_list_only_syncs_when_lots_are_stale(self):
+        today = timezone.localdate()
+        vendor = Vendor.objects.create(owner=self.user, name="Vendor")
+        yarn_po = YarnPurchaseOrder.objects.create(owner=self.user, system_number="YPO-1", po_date=today, vendor=vendor)
+        greige_po = GreigePurchaseOrder.objects.create(
+            owner=self.user, system_number="GPO-1", po_date=today, vendor=vendor, source_yarn_po=yarn_po
+        )
+        dyeing_po = DyeingPurchaseOrder.objects.create(
+            owner=self.user, system_number="DPO-1", po_date=today, vendor=vendor, source_greige_po=greige_po
+        )
+        DyeingPOInward.objects.create(owner=self.user, po=dyeing_po, inward_number="DI-1", inward_date=today)
+        self.client.force_login(self.user)
+        url = reverse("accounts:inventory_lot_list")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+        jobs = BackgroundJob.objects.filter(task="sync_phase2_lots")
+        self.assertEqual(list(jobs.values_list("status", flat=True)), ["done"])
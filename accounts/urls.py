@@ -49,6 +49,7 @@ urlpatterns = [
     path("master/materials/add/", views.material_create, name="material_create"),
     path("master/materials/<int:pk>/edit/", views.material_edit, name="material_edit"),
     path("master/materials/<int:pk>/delete/", views.material_delete, name="material_delete"),
+    path("master/lookup/<slug:kind>/", views.master_lookup, name="master_lookup"),
 
     # Material Shades
     path("utilities/material-shades/", views.materialshade_list, name="materialshade_list"),
@@ -216,6 +217,7 @@ urlpatterns = [
     path("po/dyeing/<int:pk>/edit/", views.dyeingpo_update, name="dyeingpo_edit"),
     path("po/dyeing/<int:pk>/delete/", views.dyeingpo_delete, name="dyeingpo_delete"),
     path("po/dyeing/<int:pk>/review/", views.dyeingpo_review, name="dyeingpo_review"),
+    path("po/review/batch/", views.po_batch_review, name="po_batch_review"),
     path("po/dyeing/<int:pk>/inward/", views.dyeingpo_inward, name="dyeingpo_inward"),
     path("po/dyeing/inwards/<int:pk>/edit/", views.dyeing_inward_edit, name="dyeing_inward_edit"),
     path("po/dyeing/inwards/", views.dyeing_inward_tracker, name="dyeing_inward_tracker"),
@@ -268,6 +270,7 @@ path("production/programs/<int:pk>/start/save/", views.program_start_save, name=
     # =========================================================
     path("sales/invoices/", views.invoice_list, name="invoice_list"),
     path("sales/invoices/add/", views.invoice_create, name="invoice_add"),
+    path("sales/invoices/batch/", views.invoice_batch_create, name="invoice_batch_add"),
     path("sales/invoices/<int:pk>/", views.invoice_detail, name="invoice_detail"),
     path("sales/invoices/<int:pk>/print/", views.invoice_print, name="invoice_print"),
     path("sales/invoices/program-payload/<int:program_id>/", views.invoice_program_payload, name="invoice_program_payload"),
@@ -278,17 +281,37 @@ path("production/programs/<int:pk>/start/save/", views.program_start_save, name=
     path("maintenance/", views.maintenance_list, name="maintenance_list"),
     path("maintenance/add/", views.maintenance_create, name="maintenance_add"),
     path("maintenance/month-payload/", views.maintenance_month_payload, name="maintenance_month_payload"),
+    path("maintenance/trend-payload/", views.maintenance_trend_payload, name="maintenance_trend_payload"),
+
+    # =========================================================
+    # Reports
+    # =========================================================
+    path("reports/", views.report_home, name="report_home"),
+    path("reports/refresh/", views.report_refresh, name="report_refresh"),
+    path("reports/dyeing-loss/payload/", views.report_dyeing_loss_payload, name="report_dyeing_loss_payload"),
+    path("reports/<slug:report_key>/", views.report_detail, name="report_detail"),
 
     # =========================================================
     # Phase 2 - QC / Lots / QR / Costing
     # =========================================================
     path("inventory/lots/", views.inventory_lot_list, name="inventory_lot_list"),
     path("inventory/lots/<int:pk>/", views.inventory_lot_detail, name="inventory_lot_detail"),
+    path("inventory/lots/<int:pk>/movements/add/", views.inventory_lot_movement_create, name="inventory_lot_movement_add"),
+    path("inventory/lots/<int:pk>/qc/", views.inventory_lot_roll_qc, name="inventory_lot_roll_qc"),
+    path("inventory/stock-as-of/", views.inventory_stock_as_of, name="inventory_stock_as_of"),
+    path("inventory/rolls/scan/", views.inventory_roll_scan_batch, name="inventory_roll_scan_batch"),
     path("qc/", views.quality_check_list, name="quality_check_list"),
     path("qc/add/", views.quality_check_create, name="quality_check_add"),
     path("qc/<int:pk>/", views.quality_check_detail, name="quality_check_detail"),
     path("qr/add/", views.qr_code_create, name="qr_code_add"),
     path("qr/<int:pk>/", views.qr_code_detail, name="qr_code_detail"),
+    path("qr/labels/lot/<int:pk>/", views.qr_label_sheet, {"scope": "lot"}, name="qr_label_sheet_lot"),
+    path("qr/labels/inward/<int:pk>/", views.qr_label_sheet, {"scope": "inward"}, name="qr_label_sheet_inward"),
     path("costing/", views.costing_snapshot_list, name="costing_snapshot_list"),
     path("costing/add/", views.costing_snapshot_create, name="costing_snapshot_add"),
+    path("api/v1/", views.api_index, name="api_index"),
+    path("api/v1/changes/", views.api_changes, name="api_changes"),
+    path("api/v1/<slug:resource>/", views.api_list, name="api_list"),
+    path("jobs/<int:pk>/", views.job_status, name="job_status"),
+    path("jobs/<int:pk>/file/", views.job_file, name="job_file"),
 ]
\ No newline at end of file
@@ -1,5 +1,6 @@
+import base64
 from calendar import monthcalendar
-from datetime import timedelta, datetime
+from datetime import date, timedelta
 from decimal import Decimal, InvalidOperation
 from io import BytesIO
 import json
@@ -12,17 +13,20 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.paginator import Paginator
 from django.core.validators import validate_email
 from django.db import transaction
-from django.db.models import Count, Prefetch, Q, Sum
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.db.models import Count, DecimalField, Exists, F, FileField, Max, OuterRef, Prefetch, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.urls import reverse
 from django.template import TemplateDoesNotExist
 from django.template.loader import get_template
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.http import require_GET, require_POST, require_http_methods
 
@@ -48,6 +52,7 @@ from .forms import (
     DyeingPurchaseOrderItemFormSet,
     ExpenseForm,
     FirmForm,
+    InventoryMovementForm,
     GreigePOInwardForm,
     GreigePurchaseOrderItemFormSet,
     GreigePOReviewForm,
@@ -75,9 +80,13 @@ from .forms import (
     ProgramJobberChallanApprovalForm,
     validate_program_jobber_challan_size_formset,
     ProgramInvoiceForm,
+    ProgramInvoiceBatchForm,
     MaintenanceRecordForm,
+    POBatchReviewForm,
     ReadyPOInwardForm,
     ReadyPurchaseOrderForm,
+    RollQCBatchForm,
+    RollQCFormSet,
     SubCategoryForm,
     TermsConditionForm,
     VendorForm,
@@ -97,6 +106,8 @@ except ImportError:
 
 from .models import (
     Accessory,
+    ApiToken,
+    BackgroundJob,
     BOM,
     BOMAccessoryItem,
     BOMImage,
@@ -114,10 +125,18 @@ from .models import (
     ProgramInvoice,
     ProgramInvoiceItem,
     MaintenanceRecord,
+    MonthlyCostFact,
+    ClientSalesFact,
+    JobberOutputFact,
+    PurchaseReportFact,
+    REPORT_STAGE_CHOICES,
+    ReportRefreshState,
+    StageYieldFact,
     Brand,
     Catalogue,
     Category,
     Client,
+    CostingSnapshot,
     DyeingMaterialLink,
     DyeingMaterialLinkDetail,
     DyeingOtherCharge,
@@ -131,6 +150,10 @@ from .models import (
     GreigePOInwardItem,
     GreigePurchaseOrder,
     GreigePurchaseOrderItem,
+    InventoryBalanceCheckpoint,
+    InventoryLot,
+    InventoryMovement,
+    InventoryRoll,
     InwardType,
     Jobber,
     JobberType,
@@ -155,8 +178,24 @@ from .models import (
     YarnPOInwardItem,
     YarnPurchaseOrder,
     YarnPurchaseOrderItem,
+    month_key_range,
+    LOT_ALLOCATION_STRATEGY_CHOICES,
+    MOVEMENT_TYPE_CHOICES,
+    ProgramLotAllocation,
+    QRCodeRecord,
+    QualityCheck,
+    next_qr_code_number,
+    next_qr_code_numbers,
 )
+from .change_feed import CHANGE_FEED_MODELS, read_changes, record_changes
+from .conditional import conditional_document
+from .exports import EXPORT_CHUNK_SIZE, export_format, export_response
+from .images import image_path, image_url
+from .jobs import enqueue, job_file_storage, job_payload
+from .master_cache import master_instances, owner_default_firm
 from .navigation import UTILITIES_GROUPS
+from .row_cache import cached_rows
+from .tenant_db import tenant_context
 
 try:
     from .models import DispatchChallan
@@ -938,12 +977,17 @@ def material_edit(request, pk: int):
     return render(request, tpl, ctx)
 
 
+MATERIAL_LIST_PAGE_SIZE = 50
+
+
 @login_required
 def material_list(request):
     q = (request.GET.get("q") or "").strip()
     selected_type = (request.GET.get("type") or "").strip()
 
     qs = Material.objects.all().order_by("-id").select_related("yarn", "greige", "finished", "trim")
+    if hasattr(Material, "owner"):
+        qs = qs.filter(owner=request.user)
 
     if selected_type.isdigit():
         qs = qs.filter(material_type_id=int(selected_type))
@@ -954,8 +998,11 @@ def material_list(request):
             | Q(remarks__icontains=q)
         )
 
+    page_obj = Paginator(qs, MATERIAL_LIST_PAGE_SIZE).get_page(request.GET.get("page"))
+
     ctx = {
-        "materials": qs,
+        "materials": page_obj.object_list,
+        "page_obj": page_obj,
         "q": q,
         "selected_type": selected_type,
         "type_choices": MaterialType.objects.filter(owner=request.user).order_by("name"),
@@ -965,6 +1012,98 @@ def material_list(request):
     return render(request, tpl, ctx)
 
 
+# ==========================================================
+# TYPEAHEAD LOOKUPS
+# ==========================================================
+LOOKUP_PAGE_SIZE = 25
+LOOKUP_MAX_PAGE_SIZE = 100
+
+
+def _lookup_ids(request, name):
+    values = []
+    for raw in request.GET.getlist(name):
+        values.extend(part for part in raw.split(",") if part.strip().isdigit())
+    return [int(value) for value in values]
+
+
+def _lookup_materials(request, q):
+    qs = Material.objects.select_related("material_type")
+    if hasattr(Material, "owner"):
+        qs = qs.filter(owner=request.user)
+
+    kinds = [kind for raw in request.GET.getlist("kind") for kind in raw.split(",") if kind]
+    if kinds:
+        qs = qs.filter(material_kind__in=kinds)
+    for param, field in (("type", "material_type_id"), ("sub_type", "material_sub_type_id"), ("shade", "material_shade_id")):
+        ids = _lookup_ids(request, param)
+        if ids:
+            qs = qs.filter(**{f"{field}__in": ids})
+    if q:
+        qs = qs.filter(name__icontains=q)
+
+    def row(material):
+        return {
+            "id": material.pk,
+            "text": str(material),
+            "name": material.name,
+            "kind": material.material_kind,
+            "material_type": material.material_type_id,
+        }
+    return qs.order_by("name", "id"), row
+
+
+def _lookup_accessories(request, q):
+    qs = Accessory.objects.filter(owner=request.user)
+    if q:
+        qs = qs.filter(name__icontains=q)
+
+    def row(accessory):
+        return {"id": accessory.pk, "text": accessory.name, "name": accessory.name, "default_unit": accessory.default_unit_id}
+    return qs.order_by("name", "id"), row
+
+
+def _lookup_units(request, q):
+    qs = MaterialUnit.objects.filter(owner=request.user)
+    if q:
+        qs = qs.filter(name__icontains=q)
+
+    def row(unit):
+        return {"id": unit.pk, "text": unit.name, "name": unit.name}
+    return qs.order_by("name", "id"), row
+
+
+LOOKUPS = {
+    "materials": _lookup_materials,
+    "accessories": _lookup_accessories,
+    "units": _lookup_units,
+}
+
+
+@login_required
+@require_GET
+def master_lookup(request, kind):
+    lookup = LOOKUPS.get(kind)
+    if lookup is None:
+        return JsonResponse({"ok": False, "error": "Unknown lookup."}, status=404)
+
+    try:
+        page = max(int(request.GET.get("page") or 1), 1)
+        page_size = min(max(int(request.GET.get("page_size") or LOOKUP_PAGE_SIZE), 1), LOOKUP_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "page and page_size must be numbers."}, status=400)
+
+    qs, row = lookup(request, (request.GET.get("q") or "").strip())
+    offset = (page - 1) * page_size
+    # One extra row tells us whether another page exists without a COUNT query.
+    objects = list(qs[offset:offset + page_size + 1])
+    return JsonResponse({
+        "ok": True,
+        "page": page,
+        "has_more": len(objects) > page_size,
+        "results": [row(obj) for obj in objects[:page_size]],
+    })
+
+
 @login_required
 @require_POST
 def material_delete(request, pk: int):
@@ -1535,7 +1674,7 @@ def vendor_list(request):
 @login_required
 @require_http_methods(["GET", "POST"])
 def vendor_create(request):
-    default_firm = Firm.objects.filter(owner=request.user).first()
+    default_firm = owner_default_firm(request.user)
 
     form = VendorForm(request.POST or None)
 
@@ -1568,7 +1707,7 @@ def vendor_create(request):
 @require_http_methods(["GET", "POST"])
 def vendor_update(request, pk: int):
     vendor = get_object_or_404(Vendor, pk=pk, owner=request.user)
-    default_firm = Firm.objects.filter(owner=request.user).first()
+    default_firm = owner_default_firm(request.user)
 
     form = VendorForm(request.POST or None, instance=vendor)
 
@@ -1612,6 +1751,20 @@ def _can_access_yarn_po(user, po):
     return bool(_can_review_yarn_po(user) or po.owner_id == user.id)
 
 
+def _reviewable_scope(model):
+    # Queryset counterpart of the _can_access_*_po checks, for conditional_document.
+    def scope(user):
+        qs = model.objects.all()
+        return qs if _can_review_yarn_po(user) else qs.filter(owner=user)
+    return scope
+
+def _owner_scope(model):
+    return lambda user: model.objects.filter(owner=user)
+
+def _dispatch_scope(user):
+    return DispatchChallan.objects.filter(owner=user) if DispatchChallan is not None else None
+
+
 def _next_yarn_inward_number() -> str:
     last = YarnPOInward.objects.order_by("-id").first()
     next_id = (last.id + 1) if last else 1
@@ -1679,7 +1832,7 @@ def _build_yarn_po_pdf_response(po):
     def resolve_logo_path():
         if po.firm and getattr(po.firm, "logo", None):
             try:
-                logo_path = po.firm.logo.path
+                logo_path = image_path(po.firm.logo, "print")
                 if logo_path and os.path.exists(logo_path):
                     return logo_path
             except Exception:
@@ -2336,7 +2489,7 @@ def _build_greige_po_pdf_response(po):
     def resolve_logo_path():
         if firm and getattr(firm, "logo", None):
             try:
-                logo_path = firm.logo.path
+                logo_path = image_path(firm.logo, "print")
                 if logo_path and os.path.exists(logo_path):
                     return logo_path
             except Exception:
@@ -2920,7 +3073,32 @@ def _build_greige_po_pdf_response(po):
     return response
 
 
+def _enqueue_document_pdf(request, document, pk, filename, **options):
+    payload = {"document": document, "pk": pk, "filename": filename}
+    if options:
+        payload["options"] = options
+    return enqueue(
+        "document_pdf",
+        owner=request.user,
+        payload=payload,
+        priority=1,
+        dedupe_key=f"document_pdf:{document}:{pk}:{request.user.pk}",
+    )
+
+
+def _queue_document_pdf(request, document, pk, filename):
+    # ?background=1 on a PDF view: build it in the job queue and answer with
+    # the job's status URL; the finished file comes from job_file.
+    job = _enqueue_document_pdf(request, document, pk, filename)
+    return JsonResponse({"ok": True, "job": job_payload(job)}, status=202)
+
+
 @login_required
+@conditional_document(
+    _reviewable_scope(GreigePurchaseOrder),
+    fields=("updated_at", "source_yarn_po__updated_at"),
+    children={"items": None},
+)
 def greigepo_pdf(request, pk: int):
     po = get_object_or_404(
         GreigePurchaseOrder.objects
@@ -2937,6 +3115,9 @@ def greigepo_pdf(request, pk: int):
     if not _can_access_greige_po(request.user, po):
         raise PermissionDenied("You do not have access to this Greige PO.")
 
+    if request.GET.get("background") == "1":
+        return _queue_document_pdf(request, "greige_po", po.pk, f'{po.system_number or "greige_po"}.pdf')
+
     try:
         response = _build_greige_po_pdf_response(po)
     except Exception:
@@ -2947,7 +3128,6 @@ def greigepo_pdf(request, pk: int):
         filename = f'{po.system_number or "greige_po"}.pdf'
         disposition = "attachment" if request.GET.get("download") == "1" else "inline"
         response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
-        response["Cache-Control"] = "no-store"
         response["X-Content-Type-Options"] = "nosniff"
         try:
             response["Content-Length"] = str(len(response.content))
@@ -2987,7 +3167,19 @@ def yarnpo_list(request):
             | Q(items__material__name__icontains=q)
         ).distinct()
 
-    orders = [_attach_yarn_po_metrics(po) for po in qs.order_by("-id")]
+    can_review = _can_review_yarn_po(request.user)
+    orders = cached_rows(
+        request,
+        qs.order_by("-id"),
+        "accounts/yarn_po/_list_card.html",
+        name="yarn_po",
+        context_name="po",
+        load=lambda pks: [_attach_yarn_po_metrics(po) for po in qs.filter(pk__in=pks)],
+        fields=("updated_at", "reviewed_by__username"),
+        children={"items": None, "inwards": "updated_at", "inwards__items": None},
+        variant="review" if can_review else "",
+        context={"can_review_yarn_po": can_review},
+    )
 
     return render(
         request,
@@ -2995,7 +3187,7 @@ def yarnpo_list(request):
         {
             "orders": orders,
             "q": q,
-            "can_review_yarn_po": _can_review_yarn_po(request.user),
+            "can_review_yarn_po": can_review,
         },
     )
 
@@ -3018,7 +3210,7 @@ def _bind_yarnpo_item_formset(request, instance=None, user=None):
 @login_required
 @require_http_methods(["GET", "POST"])
 def yarnpo_create(request):
-    default_firm = Firm.objects.filter(owner=request.user).first()
+    default_firm = owner_default_firm(request.user)
 
     po = YarnPurchaseOrder(owner=request.user)
 
@@ -3077,7 +3269,7 @@ def yarnpo_update(request, pk: int):
         raise PermissionDenied("You do not have access to this Yarn PO.")
 
     po_owner = po.owner
-    default_firm = Firm.objects.filter(owner=po_owner).first()
+    default_firm = owner_default_firm(po_owner)
     display_firm = po.firm or default_firm
 
     if request.method == "GET" and display_firm and not po.firm:
@@ -3102,6 +3294,7 @@ def yarnpo_update(request, pk: int):
             formset.instance = po
             formset.save()
             _recalculate_yarn_po(po)
+            _refresh_po_cost_facts(po)
 
             messages.success(request, f"Yarn PO {po.system_number} updated successfully.")
             return redirect("accounts:yarnpo_list")
@@ -3272,6 +3465,7 @@ def _build_simple_yarn_po_pdf_response(po):
 
 
 @login_required
+@conditional_document(_reviewable_scope(YarnPurchaseOrder), children={"items": None})
 def yarnpo_pdf(request, pk: int):
     po = get_object_or_404(
         YarnPurchaseOrder.objects
@@ -3285,6 +3479,9 @@ def yarnpo_pdf(request, pk: int):
     if not _can_access_yarn_po(request.user, po):
         raise PermissionDenied("You do not have access to this PO.")
 
+    if request.GET.get("background") == "1":
+        return _queue_document_pdf(request, "yarn_po", po.pk, f'{po.system_number or "yarn_po"}.pdf')
+
     try:
         response = _build_yarn_po_pdf_response(po)
     except Exception:
@@ -3295,7 +3492,6 @@ def yarnpo_pdf(request, pk: int):
         filename = f'{po.system_number or "yarn_po"}.pdf'
         disposition = "attachment" if request.GET.get("download") == "1" else "inline"
         response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
-        response["Cache-Control"] = "no-store"
         response["X-Content-Type-Options"] = "nosniff"
         try:
             response["Content-Length"] = str(len(response.content))
@@ -3568,7 +3764,9 @@ def yarnpo_inward(request, pk: int):
                             remark=remark,
                         )
                     )
-                YarnPOInwardItem.objects.bulk_create(bulk_rows)
+                record_changes(YarnPOInwardItem.objects.bulk_create(bulk_rows), "insert")
+                MonthlyCostFact.refresh_for_dates(inward.owner, inward.inward_date)
+                _queue_generated_po_sync(inward.owner)
 
                 tracker_url = reverse("accounts:yarn_inward_tracker")
                 return redirect(f"{tracker_url}?inward={inward.pk}")
@@ -3618,6 +3816,7 @@ def yarn_inward_update(request, pk: int):
     )
 
     po = inward.po
+    previous_inward_date = inward.inward_date
 
     if not _can_access_yarn_po(request.user, po):
         raise PermissionDenied("You do not have access to this inward.")
@@ -3693,7 +3892,7 @@ def yarn_inward_update(request, pk: int):
 
             inward.items.all().delete()
 
-            YarnPOInwardItem.objects.bulk_create([
+            record_changes(YarnPOInwardItem.objects.bulk_create([
                 YarnPOInwardItem(
                     inward=inward,
                     po_item=item,
@@ -3701,7 +3900,9 @@ def yarn_inward_update(request, pk: int):
                     remark=remark,
                 )
                 for item, qty, remark in line_payload
-            ])
+            ]), "insert")
+            MonthlyCostFact.refresh_for_dates(inward.owner, previous_inward_date, inward.inward_date)
+            _queue_generated_po_sync(inward.owner)
 
             messages.success(request, f"Inward {inward.inward_number} updated successfully.")
             tracker_url = reverse("accounts:yarn_inward_tracker")
@@ -3730,6 +3931,49 @@ def yarn_inward_tracker(request):
     q = (request.GET.get("q") or "").strip()
     target_inward_id = (request.GET.get("inward") or "").strip()
 
+    if export_format(request):
+        items = YarnPOInwardItem.objects.all()
+        if not _can_review_yarn_po(request.user):
+            items = items.filter(inward__po__owner=request.user)
+        if q:
+            items = items.filter(
+                Q(inward__po__system_number__icontains=q)
+                | Q(inward__po__po_number__icontains=q)
+                | Q(inward__po__vendor__name__icontains=q)
+                | Q(inward__po__firm__firm_name__icontains=q)
+            )
+        rows = (
+            items
+            .annotate(material_name=Coalesce("po_item__material__name", "po_item__material_type__name"))
+            .order_by("-inward__po_id", "inward__inward_date", "inward_id", "id")
+            .values_list(
+                "inward__po__system_number",
+                "inward__po__po_number",
+                "inward__po__po_date",
+                "inward__po__vendor__name",
+                "inward__po__firm__firm_name",
+                "inward__inward_number",
+                "inward__inward_date",
+                "inward__vendor__name",
+                "inward__inward_type__name",
+                "material_name",
+                "po_item__quantity",
+                "quantity",
+                "po_item__unit",
+                "remark",
+            )
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return export_response(
+            request,
+            "yarn-inward-tracker",
+            [
+                "PO System No", "PO No", "PO Date", "Vendor", "Firm", "Inward No", "Inward Date",
+                "Inward Vendor", "Inward Type", "Material", "Ordered Qty", "Inward Qty", "Unit", "Remark",
+            ],
+            rows,
+        )
+
     qs = (
         YarnPurchaseOrder.objects
         .select_related("vendor", "firm", "owner")
@@ -3844,11 +4088,37 @@ def generate_greige_po_from_yarn(request, pk: int):
     )
 
 
+def _refresh_po_cost_facts(po):
+    # Inward values are priced at the PO line rate, so editing a PO re-prices
+    # the months of its own inwards.
+    MonthlyCostFact.refresh_for_dates(po.owner, *po.inwards.values_list("inward_date", flat=True).distinct())
+
+
+def _po_chain_inward_dates(po):
+    chain = [
+        (YarnPurchaseOrder, YarnPOInward, "source_yarn_po"),
+        (GreigePurchaseOrder, GreigePOInward, "source_greige_po"),
+        (DyeingPurchaseOrder, DyeingPOInward, "source_dyeing_po"),
+        (ReadyPurchaseOrder, ReadyPOInward, None),
+    ]
+    start = next(idx for idx, (po_model, _inward_model, _link) in enumerate(chain) if isinstance(po, po_model))
+    dates = set()
+    path = []
+    for _po_model, inward_model, child_link in chain[start:]:
+        lookup = "__".join(["po"] + path)
+        dates.update(inward_model.objects.filter(**{lookup: po}).values_list("inward_date", flat=True).distinct())
+        if child_link:
+            path.insert(0, child_link)
+    return dates
+
+
 @login_required
 @require_POST
 def yarnpo_delete(request, pk: int):
     po = get_object_or_404(YarnPurchaseOrder, pk=pk, owner=request.user)
+    inward_dates = _po_chain_inward_dates(po)
     po.delete()
+    MonthlyCostFact.refresh_for_dates(request.user, *inward_dates)
     return redirect("accounts:yarnpo_list")
 @login_required
 @require_http_methods(["GET", "POST"])
@@ -3908,6 +4178,7 @@ def yarnpo_review(request, pk: int):
                 "rejection_reason",
                 "reviewed_by",
                 "reviewed_at",
+                "updated_at",
             ])
 
             if embed_mode:
@@ -4108,89 +4379,102 @@ def _ready_po_queryset():
         .order_by("-id")
     )
 
+def _apply_generated_po_items(item_model, po, source_field, rows, create_only=None, adjust=None):
+    # Generated PO lines are keyed by their source line, so unchanged lines keep their
+    # ids (and the inward items hanging off them) across syncs.
+    create_only = create_only or {}
+    existing = {}
+    stale_ids = []
+    for item in item_model.objects.filter(po=po).order_by("id"):
+        source_id = getattr(item, f"{source_field}_id")
+        if source_id in rows and source_id not in existing:
+            existing[source_id] = item
+        else:
+            stale_ids.append(item.pk)
+
+    to_create = []
+    to_update = []
+    update_fields = set()
+    for source_id, values in rows.items():
+        item = existing.get(source_id)
+        if item is None:
+            to_create.append(item_model(po=po, **{f"{source_field}_id": source_id}, **create_only.get(source_id, {}), **values))
+            continue
+        if adjust is not None:
+            values = adjust(item, values)
+        changed = [field for field, value in values.items() if getattr(item, field) != value]
+        if changed:
+            for field in changed:
+                setattr(item, field, values[field])
+            to_update.append(item)
+            update_fields.update(changed)
+
+    if stale_ids:
+        item_model.objects.filter(pk__in=stale_ids).delete()
+    if to_create:
+        record_changes(item_model.objects.bulk_create(to_create), "insert")
+    if to_update:
+        item_model.objects.bulk_update(to_update, sorted(update_fields))
+        record_changes(to_update, "update")
+    if stale_ids or to_create or to_update:
+        # Moves the list-card stamp (row_cache) along with the lines.
+        type(po).objects.filter(pk=po.pk).update(updated_at=timezone.now())
+        record_changes([po], "update")
+    return list(existing.values()) + to_create
+
+
+def _yarn_source_name(yarn_item):
+    if yarn_item.material_type:
+        return yarn_item.material_type.name
+    return yarn_item.material.name if yarn_item.material else "Yarn Item"
+
+
 def _sync_greige_po_items_from_source(
     greige_po,
     source_inward=None,
     greige_material_map=None,
     greige_unit_map=None,
 ):
-    yarn_po = (
-        _greige_source_queryset()
-        .filter(pk=greige_po.source_yarn_po_id)
-        .first()
-    )
+    yarn_po = YarnPurchaseOrder.objects.filter(pk=greige_po.source_yarn_po_id).first()
     if yarn_po is None:
         return Decimal("0")
 
-    greige_material_map = greige_material_map or {}
-    greige_unit_map = greige_unit_map or {}
-
-    item_rows = []
-    total_weight = Decimal("0")
-
+    sources = YarnPurchaseOrderItem.objects.select_related("material", "material_type")
     if source_inward is not None:
-        inward_items = source_inward.items.select_related("po_item__material", "po_item__material_type")
-        for inward_item in inward_items:
-            yarn_item = inward_item.po_item
-            inward_qty = inward_item.quantity or Decimal("0")
-            if yarn_item is None or inward_qty <= 0:
-                continue
-
-            source_yarn_name = (
-                yarn_item.material_type.name
-                if yarn_item.material_type
-                else (yarn_item.material.name if yarn_item.material else "Yarn Item")
-            )
-
-            selected_greige_material = greige_material_map.get(yarn_item.id)
-            fabric_name = (
-                selected_greige_material.name
-                if selected_greige_material is not None
-                else source_yarn_name
-            )
-
-            unit_name = greige_unit_map.get(yarn_item.id) or yarn_item.unit or ""
-
-            item_rows.append(
-                GreigePurchaseOrderItem(
-                    po=greige_po,
-                    source_yarn_po_item=yarn_item,
-                    fabric_name=fabric_name,
-                    yarn_name=source_yarn_name,
-                    unit=unit_name,
-                    quantity=inward_qty,
-                    remark=f"Generated from Yarn inward {source_inward.inward_number}",
-                )
-            )
-            total_weight += inward_qty
+        sources = sources.filter(inward_items__inward=source_inward)
+        remark = f"Generated from Yarn inward {source_inward.inward_number}"
     else:
-        for yarn_item in yarn_po.items.all():
-            inward_qty = yarn_item.inward_qty_total or Decimal("0")
-            if inward_qty <= 0:
-                continue
+        sources = sources.filter(po=yarn_po)
+        remark = f"Generated from Yarn inward of {yarn_po.system_number}"
+    sources = sources.annotate(source_qty=Sum("inward_items__quantity")).order_by("id")
 
-            source_yarn_name = (
-                yarn_item.material_type.name
-                if yarn_item.material_type
-                else (yarn_item.material.name if yarn_item.material else "Yarn Item")
-            )
+    # Names picked on the form are applied every time; otherwise lines keep whatever
+    # greige name they already carry and only new lines default to the yarn name.
+    chosen = greige_material_map is not None
+    greige_material_map = greige_material_map or {}
+    greige_unit_map = greige_unit_map or {}
 
-            item_rows.append(
-                GreigePurchaseOrderItem(
-                    po=greige_po,
-                    source_yarn_po_item=yarn_item,
-                    fabric_name=source_yarn_name,
-                    yarn_name=source_yarn_name,
-                    unit=yarn_item.unit or "",
-                    quantity=inward_qty,
-                    remark=f"Generated from Yarn inward of {yarn_po.system_number}",
-                )
-            )
-            total_weight += inward_qty
+    rows = {}
+    create_only = {}
+    total_weight = Decimal("0")
+    for yarn_item in sources:
+        inward_qty = yarn_item.source_qty or Decimal("0")
+        if inward_qty <= 0:
+            continue
+        source_yarn_name = _yarn_source_name(yarn_item)
+        selected_greige_material = greige_material_map.get(yarn_item.id)
+        names = {
+            "fabric_name": selected_greige_material.name if selected_greige_material is not None else source_yarn_name,
+            "unit": greige_unit_map.get(yarn_item.id) or yarn_item.unit or "",
+        }
+        rows[yarn_item.id] = {"yarn_name": source_yarn_name, "quantity": inward_qty, "remark": remark}
+        if chosen:
+            rows[yarn_item.id].update(names)
+        else:
+            create_only[yarn_item.id] = names
+        total_weight += inward_qty
 
-    GreigePurchaseOrderItem.objects.filter(po=greige_po).delete()
-    if item_rows:
-        GreigePurchaseOrderItem.objects.bulk_create(item_rows)
+    _apply_generated_po_items(GreigePurchaseOrderItem, greige_po, "source_yarn_po_item", rows, create_only=create_only)
 
     greige_po.available_qty = total_weight
     greige_po.save(update_fields=["available_qty", "updated_at"])
@@ -4313,156 +4597,176 @@ def _extract_greige_material_selection(request, source_yarn_inward, owner):
 
     return greige_material_map, greige_unit_map, row_errors
     
+def _dyeing_po_totals(po, subtotal):
+    discount = po.discount_percent or Decimal("0")
+    others = po.others or Decimal("0")
+    gst = po.gst_percent or Decimal("0")
+    tcs = po.tcs_percent or Decimal("0")
+
+    after_discount = subtotal - (subtotal * discount / Decimal("100"))
+    after_others = after_discount + others
+    gst_amount = after_others * gst / Decimal("100")
+    tcs_amount = after_others * tcs / Decimal("100")
+    return after_discount, after_others + gst_amount + tcs_amount
+
+
+def _adjust_generated_dyeing_item(item, values):
+    # Keeps what has already been consumed off the line, and prices the new
+    # quantity the way DyeingPurchaseOrderItemForm.clean() does.
+    consumed = (item.total_qty or Decimal("0")) - (item.remaining_qty or Decimal("0"))
+    remaining = values["total_qty"] - consumed
+    line_subtotal = (values["total_qty"] * (item.rate or Decimal("0"))).quantize(Decimal("0.01"))
+    line_final_amount = line_subtotal + (item.other_charge_amount or Decimal("0")) + (item.job_work_charges or Decimal("0"))
+    return {
+        **values,
+        "remaining_qty": remaining if remaining > 0 else Decimal("0"),
+        "line_subtotal": line_subtotal,
+        "line_final_amount": line_final_amount,
+    }
+
+
 def _sync_dyeing_po_items_from_source(dyeing_po):
-    greige_po = (
-        _greige_po_queryset()
-        .filter(pk=dyeing_po.source_greige_po_id)
-        .first()
-    )
+    greige_po = GreigePurchaseOrder.objects.filter(pk=dyeing_po.source_greige_po_id).first()
     if greige_po is None:
         return Decimal("0")
 
-    item_rows = []
-    total_weight = Decimal("0")
-    subtotal = Decimal("0")
     source_inward = getattr(dyeing_po, "source_greige_inward", None)
-
+    sources = GreigePurchaseOrderItem.objects.all()
     if source_inward is not None:
-        inward_items = source_inward.items.select_related("po_item")
-        for inward_item in inward_items:
-            greige_item = inward_item.po_item
-            inward_qty = inward_item.quantity or Decimal("0")
-            if greige_item is None or inward_qty <= 0:
-                continue
-
-            greige_name = greige_item.fabric_name or "Greige Item"
-
-            item_rows.append(
-                DyeingPurchaseOrderItem(
-                    po=dyeing_po,
-                    source_greige_po_item=greige_item,
-                    fabric_name=greige_name,
-                    greige_name=greige_name,
-                    unit=greige_item.unit or "",
-                    quantity=inward_qty,
-                    total_qty=inward_qty,
-                    remaining_qty=inward_qty,
-                    value=Decimal("0"),
-                    rolls=Decimal("0"),
-                    dyeing_type="",
-                    dyeing_name="",
-                    rate=Decimal("0"),
-                    other_charge_amount=Decimal("0"),
-                    job_work_charges=Decimal("0"),
-                    description="",
-                    remark=f"Generated from Greige inward {source_inward.inward_number}",
-                    line_subtotal=Decimal("0"),
-                    line_final_amount=Decimal("0"),
-                )
-            )
-            total_weight += inward_qty
+        sources = sources.filter(inward_items__inward=source_inward)
+        remark = f"Generated from Greige inward {source_inward.inward_number}"
     else:
-        for greige_item in greige_po.items.all():
-            inward_qty = greige_item.inward_qty_total or Decimal("0")
-            if inward_qty <= 0:
-                continue
+        sources = sources.filter(po=greige_po)
+        remark = f"Generated from Greige inward of {greige_po.system_number}"
+    sources = sources.annotate(source_qty=Sum("inward_items__quantity")).order_by("id")
 
-            greige_name = greige_item.fabric_name or "Greige Item"
-
-            item_rows.append(
-                DyeingPurchaseOrderItem(
-                    po=dyeing_po,
-                    source_greige_po_item=greige_item,
-                    fabric_name=greige_name,
-                    greige_name=greige_name,
-                    unit=greige_item.unit or "",
-                    quantity=inward_qty,
-                    total_qty=inward_qty,
-                    remaining_qty=inward_qty,
-                    value=Decimal("0"),
-                    rolls=Decimal("0"),
-                    dyeing_type="",
-                    dyeing_name="",
-                    rate=Decimal("0"),
-                    other_charge_amount=Decimal("0"),
-                    job_work_charges=Decimal("0"),
-                    description="",
-                    remark=f"Generated from Greige inward of {greige_po.system_number}",
-                    line_subtotal=Decimal("0"),
-                    line_final_amount=Decimal("0"),
-                )
-            )
-            total_weight += inward_qty
+    rows = {}
+    create_only = {}
+    total_weight = Decimal("0")
+    for greige_item in sources:
+        inward_qty = greige_item.source_qty or Decimal("0")
+        if inward_qty <= 0:
+            continue
+        greige_name = greige_item.fabric_name or "Greige Item"
+        rows[greige_item.id] = {
+            "greige_name": greige_name,
+            "unit": greige_item.unit or "",
+            "quantity": inward_qty,
+            "total_qty": inward_qty,
+            "remark": remark,
+        }
+        create_only[greige_item.id] = {"fabric_name": greige_name, "remaining_qty": inward_qty}
+        total_weight += inward_qty
 
-    DyeingPurchaseOrderItem.objects.filter(po=dyeing_po).delete()
-    if item_rows:
-        DyeingPurchaseOrderItem.objects.bulk_create(item_rows)
+    items = _apply_generated_po_items(
+        DyeingPurchaseOrderItem, dyeing_po, "source_greige_po_item", rows,
+        create_only=create_only,
+        adjust=_adjust_generated_dyeing_item,
+    )
+    subtotal = sum((item.line_final_amount or Decimal("0") for item in items), Decimal("0"))
 
-    update_fields = ["total_weight", "updated_at"]
     dyeing_po.total_weight = total_weight
-
-    if hasattr(dyeing_po, "subtotal"):
-        dyeing_po.subtotal = subtotal
-        update_fields.append("subtotal")
-
-    if hasattr(dyeing_po, "after_discount_value"):
-        dyeing_po.after_discount_value = subtotal
-        update_fields.append("after_discount_value")
-
-    if hasattr(dyeing_po, "final_amount"):
-        dyeing_po.final_amount = subtotal
-        update_fields.append("final_amount")
-
-    if hasattr(dyeing_po, "available_qty"):
-        dyeing_po.available_qty = total_weight
-        update_fields.append("available_qty")
-
-    dyeing_po.save(update_fields=update_fields)
+    dyeing_po.subtotal = subtotal
+    dyeing_po.after_discount_value, dyeing_po.final_amount = _dyeing_po_totals(dyeing_po, subtotal)
+    dyeing_po.save(update_fields=["total_weight", "subtotal", "after_discount_value", "final_amount", "updated_at"])
     return total_weight
 
 
-
 def _sync_ready_po_items_from_source(ready_po):
-    dyeing_po = (
-        _dyeing_po_queryset()
-        .filter(pk=ready_po.source_dyeing_po_id)
-        .first()
-    )
+    dyeing_po = DyeingPurchaseOrder.objects.filter(pk=ready_po.source_dyeing_po_id).first()
     if dyeing_po is None:
         return Decimal("0")
 
-    item_rows = []
-    total_weight = Decimal("0")
+    sources = (
+        DyeingPurchaseOrderItem.objects.filter(po=dyeing_po)
+        .annotate(source_qty=Sum("inward_items__quantity"))
+        .order_by("id")
+    )
+    remark = f"Generated from Dyeing inward of {dyeing_po.system_number}"
 
-    for dyeing_item in dyeing_po.items.all():
-        inward_qty = dyeing_item.inward_qty_total or Decimal("0")
+    rows = {}
+    create_only = {}
+    total_weight = Decimal("0")
+    for dyeing_item in sources:
+        inward_qty = dyeing_item.source_qty or Decimal("0")
         if inward_qty <= 0:
             continue
-
         dyeing_name = dyeing_item.fabric_name or "Dyeing Item"
-
-        item_rows.append(
-            ReadyPurchaseOrderItem(
-                po=ready_po,
-                source_dyeing_po_item=dyeing_item,
-                fabric_name=dyeing_name,
-                dyeing_name=dyeing_name,
-                unit=dyeing_item.unit or "",
-                quantity=inward_qty,
-                remark=f"Generated from Dyeing inward of {dyeing_po.system_number}",
-            )
-        )
+        rows[dyeing_item.id] = {
+            "dyeing_name": dyeing_name,
+            "unit": dyeing_item.unit or "",
+            "quantity": inward_qty,
+            "remark": remark,
+        }
+        create_only[dyeing_item.id] = {"fabric_name": dyeing_name}
         total_weight += inward_qty
 
-    ReadyPurchaseOrderItem.objects.filter(po=ready_po).delete()
-    if item_rows:
-        ReadyPurchaseOrderItem.objects.bulk_create(item_rows)
+    _apply_generated_po_items(ReadyPurchaseOrderItem, ready_po, "source_dyeing_po_item", rows, create_only=create_only)
 
     ready_po.total_weight = total_weight
     ready_po.available_qty = total_weight
     ready_po.save(update_fields=["total_weight", "available_qty", "updated_at"])
     return total_weight
 
+
+def _pending_source_inwards(po_qs, source_field, inward_model, line_source_field, source_inward_field=None):
+    newer_inwards = inward_model.objects.filter(po_id=OuterRef(f"{source_field}_id"), updated_at__gt=OuterRef("updated_at"))
+    # A deleted inward leaves no newer row behind; it shows up as generated
+    # lines carrying more than their source items still have inwarded.
+    source_lines = inward_model._meta.get_field("items").related_model.objects.filter(
+        po_item_id=OuterRef(f"{line_source_field}_id"),
+    )
+    if source_inward_field:
+        source_lines = source_lines.filter(
+            inward_id=Coalesce(OuterRef(f"po__{source_inward_field}_id"), F("inward_id")),
+        )
+    source_qty = source_lines.values("po_item_id").annotate(total=Sum("quantity")).values("total")
+    line_model = po_qs.model._meta.get_field("items").related_model
+    drifted_lines = (
+        line_model.objects.filter(po_id=OuterRef("pk"), **{f"{line_source_field}__isnull": False})
+        .annotate(source_qty=Coalesce(Subquery(source_qty), Value(Decimal("0")), output_field=DecimalField()))
+        .exclude(quantity=F("source_qty"))
+    )
+    return po_qs.filter(Exists(newer_inwards) | Exists(drifted_lines))
+
+
+def _queue_generated_po_sync(owner):
+    # Inward saves only queue the resync; repeated saves before the worker
+    # gets to it share one job.
+    return enqueue(
+        "sync_generated_po_items",
+        owner=owner,
+        dedupe_key=f"sync_generated_po_items:{owner.pk}",
+    )
+
+
+def sync_generated_po_items(owner=None, force=False):
+    # Stages run in order so a greige resync feeds straight into its dyeing POs.
+    stages = (
+        (GreigePurchaseOrder.objects.select_related("source_yarn_inward"), "source_yarn_po", YarnPOInward,
+         ("source_yarn_po_item", "source_yarn_inward"),
+         lambda po: _sync_greige_po_items_from_source(po, source_inward=po.source_yarn_inward)),
+        (DyeingPurchaseOrder.objects.select_related("source_greige_inward"), "source_greige_po", GreigePOInward,
+         ("source_greige_po_item", "source_greige_inward"),
+         _sync_dyeing_po_items_from_source),
+        (ReadyPurchaseOrder.objects.all(), "source_dyeing_po", DyeingPOInward,
+         ("source_dyeing_po_item",),
+         _sync_ready_po_items_from_source),
+    )
+    synced = {}
+    for po_qs, source_field, inward_model, line_source, sync in stages:
+        if owner is not None:
+            po_qs = po_qs.filter(owner=owner)
+        if not force:
+            po_qs = _pending_source_inwards(po_qs, source_field, inward_model, *line_source)
+        count = 0
+        for po in po_qs.order_by("id"):
+            with transaction.atomic():
+                sync(po)
+            count += 1
+        synced[po_qs.model.__name__] = count
+    return synced
+
 @login_required
 def po_home(request):
     return render(request, "accounts/po/index.html")
@@ -4503,6 +4807,7 @@ def greige_inward_edit(request, pk: int):
         pk=pk,
     )
     po = inward.po
+    previous_inward_date = inward.inward_date
 
     if not _can_access_greige_po(request.user, po):
         raise PermissionDenied("You do not have access to this Greige inward.")
@@ -4571,7 +4876,7 @@ def greige_inward_edit(request, pk: int):
 
             inward.items.all().delete()
 
-            GreigePOInwardItem.objects.bulk_create([
+            record_changes(GreigePOInwardItem.objects.bulk_create([
                 GreigePOInwardItem(
                     inward=inward,
                     po_item=item,
@@ -4579,7 +4884,9 @@ def greige_inward_edit(request, pk: int):
                     remark=remark,
                 )
                 for item, qty, remark in line_payload
-            ])
+            ]), "insert")
+            MonthlyCostFact.refresh_for_dates(inward.owner, previous_inward_date, inward.inward_date)
+            _queue_generated_po_sync(inward.owner)
 
             messages.success(request, f"Inward {inward.inward_number} updated successfully.")
             tracker_url = reverse("accounts:greige_inward_tracker")
@@ -4796,6 +5103,7 @@ def greigepo_update(request, pk: int):
             total_qty = po.items.aggregate(total=Sum("quantity")).get("total") or Decimal("0")
             po.available_qty = total_qty
             po.save(update_fields=["available_qty", "updated_at"])
+            _refresh_po_cost_facts(po)
 
         messages.success(request, f"Greige PO {po.system_number} updated successfully.")
         return redirect("accounts:greigepo_inward", pk=po.pk)
@@ -4841,6 +5149,11 @@ def greigepo_update(request, pk: int):
     )
 
 @login_required
+@conditional_document(
+    _reviewable_scope(GreigePurchaseOrder),
+    fields=("updated_at", "source_yarn_po__updated_at"),
+    children={"items": None, "inwards": "updated_at", "inwards__items": None, "dyeing_pos": "updated_at", "source_yarn_po__inwards": "updated_at"},
+)
 def greigepo_detail(request, pk: int):
     po = get_object_or_404(_greige_po_queryset(), pk=pk)
     if not _can_access_greige_po(request.user, po):
@@ -4863,7 +5176,9 @@ def greigepo_detail(request, pk: int):
 @require_POST
 def greigepo_delete(request, pk: int):
     po = get_object_or_404(GreigePurchaseOrder, pk=pk, owner=request.user)
+    inward_dates = _po_chain_inward_dates(po)
     po.delete()
+    MonthlyCostFact.refresh_for_dates(request.user, *inward_dates)
     return redirect("accounts:greigepo_list")
 
 
@@ -4925,7 +5240,7 @@ def greigepo_inward(request, pk: int):
 
             inward.save()
 
-            GreigePOInwardItem.objects.bulk_create([
+            record_changes(GreigePOInwardItem.objects.bulk_create([
                 GreigePOInwardItem(
                     inward=inward,
                     po_item=item,
@@ -4933,7 +5248,9 @@ def greigepo_inward(request, pk: int):
                     remark=remark,
                 )
                 for item, qty, remark in line_payload
-            ])
+            ]), "insert")
+            MonthlyCostFact.refresh_for_dates(inward.owner, inward.inward_date)
+            _queue_generated_po_sync(inward.owner)
 
             tracker_url = reverse("accounts:greige_inward_tracker")
             return redirect(f"{tracker_url}?inward={inward.pk}")
@@ -5077,13 +5394,31 @@ def dyeingpo_list(request):
             | Q(firm__firm_name__icontains=q)
         ).distinct()
 
+    can_review = _can_review_yarn_po(request.user)
+    orders = cached_rows(
+        request,
+        qs,
+        "accounts/dyeing_po/_list_card.html",
+        name="dyeing_po",
+        context_name="po",
+        load=lambda pks: qs.filter(pk__in=pks),
+        children={
+            "items": None,
+            "inwards": "updated_at",
+            "inwards__items": None,
+            "ready_pos": "updated_at",
+        },
+        variant="review" if can_review else "",
+        context={"can_review_dyeing_po": can_review},
+    )
+
     return render(
         request,
         "accounts/dyeing_po/list.html",
         {
-            "orders": qs,
+            "orders": orders,
             "q": q,
-            "can_review_dyeing_po": _can_review_yarn_po(request.user),
+            "can_review_dyeing_po": can_review,
         },
     )
 
@@ -5194,16 +5529,7 @@ def dyeingpo_create(request, greige_po_id=None):
 
                     formset.save_m2m()
 
-                    discount = dyeing_po.discount_percent or Decimal("0")
-                    others = dyeing_po.others or Decimal("0")
-                    gst = dyeing_po.gst_percent or Decimal("0")
-                    tcs = dyeing_po.tcs_percent or Decimal("0")
-
-                    after_discount = subtotal - (subtotal * discount / Decimal("100"))
-                    after_others = after_discount + others
-                    gst_amount = after_others * gst / Decimal("100")
-                    tcs_amount = after_others * tcs / Decimal("100")
-                    final_amount = after_others + gst_amount + tcs_amount
+                    after_discount, final_amount = _dyeing_po_totals(dyeing_po, subtotal)
 
                     dyeing_po.total_weight = total_weight
                     dyeing_po.subtotal = subtotal
@@ -5321,16 +5647,7 @@ def dyeingpo_update(request, pk: int):
 
             formset.save_m2m()
 
-            discount = po.discount_percent or Decimal("0")
-            others = po.others or Decimal("0")
-            gst = po.gst_percent or Decimal("0")
-            tcs = po.tcs_percent or Decimal("0")
-
-            after_discount = subtotal - (subtotal * discount / Decimal("100"))
-            after_others = after_discount + others
-            gst_amount = after_others * gst / Decimal("100")
-            tcs_amount = after_others * tcs / Decimal("100")
-            final_amount = after_others + gst_amount + tcs_amount
+            after_discount, final_amount = _dyeing_po_totals(po, subtotal)
 
             po.total_weight = total_weight
             po.subtotal = subtotal
@@ -5343,6 +5660,7 @@ def dyeingpo_update(request, pk: int):
                 "final_amount",
                 "updated_at",
             ])
+            _refresh_po_cost_facts(po)
 
         return redirect("accounts:dyeingpo_list")
 
@@ -5363,6 +5681,11 @@ def dyeingpo_update(request, pk: int):
 
 
 @login_required
+@conditional_document(
+    _reviewable_scope(DyeingPurchaseOrder),
+    fields=("updated_at", "source_greige_po__updated_at"),
+    children={"items": None, "inwards": "updated_at", "inwards__items": None, "ready_pos": "updated_at", "source_greige_po__inwards": "updated_at"},
+)
 def dyeingpo_detail(request, pk: int):
     po = get_object_or_404(_dyeing_po_queryset(), pk=pk)
     if not _can_access_dyeing_po(request.user, po):
@@ -5393,6 +5716,7 @@ def ready_inward_edit(request, pk: int):
         pk=pk,
     )
     po = inward.po
+    previous_inward_date = inward.inward_date
 
     if not _can_access_ready_po(request.user, po):
         raise PermissionDenied("You do not have access to this Ready inward.")
@@ -5452,7 +5776,7 @@ def ready_inward_edit(request, pk: int):
 
             inward.items.all().delete()
 
-            ReadyPOInwardItem.objects.bulk_create([
+            record_changes(ReadyPOInwardItem.objects.bulk_create([
                 ReadyPOInwardItem(
                     inward=inward,
                     po_item=item,
@@ -5460,7 +5784,8 @@ def ready_inward_edit(request, pk: int):
                     remark=remark,
                 )
                 for item, qty, remark in line_payload
-            ])
+            ]), "insert")
+            MonthlyCostFact.refresh_for_dates(inward.owner, previous_inward_date, inward.inward_date)
 
             messages.success(request, f"Inward {inward.inward_number} updated successfully.")
             tracker_url = reverse("accounts:ready_inward_tracker")
@@ -5497,7 +5822,9 @@ def _next_ready_inward_number() -> str:
 @require_POST
 def dyeingpo_delete(request, pk: int):
     po = get_object_or_404(DyeingPurchaseOrder, pk=pk, owner=request.user)
+    inward_dates = _po_chain_inward_dates(po)
     po.delete()
+    MonthlyCostFact.refresh_for_dates(request.user, *inward_dates)
     return redirect("accounts:dyeingpo_list")
 
 
@@ -5552,7 +5879,7 @@ def dyeingpo_inward(request, pk: int):
             inward.inward_number = _next_dyeing_inward_number()
             inward.save()
 
-            DyeingPOInwardItem.objects.bulk_create([
+            record_changes(DyeingPOInwardItem.objects.bulk_create([
                 DyeingPOInwardItem(
                     inward=inward,
                     po_item=item,
@@ -5560,7 +5887,10 @@ def dyeingpo_inward(request, pk: int):
                     remark=remark,
                 )
                 for item, qty, remark in line_payload
-            ])
+            ]), "insert")
+            MonthlyCostFact.refresh_for_dates(inward.owner, inward.inward_date)
+            _queue_generated_po_sync(inward.owner)
+            _queue_phase2_lot_sync(inward.owner)
             return redirect("accounts:dyeingpo_inward", pk=po.pk)
 
     line_rows = [
@@ -5590,10 +5920,8 @@ def _normalize_stock_lot_search_value(value: str) -> str:
     return (value or "").strip().lower()
 
 
-def _build_stock_lot_rows_for_user(user):
-    rows = []
-
-    dyeing_inward_items = (
+def _stock_lot_items_for_user(user):
+    return (
         DyeingPOInwardItem.objects
         .select_related(
             "inward",
@@ -5606,58 +5934,78 @@ def _build_stock_lot_rows_for_user(user):
         .order_by("-inward__inward_date", "-id")
     )
 
-    for inward_item in dyeing_inward_items:
-        inward = inward_item.inward
-        po_item = inward_item.po_item
-        po = po_item.po if po_item else None
-
-        ready_material_name = "Ready Material"
-        raw_material_name = "-"
-        dyeing_name = "-"
-        dyeing_type = "-"
-        unit = "KG"
-
-        if po_item:
-            if po_item.finished_material:
-                ready_material_name = po_item.finished_material.name
-            elif po_item.fabric_name:
-                ready_material_name = po_item.fabric_name
-            else:
-                ready_material_name = "Ready Material"
 
-            raw_material_name = po_item.greige_name or "-"
-            dyeing_name = po_item.dyeing_name or "-"
-            dyeing_type = po_item.dyeing_type or "-"
-            unit = po_item.unit or "KG"
+def _build_stock_lot_row(inward_item):
+    inward = inward_item.inward
+    po_item = inward_item.po_item
+    po = po_item.po if po_item else None
 
-        vendor_name = po.vendor.name if po and po.vendor else "-"
-        firm_name = po.firm.firm_name if po and po.firm else "-"
-        quantity = inward_item.quantity or Decimal("0")
+    ready_material_name = "Ready Material"
+    raw_material_name = "-"
+    dyeing_name = "-"
+    dyeing_type = "-"
+    unit = "KG"
 
-        rows.append({
-            "stage": "ready",
-            "stage_label": "Ready",
-            "lot_number": inward.inward_number or f"DYEING-{inward.pk}",
-            "lot_date": inward.inward_date,
-            "material_name": ready_material_name,
-            "material_key": _normalize_stock_lot_search_value(ready_material_name),
-            "ready_material_name": ready_material_name,
-            "raw_material_name": raw_material_name,
-            "vendor_name": vendor_name,
-            "firm_name": firm_name,
-            "source_number": po.system_number if po and po.system_number else (po.po_number if po else "-"),
-            "quantity": quantity,
-            "used_quantity": Decimal("0"),
-            "final_stock": quantity,
-            "unit": unit,
-            "remark": inward_item.remark or "",
-            "dyeing_name": dyeing_name,
-            "dyeing_type": dyeing_type,
-            "detail_url": reverse("accounts:dyeingpo_inward", args=[po.pk]) if po else "",
-            "detail_label": "Open Dyeing Inward",
-            "pk": inward_item.pk,
-        })
+    if po_item:
+        if po_item.finished_material:
+            ready_material_name = po_item.finished_material.name
+        elif po_item.fabric_name:
+            ready_material_name = po_item.fabric_name
+        else:
+            ready_material_name = "Ready Material"
+
+        raw_material_name = po_item.greige_name or "-"
+        dyeing_name = po_item.dyeing_name or "-"
+        dyeing_type = po_item.dyeing_type or "-"
+        unit = po_item.unit or "KG"
+
+    vendor_name = po.vendor.name if po and po.vendor else "-"
+    firm_name = po.firm.firm_name if po and po.firm else "-"
+    quantity = inward_item.quantity or Decimal("0")
+
+    return {
+        "stage": "ready",
+        "stage_label": "Ready",
+        "lot_number": inward.inward_number or f"DYEING-{inward.pk}",
+        "lot_date": inward.inward_date,
+        "material_name": ready_material_name,
+        "material_key": _normalize_stock_lot_search_value(ready_material_name),
+        "ready_material_name": ready_material_name,
+        "raw_material_name": raw_material_name,
+        "vendor_name": vendor_name,
+        "firm_name": firm_name,
+        "source_number": po.system_number if po and po.system_number else (po.po_number if po else "-"),
+        "quantity": quantity,
+        "used_quantity": Decimal("0"),
+        "final_stock": quantity,
+        "unit": unit,
+        "remark": inward_item.remark or "",
+        "dyeing_name": dyeing_name,
+        "dyeing_type": dyeing_type,
+        "detail_url": reverse("accounts:dyeingpo_inward", args=[po.pk]) if po else "",
+        "detail_label": "Open Dyeing Inward",
+        "pk": inward_item.pk,
+    }
+
+
+def _stock_lot_row_matches(row, material_key="", q_key=""):
+    if material_key and row["material_key"] != material_key:
+        return False
+    if q_key:
+        haystack = " ".join([
+            row.get("lot_number", ""),
+            row.get("material_name", ""),
+            row.get("vendor_name", ""),
+            row.get("firm_name", ""),
+            row.get("source_number", ""),
+            row.get("remark", ""),
+        ]).lower()
+        return q_key in haystack
+    return True
 
+
+def _build_stock_lot_rows_for_user(user):
+    rows = [_build_stock_lot_row(inward_item) for inward_item in _stock_lot_items_for_user(user)]
     rows.sort(
         key=lambda row: (
             row["lot_date"] or timezone.datetime.min.date(),
@@ -5672,6 +6020,30 @@ def _build_stock_lot_rows_for_user(user):
 def stock_lot_wise(request):
     q = (request.GET.get("q") or "").strip()
     selected_material = (request.GET.get("material") or "").strip()
+    material_key = _normalize_stock_lot_search_value(selected_material) if selected_material else ""
+    q_key = _normalize_stock_lot_search_value(q) if q else ""
+
+    if export_format(request):
+        items = _stock_lot_items_for_user(request.user).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        rows = (_build_stock_lot_row(inward_item) for inward_item in items)
+        return export_response(
+            request,
+            "stock-lot-wise",
+            [
+                "Lot No", "Lot Date", "Stage", "Material", "Raw Material", "Vendor", "Firm", "Source",
+                "Dyeing", "Dyeing Type", "Quantity", "Used", "Final Stock", "Unit", "Remark",
+            ],
+            (
+                (
+                    row["lot_number"], row["lot_date"], row["stage_label"], row["material_name"],
+                    row["raw_material_name"], row["vendor_name"], row["firm_name"], row["source_number"],
+                    row["dyeing_name"], row["dyeing_type"], row["quantity"], row["used_quantity"],
+                    row["final_stock"], row["unit"], row["remark"],
+                )
+                for row in rows
+                if _stock_lot_row_matches(row, material_key, q_key)
+            ),
+        )
 
     all_rows = _build_stock_lot_rows_for_user(request.user)
 
@@ -5684,33 +6056,7 @@ def stock_lot_wise(request):
         key=lambda value: value.lower(),
     )
 
-    rows = all_rows
-
-    if selected_material:
-        material_key = _normalize_stock_lot_search_value(selected_material)
-        rows = [
-            row for row in rows
-            if row["material_key"] == material_key
-        ]
-
-    if q:
-        q_key = _normalize_stock_lot_search_value(q)
-        filtered_rows = []
-
-        for row in rows:
-            haystack = " ".join([
-                row.get("lot_number", ""),
-                row.get("material_name", ""),
-                row.get("vendor_name", ""),
-                row.get("firm_name", ""),
-                row.get("source_number", ""),
-                row.get("remark", ""),
-            ]).lower()
-
-            if q_key in haystack:
-                filtered_rows.append(row)
-
-        rows = filtered_rows
+    rows = [row for row in all_rows if _stock_lot_row_matches(row, material_key, q_key)]
 
     total_lots = len(rows)
     total_quantity = sum((row["quantity"] for row in rows), Decimal("0"))
@@ -5797,6 +6143,7 @@ def dyeing_inward_edit(request, pk: int):
         pk=pk,
     )
     po = inward.po
+    previous_inward_date = inward.inward_date
     if not _is_po_approved_for_inward(po):
         messages.error(request, "Dyeing PO must be approved before inward can be updated.")
         return redirect("accounts:dyeing_inward_tracker")
@@ -5871,7 +6218,7 @@ def dyeing_inward_edit(request, pk: int):
 
             inward.items.all().delete()
 
-            DyeingPOInwardItem.objects.bulk_create([
+            record_changes(DyeingPOInwardItem.objects.bulk_create([
                 DyeingPOInwardItem(
                     inward=inward,
                     po_item=item,
@@ -5879,7 +6226,10 @@ def dyeing_inward_edit(request, pk: int):
                     remark=remark,
                 )
                 for item, qty, remark in line_payload
-            ])
+            ]), "insert")
+            MonthlyCostFact.refresh_for_dates(inward.owner, previous_inward_date, inward.inward_date)
+            _queue_generated_po_sync(inward.owner)
+            _queue_phase2_lot_sync(inward.owner)
 
             messages.success(request, f"Inward {inward.inward_number} updated successfully.")
             tracker_url = reverse("accounts:dyeing_inward_tracker")
@@ -6004,11 +6354,21 @@ def readypo_list(request):
             | Q(firm__firm_name__icontains=q)
         ).distinct()
 
+    orders = cached_rows(
+        request,
+        qs,
+        "accounts/ready_po/_list_card.html",
+        name="ready_po",
+        context_name="po",
+        load=lambda pks: qs.filter(pk__in=pks),
+        children={"items": None, "inwards": "updated_at", "inwards__items": None},
+    )
+
     return render(
         request,
         "accounts/ready_po/list.html",
         {
-            "orders": qs,
+            "orders": orders,
             "q": q,
         },
     )
@@ -6051,6 +6411,11 @@ def readypo_update(request, pk: int):
 
 
 @login_required
+@conditional_document(
+    _reviewable_scope(ReadyPurchaseOrder),
+    fields=("updated_at", "source_dyeing_po__updated_at"),
+    children={"items": None, "inwards": "updated_at", "inwards__items": None, "source_dyeing_po__inwards": "updated_at"},
+)
 def readypo_detail(request, pk: int):
     po = get_object_or_404(_ready_po_queryset(), pk=pk)
     if not _can_access_ready_po(request.user, po):
@@ -6072,7 +6437,9 @@ def readypo_detail(request, pk: int):
 @require_POST
 def readypo_delete(request, pk: int):
     po = get_object_or_404(ReadyPurchaseOrder, pk=pk, owner=request.user)
+    inward_dates = _po_chain_inward_dates(po)
     po.delete()
+    MonthlyCostFact.refresh_for_dates(request.user, *inward_dates)
     return redirect("accounts:readypo_list")
 
 
@@ -6124,7 +6491,7 @@ def readypo_inward(request, pk: int):
             inward.inward_number = _next_ready_inward_number()
             inward.save()
 
-            ReadyPOInwardItem.objects.bulk_create([
+            record_changes(ReadyPOInwardItem.objects.bulk_create([
                 ReadyPOInwardItem(
                     inward=inward,
                     po_item=item,
@@ -6132,7 +6499,8 @@ def readypo_inward(request, pk: int):
                     remark=remark,
                 )
                 for item, qty, remark in line_payload
-            ])
+            ]), "insert")
+            MonthlyCostFact.refresh_for_dates(inward.owner, inward.inward_date)
             return redirect("accounts:readypo_inward", pk=po.pk)
 
     line_rows = [
@@ -6294,9 +6662,9 @@ def _materialunit_list_url(request):
 def materialunit_list_create(request):
     q = (request.GET.get("q") or "").strip()
 
-    units = MaterialUnit.objects.filter(owner=request.user).order_by("name")
+    units = master_instances(request.user, "units")
     if q:
-        units = units.filter(name__icontains=q)
+        units = [unit for unit in units if q.casefold() in unit.name.casefold()]
 
     if request.method == "POST":
         form = MaterialUnitForm(request.POST, user=request.user)
@@ -6391,9 +6759,9 @@ def _termscondition_list_url(request):
 def expense_list_create(request):
     q = (request.GET.get("q") or "").strip()
 
-    expenses = Expense.objects.filter(owner=request.user).order_by("name")
+    expenses = master_instances(request.user, "expenses")
     if q:
-        expenses = expenses.filter(name__icontains=q)
+        expenses = [expense for expense in expenses if q.casefold() in expense.name.casefold()]
 
     if request.method == "POST":
         form = ExpenseForm(request.POST, user=request.user)
@@ -6562,9 +6930,9 @@ def accessory_delete(request, pk: int):
 def dyeing_other_charge_list(request):
     q = (request.GET.get("q") or "").strip()
 
-    charges = DyeingOtherCharge.objects.filter(owner=request.user).order_by("name")
+    charges = master_instances(request.user, "dyeing_other_charges")
     if q:
-        charges = charges.filter(name__icontains=q)
+        charges = [charge for charge in charges if q.casefold() in charge.name.casefold()]
 
     template = (
         "accounts/dyeing_other_charges/list_embed.html"
@@ -7392,6 +7760,7 @@ def greigepo_review(request, pk: int):
                 "rejection_reason",
                 "reviewed_by",
                 "reviewed_at",
+                "updated_at",
             ])
 
             if embed_mode:
@@ -7490,6 +7859,7 @@ def dyeingpo_review(request, pk: int):
                 "rejection_reason",
                 "reviewed_by",
                 "reviewed_at",
+                "updated_at",
             ])
 
             if embed_mode:
@@ -7517,6 +7887,116 @@ def dyeingpo_review(request, pk: int):
 
     return render(request, template_name, context)
 
+
+PO_BATCH_REVIEW_LIMIT = 500
+PO_BATCH_REVIEW_KINDS = {
+    "yarn": (YarnPurchaseOrder, "Yarn"),
+    "greige": (GreigePurchaseOrder, "Greige"),
+    "dyeing": (DyeingPurchaseOrder, "Dyeing"),
+}
+PO_BATCH_REVIEW_FIELDS = ("approval_status", "rejection_reason", "reviewed_by", "reviewed_at", "updated_at")
+
+
+def _apply_po_batch_review(model, ids, decision, rejection_reason, reviewer):
+    # Header rows only; the item/inward prefetch trees the single review pages
+    # load are not needed to change the review fields. Only POs still pending
+    # are touched, so a resubmitted or overlapping batch is harmless.
+    reviewed_at = timezone.now()
+    with transaction.atomic():
+        pos = list(
+            model.objects.select_for_update()
+            .filter(pk__in=ids, approval_status="pending")
+            .only("id", *PO_BATCH_REVIEW_FIELDS)
+        )
+        for po in pos:
+            po.approval_status = "approved" if decision == "approve" else "rejected"
+            po.rejection_reason = "" if decision == "approve" else rejection_reason
+            po.reviewed_by = reviewer
+            po.reviewed_at = reviewed_at
+            # bulk_update() skips auto_now, so updated_at is set here.
+            po.updated_at = reviewed_at
+        if pos:
+            model.objects.bulk_update(pos, PO_BATCH_REVIEW_FIELDS, batch_size=PO_BATCH_REVIEW_LIMIT)
+            record_changes(pos, "update")
+
+    updated_ids = {po.pk for po in pos}
+    return {
+        "requested": len(ids),
+        "updated": len(updated_ids),
+        "updated_ids": sorted(updated_ids),
+        "skipped_ids": [pk for pk in ids if pk not in updated_ids],
+    }
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def po_batch_review(request):
+    if not _can_review_yarn_po(request.user):
+        raise PermissionDenied("You are not allowed to review POs.")
+
+    kind = request.POST.get("kind") or request.GET.get("kind") or "yarn"
+    if kind not in PO_BATCH_REVIEW_KINDS:
+        kind = "yarn"
+    model, label = PO_BATCH_REVIEW_KINDS[kind]
+    page_url = f"{reverse('accounts:po_batch_review')}?kind={kind}"
+
+    if request.method == "POST":
+        form = POBatchReviewForm(request.POST, max_batch=PO_BATCH_REVIEW_LIMIT)
+        if not form.is_valid():
+            error = _first_form_error(form)
+            if _is_embed(request):
+                return JsonResponse({"ok": False, "error": error["message"], "field": error["field"]}, status=400)
+            messages.error(request, error["message"])
+            return redirect(page_url)
+
+        decision = form.cleaned_data["decision"]
+        summary = _apply_po_batch_review(
+            model,
+            form.cleaned_data["po_ids"],
+            decision,
+            form.cleaned_data["rejection_reason"].strip(),
+            request.user,
+        )
+        verb = "approved" if decision == "approve" else "rejected"
+        message = f"{summary['updated']} {label} PO(s) {verb}."
+        if summary["skipped_ids"]:
+            message += f" {len(summary['skipped_ids'])} skipped (already reviewed or missing)."
+
+        if _is_embed(request):
+            return JsonResponse({"ok": True, "message": message, "kind": kind, "decision": decision, **summary})
+        messages.success(request, message)
+        return redirect(page_url)
+
+    pending = (
+        model.objects.filter(approval_status="pending")
+        .order_by("po_date", "id")
+        .values(
+            "id",
+            "system_number",
+            "po_number",
+            "po_date",
+            "vendor__name",
+            "firm__firm_name",
+            "owner__username",
+            "created_at",
+        )
+    )
+    pending_count = pending.count()
+
+    return render(
+        request,
+        "accounts/po_review/batch.html",
+        {
+            "kind": kind,
+            "kind_label": label,
+            "kinds": POBatchReviewForm.KIND_CHOICES,
+            "rows": list(pending[:PO_BATCH_REVIEW_LIMIT]),
+            "pending_count": pending_count,
+            "batch_limit": PO_BATCH_REVIEW_LIMIT,
+            "form": POBatchReviewForm(initial={"kind": kind}),
+        },
+    )
+
 def _bom_list_url(request):
     url = reverse("accounts:bom_list")
     if _is_embed(request):
@@ -7862,7 +8342,7 @@ def _bom_preview_image_url(bom):
     for attr in ("image", "photo", "photo_update", "product_image"):
         field = getattr(bom, attr, None)
         if field and getattr(field, "name", None) and getattr(field, "url", None):
-            return field.url
+            return image_url(field, "thumb")
 
     # 2) child image rows under BOM
     images_manager = getattr(bom, "images", None)
@@ -7872,7 +8352,7 @@ def _bom_preview_image_url(bom):
                 for attr in ("image", "photo", "file"):
                     field = getattr(img, attr, None)
                     if field and getattr(field, "name", None) and getattr(field, "url", None):
-                        return field.url
+                        return image_url(field, "thumb")
         except Exception:
             pass
 
@@ -8007,7 +8487,7 @@ def program_create(request):
         program.program_no = Program.next_program_no(request.user)
         program.program_date = timezone.localdate()
 
-        user_firm = Firm.objects.filter(owner=request.user).first()
+        user_firm = owner_default_firm(request.user)
         if user_firm:
             program.firm = user_firm
 
@@ -8158,7 +8638,36 @@ def program_list(request):
             | Q(firm__firm_name__icontains=q)
         )
 
-    programs = list(qs)
+    if export_format(request):
+        rows = (
+            qs.prefetch_related(None)
+            .values_list(
+                "program_no", "program_date", "finishing_date", "bom__sku", "bom__product_name",
+                "firm__firm_name", "total_qty", "ratio", "status", "is_verified", "damage",
+            )
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return export_response(
+            request,
+            "programs",
+            [
+                "Program No", "Program Date", "Finishing Date", "SKU", "Product", "Firm",
+                "Total Qty", "Ratio", "Status", "Verified", "Damage",
+            ],
+            rows,
+        )
+
+    programs = cached_rows(
+        request,
+        qs,
+        "accounts/programs/_list_card.html",
+        name="program",
+        context_name="program",
+        load=lambda pks: qs.filter(pk__in=pks),
+        attrs=("created_at", "is_verified"),
+        fields=("updated_at", "bom__updated_at", "start_record__updated_at"),
+        children={"jobber_rows": None, "size_rows": None, "bom__images": None},
+    )
     verified_count = sum(1 for program in programs if program.is_verified)
     unverified_count = len(programs) - verified_count
 
@@ -8179,7 +8688,7 @@ def program_list(request):
 def program_toggle_verify(request, pk: int):
     program = get_object_or_404(Program, pk=pk, owner=request.user)
     program.is_verified = not program.is_verified
-    program.save(update_fields=["is_verified"])
+    program.save(update_fields=["is_verified", "updated_at"])
     messages.success(
         request,
         f"Program {'verified' if program.is_verified else 'marked unverified'} successfully."
@@ -8192,12 +8701,17 @@ def program_toggle_verify(request, pk: int):
 def program_toggle_status(request, pk: int):
     program = get_object_or_404(Program, pk=pk, owner=request.user)
     program.status = "closed" if program.status == "open" else "open"
-    program.save(update_fields=["status"])
+    program.save(update_fields=["status", "updated_at"])
     messages.success(request, f"Program marked {program.status}.")
     return redirect("accounts:program_list")
 
 
 @login_required
+@conditional_document(
+    _owner_scope(Program),
+    fields=("updated_at", "bom__updated_at"),
+    children={"jobber_rows": None, "size_rows": None, "bom__images": None},
+)
 def program_print(request, pk: int):
     program = get_object_or_404(
         Program.objects.select_related("bom", "firm").prefetch_related(
@@ -8271,6 +8785,22 @@ def dispatch_list(request):
             | Q(driver_name__icontains=q)
         )
 
+    if export_format(request):
+        rows = challans.values_list(
+            "challan_no", "challan_date", "program__program_no", "program__bom__sku",
+            "program__bom__product_name", "client__name", "firm__firm_name", "driver_name",
+            "lr_no", "transport_name", "vehicle_no", "remarks",
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(
+            request,
+            "dispatch-challans",
+            [
+                "Challan No", "Challan Date", "Program", "SKU", "Product", "Client", "Firm",
+                "Driver", "LR No", "Transport", "Vehicle No", "Remarks",
+            ],
+            rows,
+        )
+
     template = (
         "accounts/dispatch/list_embed.html"
         if _is_embed(request)
@@ -8381,6 +8911,7 @@ def dispatch_create(request, program_id: int):
 
 
 @login_required
+@conditional_document(_dispatch_scope, fields=("updated_at", "program__updated_at", "program__bom__updated_at", "client__updated_at"))
 def dispatch_detail(request, pk: int):
     if not _dispatch_feature_available():
         return _dispatch_feature_unavailable_response(request)
@@ -8459,7 +8990,7 @@ def _build_dispatch_challan_pdf_response(challan):
         firm = challan.firm
         if firm and getattr(firm, "logo", None):
             try:
-                logo_path = firm.logo.path
+                logo_path = image_path(firm.logo, "print")
                 if logo_path and os.path.exists(logo_path):
                     return logo_path
             except Exception:
@@ -8875,6 +9406,7 @@ def _build_dispatch_challan_pdf_response(challan):
     return response
 
 @login_required
+@conditional_document(_dispatch_scope, fields=("updated_at", "program__updated_at", "program__bom__updated_at", "client__updated_at"))
 def dispatch_print(request, pk: int):
     if not _dispatch_feature_available():
         return _dispatch_feature_unavailable_response(request)
@@ -8891,13 +9423,17 @@ def dispatch_print(request, pk: int):
         owner=request.user,
     )
 
+    if request.GET.get("background") == "1":
+        return _queue_document_pdf(
+            request, "dispatch_challan", challan.pk, f'{challan.challan_no or "dispatch_challan"}.pdf'
+        )
+
     response = _build_dispatch_challan_pdf_response(challan)
 
     if response.status_code == 200 and response.get("Content-Type", "").startswith("application/pdf"):
         filename = f'{challan.challan_no or "dispatch_challan"}.pdf'
         disposition = "attachment" if request.GET.get("download") == "1" else "inline"
         response["Content-Disposition"] = f'{disposition}; filename="{filename}"'
-        response["Cache-Control"] = "no-store"
         response["X-Content-Type-Options"] = "nosniff"
         try:
             response["Content-Length"] = str(len(response.content))
@@ -9060,9 +9596,54 @@ def dyeing_material_link_delete(request, pk: int):
 # ==========================================================
 # PHASE 2 - PROGRAM EXECUTION / QC / LOT / QR / COSTING
 # ==========================================================
+def _queue_phase2_lot_sync(owner, priority=0):
+    return enqueue(
+        "sync_phase2_lots",
+        owner=owner,
+        priority=priority,
+        dedupe_key=f"sync_phase2_lots:{owner.pk}",
+    )
+
+
+def _phase2_lots_stale(owner):
+    # Inwards saved since the last finished sync started (or any inward at all
+    # when no sync is on record) still have to reach their lots.
+    last_sync = (
+        BackgroundJob.objects.filter(owner=owner, task="sync_phase2_lots", status="done")
+        .order_by("-started_at")
+        .values_list("started_at", flat=True)
+        .first()
+    )
+    inwards = DyeingPOInward.objects.filter(owner=owner)
+    if last_sync is not None:
+        inwards = inwards.filter(updated_at__gte=last_sync)
+    return inwards.exists()
+
+
+_PHASE2_LOT_SYNC_FIELDS = (
+    "owner_id", "stage", "material_id", "unit", "dyeing_inward_item_id", "dye_lot_no", "batch_no",
+    "shade_reference", "received_qty", "accepted_qty", "rejected_qty", "hold_qty", "qc_status",
+)
+
+
 def _sync_phase2_lots_from_dyeing(owner):
     created = 0
-    for item in DyeingPOInwardItem.objects.filter(inward__owner=owner):
+    movements = []
+    roll_qc_lot_ids = set(
+        InventoryRoll.objects.filter(lot__owner=owner).exclude(status="pending").values_list("lot_id", flat=True)
+    )
+    # What each lot has already taken in from its dyeing inward. Only the change
+    # since then is posted, so manual receipts and adjustments on a lot stand.
+    synced_qty = dict(
+        InventoryMovement.objects.filter(
+            owner=owner, ref_model="DyeingPOInward", movement_type__in=["receipt", "adjustment"]
+        )
+        .values("lot_id")
+        .annotate(total=Sum("quantity"))
+        .values_list("lot_id", "total")
+        .order_by()
+    )
+    for item in DyeingPOInwardItem.objects.filter(inward__owner=owner).select_related("inward", "po_item"):
         accepted = item.accepted_qty or Decimal("0")
         if accepted <= 0:
             continue
@@ -9082,7 +9663,18 @@ def _sync_phase2_lots_from_dyeing(owner):
                 "qc_status": item.qc_status or "pending",
             },
         )
-        if not was_created:
+        if was_created:
+            movements.append(InventoryMovement.build(
+                lot, "receipt", accepted,
+                movement_date=item.inward.inward_date,
+                ref_model="DyeingPOInward",
+                ref_number=item.inward.inward_number,
+            ))
+        elif lot.id in roll_qc_lot_ids:
+            # Roll-level QC owns the quantities of this lot once any roll has been graded.
+            continue
+        else:
+            before = [getattr(lot, field) for field in _PHASE2_LOT_SYNC_FIELDS]
             lot.owner = owner
             lot.stage = "ready"
             lot.material = material
@@ -9092,28 +9684,166 @@ def _sync_phase2_lots_from_dyeing(owner):
             lot.batch_no = item.batch_no or lot.batch_no
             lot.shade_reference = item.shade_reference or lot.shade_reference
             lot.received_qty = item.received_qty or item.quantity or Decimal("0")
-            lot.accepted_qty = accepted
             lot.rejected_qty = item.rejected_qty or Decimal("0")
             lot.hold_qty = item.hold_qty or Decimal("0")
             lot.qc_status = item.qc_status or "pending"
-            lot.save()
+            synced = synced_qty.get(lot.id)
+            if synced is None:
+                # Lot made before stock movements were recorded: open its ledger first.
+                openings = InventoryLot.opening_movements([lot])
+                movements.extend(openings)
+                synced = sum(
+                    (m.quantity for m in openings if m.ref_model == "DyeingPOInward"), Decimal("0")
+                )
+            delta = accepted - synced
+            lot.accepted_qty = (lot.accepted_qty or Decimal("0")) + delta
+            # Unchanged lots are not saved: a save bumps updated_at and writes a change-feed event.
+            if [getattr(lot, field) for field in _PHASE2_LOT_SYNC_FIELDS] != before:
+                lot.save()
+            if delta:
+                movements.append(InventoryMovement.build(
+                    lot, "adjustment", delta,
+                    ref_model="DyeingPOInward",
+                    ref_number=item.inward.inward_number,
+                    remarks="Accepted quantity changed on dyeing inward.",
+                ))
         if was_created:
             created += 1
+    InventoryMovement.post_many(movements)
     return created
 
 @login_required
 def inventory_lot_list(request):
-    _sync_phase2_lots_from_dyeing(request.user)
+    lot_sync = None
+    if not export_format(request) and _phase2_lots_stale(request.user):
+        lot_sync = _queue_phase2_lot_sync(request.user, priority=1)
+        # An eager job has already run by now.
+        lot_sync.refresh_from_db()
     q = (request.GET.get("q") or "").strip()
     qs = InventoryLot.objects.filter(owner=request.user).select_related("material").order_by("-id")
     if q:
         qs = qs.filter(Q(lot_code__icontains=q) | Q(material__name__icontains=q) | Q(dye_lot_no__icontains=q) | Q(batch_no__icontains=q))
-    return render(request, "accounts/inventory/lot_list.html", {"lots": qs, "q": q})
+    if export_format(request):
+        rows = qs.values_list(
+            "lot_code", "stage", "material__name", "unit", "dye_lot_no", "batch_no", "shade_reference",
+            "location_name", "received_qty", "accepted_qty", "rejected_qty", "hold_qty", "used_qty",
+            "available_qty", "qc_status", "is_closed",
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(
+            request,
+            "inventory-lots",
+            [
+                "Lot Code", "Stage", "Material", "Unit", "Dye Lot", "Batch", "Shade", "Location",
+                "Received", "Accepted", "Rejected", "Hold", "Used", "Available", "QC Status", "Closed",
+            ],
+            rows,
+        )
+    return render(request, "accounts/inventory/lot_list.html", {"lots": qs, "q": q, "lot_sync": lot_sync})
 
 @login_required
 def inventory_lot_detail(request, pk):
     lot = get_object_or_404(InventoryLot.objects.filter(owner=request.user).select_related("material"), pk=pk)
-    return render(request, "accounts/inventory/lot_detail.html", {"lot": lot})
+    return render(request, "accounts/inventory/lot_detail.html", {
+        "lot": lot,
+        "movements": lot.movements.order_by("-movement_date", "-id")[:50],
+        "movement_form": InventoryMovementForm(lot=lot),
+    })
+
+
+@login_required
+@require_POST
+def inventory_lot_movement_create(request, pk):
+    with transaction.atomic():
+        lot = get_object_or_404(InventoryLot.objects.select_for_update().filter(owner=request.user), pk=pk)
+        form = InventoryMovementForm(request.POST, lot=lot)
+        if not form.is_valid():
+            messages.error(request, _first_form_error(form)["message"])
+            return redirect("accounts:inventory_lot_detail", pk=lot.pk)
+
+        movement_type = form.cleaned_data["movement_type"]
+        quantity = form.cleaned_data["quantity"] or Decimal("0")
+        common = {
+            "movement_date": form.cleaned_data["movement_date"],
+            "ref_model": "InventoryLot",
+            "ref_number": lot.lot_code,
+            "remarks": form.cleaned_data["remarks"] or "",
+        }
+
+        if movement_type == "transfer":
+            destination = form.cleaned_data["location_name"]
+            movements = [
+                InventoryMovement.build(lot, "transfer", -quantity, **common),
+                InventoryMovement.build(lot, "transfer", quantity, location_name=destination, **common),
+            ]
+            lot.location_name = destination
+        else:
+            movements = [InventoryMovement.build(lot, movement_type, quantity, **common)]
+            if movement_type in ("issue", "dispatch"):
+                lot.used_qty = (lot.used_qty or Decimal("0")) + quantity
+            elif movement_type == "return":
+                lot.used_qty = (lot.used_qty or Decimal("0")) - quantity
+            else:
+                lot.accepted_qty = (lot.accepted_qty or Decimal("0")) + quantity
+
+        lot.save()
+        InventoryMovement.post_many(movements)
+
+    messages.success(request, f"{dict(MOVEMENT_TYPE_CHOICES)[movement_type]} posted for lot {lot.lot_code}.")
+    return redirect("accounts:inventory_lot_detail", pk=lot.pk)
+
+
+@login_required
+@require_GET
+def inventory_stock_as_of(request):
+    raw_date = (request.GET.get("date") or "").strip()
+    group_by = (request.GET.get("group_by") or "lot").strip()
+    if group_by not in ("lot", "material", "location"):
+        return JsonResponse({"ok": False, "message": "group_by must be lot, material or location."}, status=400)
+    try:
+        as_of_date = date.fromisoformat(raw_date) if raw_date else timezone.localdate()
+    except ValueError:
+        return JsonResponse({"ok": False, "message": "Date must be in YYYY-MM-DD format."}, status=400)
+
+    lot_id = (request.GET.get("lot") or "").strip()
+    material_id = (request.GET.get("material") or "").strip()
+    if (lot_id and not lot_id.isdigit()) or (material_id and not material_id.isdigit()):
+        return JsonResponse({"ok": False, "message": "lot and material must be ids."}, status=400)
+
+    lot = material = None
+    if lot_id:
+        lot = get_object_or_404(InventoryLot, pk=lot_id, owner=request.user)
+    if material_id:
+        material = get_object_or_404(Material, pk=material_id)
+    location_name = request.GET.get("location")
+
+    balances, checkpoint_date, tail_count = InventoryBalanceCheckpoint.balances_as_of(
+        request.user,
+        as_of_date,
+        group_by=group_by,
+        lot=lot,
+        material=material,
+        location_name=location_name,
+    )
+
+    labels = {}
+    if group_by == "lot":
+        labels = dict(InventoryLot.objects.filter(pk__in=balances.keys()).values_list("id", "lot_code"))
+    elif group_by == "material":
+        labels = dict(Material.objects.filter(pk__in=balances.keys()).values_list("id", "name"))
+
+    rows = [
+        {"key": key, "label": labels.get(key, key) or "-", "balance_qty": str(balance.quantize(Decimal("0.01")))}
+        for key, balance in sorted(balances.items(), key=lambda pair: str(labels.get(pair[0], pair[0])))
+    ]
+    return JsonResponse({
+        "ok": True,
+        "as_of_date": as_of_date.isoformat(),
+        "group_by": group_by,
+        "checkpoint_date": checkpoint_date.isoformat() if checkpoint_date else None,
+        "tail_movements": tail_count,
+        "total_qty": str(sum(balances.values(), Decimal("0")).quantize(Decimal("0.01"))),
+        "rows": rows,
+    })
 
 @login_required
 @require_http_methods(["GET", "POST"])
@@ -9139,9 +9869,108 @@ def quality_check_create(request):
         return redirect("accounts:quality_check_detail", pk=qc.pk)
     return render(request, "accounts/qc/form.html", {"form": form, "formset_params": formset_params, "formset_defects": formset_defects, "mode": "add"})
 
+def _roll_qc_parameters(cleaned, batch):
+    tolerance = batch.get("tolerance_percent") or Decimal("0")
+    parameters = []
+    for field, label in (("width", "Width"), ("gsm", "GSM")):
+        actual = cleaned.get(field)
+        if actual is None:
+            continue
+        expected = batch.get(f"expected_{field}")
+        is_pass = True
+        if expected:
+            is_pass = abs(actual - expected) <= expected * tolerance / Decimal("100")
+        parameters.append({
+            "parameter_name": label,
+            "expected_value": str(expected) if expected else "",
+            "actual_value": str(actual),
+            "tolerance": f"{tolerance}%" if expected else "",
+            "is_pass": is_pass,
+        })
+    return parameters
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def inventory_lot_roll_qc(request, pk):
+    lot = get_object_or_404(InventoryLot.objects.filter(owner=request.user).select_related("material"), pk=pk)
+    rolls = list(lot.rolls.all())
+    rolls_by_id = {roll.id: roll for roll in rolls}
+    initial = [
+        {"roll_id": roll.id, "status": roll.status, "accepted_qty": roll.accepted_qty, "width": roll.width, "gsm": roll.gsm, "severity": "low"}
+        for roll in rolls
+    ]
+    batch_form = RollQCBatchForm(request.POST or None)
+    formset = RollQCFormSet(request.POST or None, initial=initial, prefix="rolls", form_kwargs={"rolls": rolls_by_id})
+
+    if request.method == "POST" and batch_form.is_valid() and formset.is_valid():
+        batch = batch_form.cleaned_data
+        results = []
+        for form in formset:
+            cleaned = form.cleaned_data
+            roll = cleaned["roll"]
+            if cleaned["status"] == "pending":
+                continue
+            unchanged = (
+                cleaned["status"] == roll.status
+                and cleaned["accepted_qty"] == roll.accepted_qty
+                and cleaned.get("width") == roll.width
+                and cleaned.get("gsm") == roll.gsm
+                and not cleaned.get("defect_name")
+            )
+            if unchanged:
+                continue
+            defects = []
+            if cleaned.get("defect_name"):
+                defects.append({
+                    "defect_name": cleaned["defect_name"],
+                    "severity": cleaned.get("severity") or "low",
+                    "affected_qty": roll.qc_qty - cleaned["accepted_qty"],
+                    "remarks": cleaned.get("remarks") or "",
+                })
+            results.append({
+                "roll": roll,
+                "status": cleaned["status"],
+                "accepted_qty": cleaned["accepted_qty"],
+                "width": cleaned.get("width"),
+                "gsm": cleaned.get("gsm"),
+                "remarks": cleaned.get("remarks") or "",
+                "parameters": _roll_qc_parameters(cleaned, batch),
+                "defects": defects,
+            })
+        if not results:
+            messages.info(request, "No roll results changed.")
+            return redirect("accounts:inventory_lot_roll_qc", pk=lot.pk)
+        with transaction.atomic():
+            lot = InventoryLot.objects.select_for_update().get(pk=lot.pk)
+            QualityCheck.record_roll_results(
+                lot, results,
+                inspected_by=request.user,
+                inspection_date=batch["inspection_date"],
+            )
+        messages.success(request, f"Recorded QC for {len(results)} rolls. Lot {lot.lot_code} is now {lot.get_qc_status_display()}.")
+        return redirect("accounts:inventory_lot_detail", pk=lot.pk)
+
+    return render(request, "accounts/qc/roll_grid.html", {
+        "lot": lot,
+        "batch_form": batch_form,
+        "formset": formset,
+        "rows": list(zip(rolls, formset)),
+    })
+
 @login_required
 def quality_check_list(request):
     qs = QualityCheck.objects.filter(owner=request.user).select_related("lot", "roll").order_by("-inspection_date", "-id")
+    if export_format(request):
+        rows = qs.values_list(
+            "qc_number", "stage", "lot__lot_code", "roll__roll_no", "inspection_date", "status", "result", "remarks",
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(
+            request,
+            "quality-checks",
+            ["QC No", "Stage", "Lot", "Roll", "Inspection Date", "Status", "Result", "Remarks"],
+            rows,
+        )
     return render(request, "accounts/qc/list.html", {"checks": qs})
 
 @login_required
@@ -9164,6 +9993,261 @@ def qr_code_create(request):
         return redirect("accounts:qr_code_detail", pk=qr.pk)
     return render(request, "accounts/qr/form.html", {"form": form})
 
+ROLL_SCAN_BATCH_LIMIT = 1000
+
+
+def _scan_decimal(value, field_name, required=False):
+    if value in (None, ""):
+        if required:
+            raise ValueError(f"{field_name} is required.")
+        return None
+    try:
+        number = Decimal(str(value)).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"{field_name} must be a number.")
+    if number < 0:
+        raise ValueError(f"{field_name} cannot be negative.")
+    return number
+
+
+@login_required
+@require_POST
+def inventory_roll_scan_batch(request):
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"ok": False, "message": "Request body must be JSON."}, status=400)
+    scans = payload.get("scans") if isinstance(payload, dict) else None
+    if not isinstance(scans, list) or not scans:
+        return JsonResponse({"ok": False, "message": "Send a non-empty scans list."}, status=400)
+    if len(scans) > ROLL_SCAN_BATCH_LIMIT:
+        return JsonResponse({"ok": False, "message": f"Send at most {ROLL_SCAN_BATCH_LIMIT} scans per batch."}, status=400)
+
+    lot_refs = {str(scan.get("lot") or "").strip() for scan in scans if isinstance(scan, dict)}
+    lot_refs.discard("")
+    lot_ids = {int(ref) for ref in lot_refs if ref.isdigit()}
+
+    with transaction.atomic():
+        lots = list(
+            InventoryLot.objects.filter(owner=request.user)
+            .filter(Q(pk__in=lot_ids) | Q(lot_code__in=lot_refs))
+            .only("id", "lot_code", "is_closed")
+        )
+        lots_by_ref = {}
+        for lot in lots:
+            lots_by_ref[str(lot.pk)] = lot
+            lots_by_ref[lot.lot_code] = lot
+        taken = set(
+            InventoryRoll.objects.filter(lot__in=lots).values_list("lot_id", "roll_no")
+        )
+
+        results = []
+        rolls = []
+        for index, scan in enumerate(scans):
+            result = {"index": index, "ok": False}
+            results.append(result)
+            if not isinstance(scan, dict):
+                result["error"] = "Scan must be an object."
+                continue
+
+            lot = lots_by_ref.get(str(scan.get("lot") or "").strip())
+            roll_no = str(scan.get("roll_no") or "").strip()[:50]
+            result["roll_no"] = roll_no
+            if lot is None:
+                result["error"] = "Lot not found."
+                continue
+            if lot.is_closed:
+                result["error"] = f"Lot {lot.lot_code} is closed."
+                continue
+            if not roll_no:
+                result["error"] = "roll_no is required."
+                continue
+            if (lot.pk, roll_no) in taken:
+                result["error"] = f"Roll {roll_no} already exists in lot {lot.lot_code}."
+                continue
+            try:
+                roll = InventoryRoll(
+                    lot=lot,
+                    roll_no=roll_no,
+                    length_qty=_scan_decimal(scan.get("length"), "length", required=True),
+                    weight_qty=_scan_decimal(scan.get("weight"), "weight") or Decimal("0"),
+                    gsm=_scan_decimal(scan.get("gsm"), "gsm"),
+                    width=_scan_decimal(scan.get("width"), "width"),
+                )
+            except ValueError as exc:
+                result["error"] = str(exc)
+                continue
+
+            taken.add((lot.pk, roll_no))
+            result["lot_code"] = lot.lot_code
+            rolls.append((result, roll))
+
+        if rolls:
+            InventoryRoll.objects.bulk_create([roll for _, roll in rolls], batch_size=500)
+            codes = next_qr_code_numbers(len(rolls))
+            qr_rows = []
+            for (result, roll), code in zip(rolls, codes):
+                qr_rows.append(QRCodeRecord(
+                    owner=request.user,
+                    qr_code=code,
+                    lot_id=roll.lot_id,
+                    roll=roll,
+                    qr_type="roll",
+                    payload_url=reverse("accounts:inventory_lot_detail", args=[roll.lot_id]),
+                ))
+                result.update({"ok": True, "roll_id": roll.pk, "qr_code": code})
+            QRCodeRecord.objects.bulk_create(qr_rows, batch_size=500)
+
+    created = len(rolls)
+    return JsonResponse({
+        "ok": created == len(scans),
+        "created": created,
+        "failed": len(scans) - created,
+        "results": results,
+    }, status=200 if created else 400)
+
+
+QR_LABEL_CACHE_DIR = "qr_labels"
+QR_LABEL_INLINE_LIMIT = 64
+
+
+def _render_qr_png(content):
+    from PIL import Image
+    from reportlab.graphics.barcode import qrencoder
+
+    qr = qrencoder.QRCode(None, qrencoder.QRErrorCorrectLevel.M)
+    qr.addData(content)
+    qr.make()
+
+    scale, border = 2, 4
+    size = qr.getModuleCount() + border * 2
+    image = Image.new("1", (size, size), 1)
+    image.putdata([
+        0 if 0 <= row - border < qr.getModuleCount() and 0 <= col - border < qr.getModuleCount() and qr.modules[row - border][col - border] else 1
+        for row in range(size)
+        for col in range(size)
+    ])
+    image = image.resize((size * scale, size * scale), Image.NEAREST)
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _qr_label_images(records, base_url):
+    import hashlib
+    import os
+    from urllib.parse import urljoin
+    from django.conf import settings
+
+    cache_dir = os.path.join(settings.MEDIA_ROOT, QR_LABEL_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    paths = {}
+    for record in records:
+        content = urljoin(base_url, record.payload_url) if record.payload_url else record.qr_code
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+        path = os.path.join(cache_dir, f"{record.qr_code}-{digest}.png")
+        paths[record.pk] = path
+        if not os.path.exists(path):
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as handle:
+                handle.write(_render_qr_png(content))
+            os.replace(temp_path, path)
+    return paths
+
+
+def _qr_label_target(scope, pk, **filters):
+    if scope == "lot":
+        lot = get_object_or_404(InventoryLot, pk=pk, **filters)
+        return lot, lot.lot_code
+    inward = get_object_or_404(DyeingPOInward, pk=pk, **filters)
+    return inward, inward.inward_number
+
+
+def _qr_label_records(scope, target):
+    records = QRCodeRecord.objects.filter(owner_id=target.owner_id).select_related("lot", "roll")
+    if scope == "lot":
+        records = records.filter(lot=target)
+    else:
+        records = records.filter(lot__dyeing_inward_item__inward=target)
+    return list(records.order_by("lot_id", "roll_id", "id"))
+
+
+def _build_qr_label_sheet_response(records, title, base_url):
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import mm
+        from reportlab.pdfgen import canvas
+    except ImportError:
+        return HttpResponse(
+            "ReportLab is required for PDF generation. Install it with: pip install reportlab",
+            status=500,
+        )
+
+    image_paths = _qr_label_images(records, base_url)
+
+    columns, rows = 3, 8
+    page_width, page_height = A4
+    margin_x, margin_y = 8 * mm, 10 * mm
+    cell_width = (page_width - margin_x * 2) / columns
+    cell_height = (page_height - margin_y * 2) / rows
+    qr_size = cell_height - 6 * mm
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle(f"QR Labels - {title}")
+    per_page = columns * rows
+    for index, record in enumerate(records):
+        if index and index % per_page == 0:
+            pdf.showPage()
+        slot = index % per_page
+        x = margin_x + (slot % columns) * cell_width
+        y = page_height - margin_y - (slot // columns + 1) * cell_height
+
+        pdf.setLineWidth(0.3)
+        pdf.rect(x + 1 * mm, y + 1 * mm, cell_width - 2 * mm, cell_height - 2 * mm)
+        pdf.drawImage(image_paths[record.pk], x + 3 * mm, y + 3 * mm, qr_size, qr_size)
+
+        text_x = x + qr_size + 5 * mm
+        text_y = y + cell_height - 9 * mm
+        pdf.setFont("Helvetica-Bold", 9)
+        pdf.drawString(text_x, text_y, record.qr_code)
+        pdf.setFont("Helvetica", 8)
+        lines = [f"Lot: {record.lot.lot_code}" if record.lot_id else ""]
+        if record.roll_id:
+            lines.append(f"Roll: {record.roll.roll_no}")
+            lines.append(f"Len: {record.roll.length_qty}")
+        for offset, line in enumerate(line for line in lines if line):
+            pdf.drawString(text_x, text_y - (offset + 1) * 4 * mm, line[:24])
+    pdf.save()
+
+    response = HttpResponse(buffer.getvalue(), content_type="application/pdf")
+    response["Content-Disposition"] = f'inline; filename="qr-labels-{title}.pdf"'
+    return response
+
+
+@login_required
+@require_GET
+def qr_label_sheet(request, scope, pk):
+    target, title = _qr_label_target(scope, pk, owner=request.user)
+    records = _qr_label_records(scope, target)
+    if not records:
+        messages.error(request, f"No QR codes found for {title}.")
+        return redirect("accounts:inventory_lot_list")
+
+    base_url = request.build_absolute_uri("/")
+    if request.GET.get("background") == "1" or len(records) > QR_LABEL_INLINE_LIMIT:
+        # Large sheets are rendered by the job queue, not on the request worker.
+        job = _enqueue_document_pdf(request, f"qr_labels_{scope}", target.pk, f"qr-labels-{title}.pdf", base_url=base_url)
+        job.refresh_from_db()
+        if job.status == "done" and request.GET.get("background") != "1":
+            return redirect("accounts:job_file", pk=job.pk)
+        return JsonResponse({"ok": True, "job": job_payload(job)}, status=202)
+
+    return _build_qr_label_sheet_response(records, title, base_url)
+
+
 @login_required
 def qr_code_detail(request, pk):
     qr = get_object_or_404(QRCodeRecord.objects.filter(owner=request.user).select_related("lot", "roll"), pk=pk)
@@ -9303,7 +10387,13 @@ def program_start_save(request, pk):
     )
 
     if form.is_valid() and fabric_formset.is_valid() and size_formset.is_valid() and jobber_formset.is_valid():
+        strategy = request.POST.get("allocation_strategy") or "fifo"
+        if strategy not in dict(LOT_ALLOCATION_STRATEGY_CHOICES):
+            strategy = "fifo"
+
         with transaction.atomic():
+            ProgramLotAllocation.release(start_record)
+
             start_record = form.save(commit=False)
             start_record.owner = request.user
             start_record.program = program
@@ -9318,9 +10408,20 @@ def program_start_save(request, pk):
             size_formset.save()
             jobber_formset.save()
 
+            shortfalls = ProgramLotAllocation.allocate(start_record, strategy=strategy)
+
+        message = "Program started successfully."
+        if shortfalls:
+            message += " Lot stock is short for " + ", ".join(
+                f"{fabric.material.name} ({remaining})" for fabric, remaining in shortfalls
+            ) + "."
         return JsonResponse({
             "ok": True,
-            "message": "Program started successfully.",
+            "message": message,
+            "shortfalls": [
+                {"material": fabric.material.name, "short_qty": str(remaining)}
+                for fabric, remaining in shortfalls
+            ],
             "redirect_url": reverse("accounts:program_list"),
         })
 
@@ -9536,6 +10637,11 @@ def program_challan_create(request, program_id, start_jobber_id):
 
 @login_required
 @require_http_methods(["GET"])
+@conditional_document(
+    _owner_scope(ProgramJobberChallan),
+    fields=("updated_at", "program__updated_at", "program__bom__updated_at"),
+    children={"size_rows": None},
+)
 def program_challan_detail(request, pk):
     challan = get_object_or_404(
         ProgramJobberChallan.objects.filter(owner=request.user)
@@ -9618,6 +10724,11 @@ def program_challan_approve(request, pk):
 
 @login_required
 @require_http_methods(["GET"])
+@conditional_document(
+    _owner_scope(ProgramJobberChallan),
+    fields=("updated_at", "program__updated_at", "program__bom__updated_at"),
+    children={"size_rows": None},
+)
 def program_challan_print(request, pk):
     challan = get_object_or_404(
         ProgramJobberChallan.objects.filter(owner=request.user)
@@ -9642,15 +10753,7 @@ def program_challan_print(request, pk):
 # =========================================================
 
 def _invoice_month_range(month_key: str):
-    year, month = month_key.split("-")
-    year = int(year)
-    month = int(month)
-    start = datetime(year, month, 1).date()
-    if month == 12:
-        end = datetime(year + 1, 1, 1).date()
-    else:
-        end = datetime(year, month + 1, 1).date()
-    return start, end
+    return month_key_range(month_key)
 
 
 @login_required
@@ -9665,15 +10768,41 @@ def invoice_list(request):
             | Q(client__name__icontains=q)
             | Q(firm__firm_name__icontains=q)
         )
+    if export_format(request):
+        rows = invoices.values_list(
+            "invoice_no", "invoice_date", "program__program_no", "program__bom__sku", "client__name",
+            "firm__firm_name", "vehicle_no", "sub_total", "discount_percent", "discount_amount",
+            "after_discount_amount", "other_charges", "gst_percent", "gst_amount", "igst_percent",
+            "igst_amount", "final_amount", "remarks",
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(
+            request,
+            "invoices",
+            [
+                "Invoice No", "Invoice Date", "Program", "SKU", "Client", "Firm", "Vehicle No",
+                "Sub Total", "Discount %", "Discount", "After Discount", "Other Charges",
+                "GST %", "GST", "IGST %", "IGST", "Final Amount", "Remarks",
+            ],
+            rows,
+        )
     return render(request, "accounts/invoices/list.html", {"invoices": invoices, "q": q})
 
 
 @login_required
 @require_GET
-def invoice_program_payload(request, program_id):
-    program = get_object_or_404(Program.objects.filter(owner=request.user).select_related("bom", "firm"), pk=program_id)
-    challans = list(program.dispatch_challans.all().order_by("-challan_date", "-id")) if hasattr(program, 'dispatch_challans') else []
-    latest_snapshot = program.costing_snapshots.order_by("-id").first() if hasattr(program, 'costing_snapshots') else None
+@conditional_document(
+    _owner_scope(Program),
+    kwarg="program_id",
+    fields=("updated_at", "bom__updated_at"),
+    children={"dispatch_challans": "updated_at", "costing_snapshots": "updated_at"},
+)
+async def invoice_program_payload(request, program_id):
+    # Async so that, under ASGI, polling the payload does not hold a worker
+    # thread while the queries run.
+    user = await request.auser()
+    program = await aget_object_or_404(Program.objects.filter(owner=user).select_related("bom", "firm"), pk=program_id)
+    challans = [challan async for challan in program.dispatch_challans.all().order_by("-challan_date", "-id")] if hasattr(program, 'dispatch_challans') else []
+    latest_snapshot = await program.costing_snapshots.order_by("-id").afirst() if hasattr(program, 'costing_snapshots') else None
     price = Decimal("0")
     if latest_snapshot:
         price = latest_snapshot.target_selling_price or latest_snapshot.total_cost or Decimal("0")
@@ -9768,14 +10897,20 @@ def invoice_create(request):
                     invoice.firm = invoice.program.firm
                 invoice.save()
 
+                challan_ids = [item["dispatch_challan_id"] for item in cleaned_items if item["dispatch_challan_id"]]
+                challan_map = DispatchChallan.objects.filter(owner=request.user).in_bulk(challan_ids) if challan_ids else {}
                 item_objs = []
                 for item in cleaned_items:
                     dispatch_challan = None
                     if item["dispatch_challan_id"]:
-                        dispatch_challan = DispatchChallan.objects.filter(owner=request.user, pk=item["dispatch_challan_id"]).first()
+                        try:
+                            dispatch_challan = challan_map.get(int(item["dispatch_challan_id"]))
+                        except (TypeError, ValueError):
+                            dispatch_challan = None
                     item_objs.append(ProgramInvoiceItem(invoice=invoice, dispatch_challan=dispatch_challan, **{k:v for k,v in item.items() if k != 'dispatch_challan_id'}))
-                ProgramInvoiceItem.objects.bulk_create(item_objs)
+                record_changes(ProgramInvoiceItem.objects.bulk_create(item_objs), "insert")
                 invoice.recompute_totals(save=True)
+                MonthlyCostFact.refresh_for_dates(request.user, invoice.invoice_date)
 
                 messages.success(request, f"Invoice {invoice.invoice_no} created successfully.")
                 return redirect("accounts:invoice_list")
@@ -9783,7 +10918,156 @@ def invoice_create(request):
     return render(request, "accounts/invoices/form.html", {"form": form, "mode": "add"})
 
 
+def _latest_program_prices(program_ids):
+    prices = {}
+    snapshots = (
+        CostingSnapshot.objects.filter(program_id__in=program_ids)
+        .order_by("program_id", "-id")
+        .values_list("program_id", "target_selling_price", "total_cost")
+    )
+    for program_id, selling_price, total_cost in snapshots:
+        if program_id not in prices:
+            prices[program_id] = Decimal(selling_price or total_cost or 0).quantize(Decimal("0.01"))
+    return prices
+
+
+def _uninvoiced_challan_groups(owner, start, end):
+    challans = list(
+        DispatchChallan.objects.filter(
+            owner=owner,
+            challan_date__gte=start,
+            challan_date__lt=end,
+            invoice_items__isnull=True,
+        )
+        .select_related("program", "program__bom", "client")
+        .order_by("client__name", "program__program_no", "challan_date", "id")
+    )
+    prices = _latest_program_prices({challan.program_id for challan in challans})
+
+    groups = {}
+    for challan in challans:
+        program = challan.program
+        key = (challan.client_id, challan.program_id)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                "client": challan.client,
+                "program": program,
+                "firm_id": challan.firm_id or program.firm_id,
+                "vehicle_no": challan.vehicle_no or "",
+                "price": prices.get(program.id, Decimal("0.00")),
+                "rows": [],
+                "quantity": Decimal("0"),
+                "sub_total": Decimal("0"),
+            }
+        quantity = program.total_qty or Decimal("0")
+        amount = (quantity * group["price"]).quantize(Decimal("0.01"))
+        group["rows"].append({"challan": challan, "quantity": quantity, "amount": amount})
+        group["quantity"] += quantity
+        group["sub_total"] += amount
+    return list(groups.values())
+
+
+def _create_batch_invoices(owner, groups, invoice_date, discount_percent, gst_percent, igst_percent):
+    groups = [group for group in groups if group["firm_id"]]
+    if not groups:
+        return []
+
+    numbers = ProgramInvoice.next_invoice_numbers(owner, len(groups))
+    invoices = []
+    for group, invoice_no in zip(groups, numbers):
+        invoice = ProgramInvoice(
+            owner=owner,
+            invoice_no=invoice_no,
+            invoice_date=invoice_date,
+            firm_id=group["firm_id"],
+            client=group["client"],
+            program=group["program"],
+            vehicle_no=group["vehicle_no"],
+            discount_percent=discount_percent,
+            gst_percent=gst_percent,
+            igst_percent=igst_percent,
+        )
+        invoice.apply_totals(group["sub_total"])
+        invoices.append(invoice)
+    record_changes(ProgramInvoice.objects.bulk_create(invoices), "insert")
+
+    item_objs = []
+    for invoice, group in zip(invoices, groups):
+        program = group["program"]
+        for idx, row in enumerate(group["rows"], start=1):
+            challan = row["challan"]
+            item_objs.append(
+                ProgramInvoiceItem(
+                    invoice=invoice,
+                    dispatch_challan=challan,
+                    program_label=program.program_no or "",
+                    sku=getattr(program.bom, "sku", "") or "",
+                    challan_no=challan.challan_no or "",
+                    quantity=row["quantity"],
+                    price=group["price"],
+                    amount=row["amount"],
+                    sort_order=idx,
+                )
+            )
+    record_changes(ProgramInvoiceItem.objects.bulk_create(item_objs, batch_size=500), "insert")
+    return invoices
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def invoice_batch_create(request):
+    form = ProgramInvoiceBatchForm(request.POST or None)
+    groups = []
+    skipped_groups = []
+
+    if request.method == "POST" and form.is_valid():
+        start, end = _invoice_month_range(form.cleaned_data["month_key"])
+
+        if request.POST.get("action") == "create":
+            with transaction.atomic():
+                groups = _uninvoiced_challan_groups(request.user, start, end)
+                invoices = _create_batch_invoices(
+                    request.user,
+                    groups,
+                    form.cleaned_data["invoice_date"],
+                    form.cleaned_data["discount_percent"],
+                    form.cleaned_data["gst_percent"],
+                    form.cleaned_data["igst_percent"],
+                )
+                MonthlyCostFact.refresh_for_dates(request.user, form.cleaned_data["invoice_date"])
+
+            skipped = len(groups) - len(invoices)
+            if invoices:
+                messages.success(request, f"{len(invoices)} invoices created from dispatched challans.")
+            else:
+                messages.error(request, "No uninvoiced dispatch challans found for the selected month.")
+            if skipped:
+                messages.error(request, f"{skipped} client/program groups were skipped because no firm is set.")
+            return redirect("accounts:invoice_list")
+
+        groups = _uninvoiced_challan_groups(request.user, start, end)
+        skipped_groups = [group for group in groups if not group["firm_id"]]
+
+    return render(
+        request,
+        "accounts/invoices/batch.html",
+        {
+            "form": form,
+            "groups": groups,
+            "skipped_groups": skipped_groups,
+            "challan_count": sum(len(group["rows"]) for group in groups),
+            "batch_sub_total": sum((group["sub_total"] for group in groups), Decimal("0")),
+        },
+    )
+
+
 @login_required
+@conditional_document(
+    _owner_scope(ProgramInvoice),
+    fields=("updated_at", "program__updated_at", "program__bom__updated_at", "client__updated_at"),
+    children={"items": None},
+)
 def invoice_detail(request, pk):
     invoice = get_object_or_404(ProgramInvoice.objects.filter(owner=request.user).select_related("firm", "client", "program", "program__bom").prefetch_related("items", "items__dispatch_challan"), pk=pk)
     return render(request, "accounts/invoices/detail.html", {"invoice": invoice})
@@ -9844,6 +11128,11 @@ def _build_program_invoice_pdf_response(invoice):
 
 
 @login_required
+@conditional_document(
+    _owner_scope(ProgramInvoice),
+    fields=("updated_at", "program__updated_at", "program__bom__updated_at", "client__updated_at"),
+    children={"items": None},
+)
 def invoice_print(request, pk):
     invoice = get_object_or_404(ProgramInvoice.objects.filter(owner=request.user).select_related('firm','client','program','program__bom').prefetch_related('items'), pk=pk)
     response = _build_program_invoice_pdf_response(invoice)
@@ -9888,18 +11177,46 @@ def maintenance_list(request):
 
 @login_required
 @require_GET
-def maintenance_month_payload(request):
+async def maintenance_month_payload(request):
+    user = await request.auser()
     month_key = (request.GET.get('month_key') or '').strip()
     inward_total = Decimal('0')
     if month_key:
         try:
-            start, end = _invoice_month_range(month_key)
-            inward_total = ReadyPOInwardItem.objects.filter(inward__po__owner=request.user, inward__inward_date__gte=start, inward__inward_date__lt=end).aggregate(total=Sum('quantity')).get('total') or Decimal('0')
+            inward_total = (await MonthlyCostFact.afor_month(user, month_key)).ready_inward_qty or Decimal('0')
         except Exception:
             inward_total = Decimal('0')
     return JsonResponse({'inward_total': str(inward_total.quantize(Decimal('0.01'))), 'cost_total': str(inward_total.quantize(Decimal('0.01')))})
 
 
+@login_required
+@require_GET
+async def maintenance_trend_payload(request):
+    user = await request.auser()
+    month_key = (request.GET.get('month_key') or '').strip() or f"{timezone.localdate():%Y-%m}"
+    try:
+        facts = await MonthlyCostFact.atrend(user, month_key)
+    except Exception:
+        return JsonResponse({'ok': False, 'message': 'Month must be in YYYY-MM format.'}, status=400)
+    rows = []
+    for fact in facts:
+        rows.append({
+            'month_key': fact.month_key,
+            'yarn_inward_qty': str(fact.yarn_inward_qty),
+            'yarn_inward_value': str(fact.yarn_inward_value),
+            'greige_inward_qty': str(fact.greige_inward_qty),
+            'greige_inward_value': str(fact.greige_inward_value),
+            'dyeing_inward_qty': str(fact.dyeing_inward_qty),
+            'dyeing_inward_value': str(fact.dyeing_inward_value),
+            'ready_inward_qty': str(fact.ready_inward_qty),
+            'expense_total': str(fact.expense_total),
+            'cost_total': str(fact.cost_total),
+            'invoice_total': str(fact.invoice_total),
+            'invoice_count': fact.invoice_count,
+        })
+    return JsonResponse({'ok': True, 'months': rows})
+
+
 @login_required
 @require_http_methods(["GET", "POST"] )
 def maintenance_create(request):
@@ -9911,11 +11228,611 @@ def maintenance_create(request):
         record = form.save(commit=False)
         record.owner = request.user
         try:
-            start, end = _invoice_month_range(record.month_key)
-            record.inward_total = ReadyPOInwardItem.objects.filter(inward__po__owner=request.user, inward__inward_date__gte=start, inward__inward_date__lt=end).aggregate(total=Sum('quantity')).get('total') or Decimal('0')
+            record.inward_total = MonthlyCostFact.for_month(request.user, record.month_key).ready_inward_qty or Decimal('0')
         except Exception:
             record.inward_total = Decimal('0')
         record.save()
+        MonthlyCostFact.refresh(request.user, record.month_key)
         messages.success(request, f'Maintenance record for {record.month_display} saved successfully.')
         return redirect('accounts:maintenance_list')
     return render(request, 'accounts/maintenance/form.html', {'form': form, 'mode': 'add'})
+
+
+# =========================================================
+# Reports
+# =========================================================
+
+REPORT_DEFINITIONS = {
+    "purchase": {
+        "title": "Purchase Value",
+        "subtitle": "Ordered and received value by vendor, material and month for each PO stage.",
+        "model": PurchaseReportFact,
+        "dimension": ("vendor_name", "Vendor"),
+        "detail": [("month_key", "Month"), ("stage", "Stage"), ("material_name", "Material")],
+        "measures": [
+            ("ordered_qty", "Ordered Qty"),
+            ("ordered_value", "Ordered Value"),
+            ("inward_qty", "Inward Qty"),
+            ("inward_value", "Inward Value"),
+        ],
+    },
+    "yield": {
+        "title": "Stage Yield",
+        "subtitle": "Greige sent to dyeing against dyed and ready fabric received, by dyeing vendor.",
+        "model": StageYieldFact,
+        "dimension": ("vendor_name", "Dyeing Vendor"),
+        "detail": [("month_key", "PO Month")],
+        "measures": [
+            ("greige_input_qty", "Greige Input"),
+            ("expected_output_qty", "Expected Output"),
+            ("dyeing_received_qty", "Dyeing Received"),
+            ("dyeing_accepted_qty", "Dyeing Accepted"),
+            ("dyeing_rejected_qty", "Dyeing Rejected"),
+            ("ready_inward_qty", "Ready Inward"),
+        ],
+        "derived": [
+            ("dyeing_yield", "Dyeing Yield %", "dyeing_accepted_qty", "greige_input_qty"),
+            ("ready_yield", "Ready Yield %", "ready_inward_qty", "dyeing_accepted_qty"),
+        ],
+    },
+    "jobber-output": {
+        "title": "Jobber Output",
+        "subtitle": "Program challans issued to and received back from each jobber.",
+        "model": JobberOutputFact,
+        "dimension": ("jobber_name", "Jobber"),
+        "detail": [("month_key", "Month"), ("jobber_type_name", "Jobber Type")],
+        "measures": [
+            ("challan_count", "Challans"),
+            ("issued_qty", "Issued Qty"),
+            ("inward_qty", "Inward Qty"),
+        ],
+        "derived": [
+            ("inward_percent", "Returned %", "inward_qty", "issued_qty"),
+        ],
+    },
+    "client-sales": {
+        "title": "Client Sales",
+        "subtitle": "Dispatch challans and invoice value by client.",
+        "model": ClientSalesFact,
+        "dimension": ("client_name", "Client"),
+        "detail": [("month_key", "Month")],
+        "measures": [
+            ("dispatch_count", "Dispatches"),
+            ("dispatch_qty", "Dispatch Qty"),
+            ("invoice_count", "Invoices"),
+            ("invoice_value", "Invoice Value"),
+        ],
+    },
+}
+
+
+def _report_month_window(request):
+    today = timezone.localdate()
+    year, month = today.year, today.month - 11
+    if month <= 0:
+        year, month = year - 1, month + 12
+    default_from = f"{year:04d}-{month:02d}"
+    default_to = f"{today:%Y-%m}"
+
+    try:
+        month_from = f"{month_key_range((request.GET.get('from') or '').strip() or default_from)[0]:%Y-%m}"
+        month_to = f"{month_key_range((request.GET.get('to') or '').strip() or default_to)[0]:%Y-%m}"
+    except (TypeError, ValueError):
+        month_from, month_to = default_from, default_to
+    if month_from > month_to:
+        month_from, month_to = month_to, month_from
+    return month_from, month_to
+
+
+def _report_percent(numerator, denominator):
+    if not denominator:
+        return None
+    return (Decimal(numerator or 0) * Decimal("100") / Decimal(denominator)).quantize(Decimal("0.01"))
+
+
+@login_required
+def report_home(request):
+    state = ReportRefreshState.objects.filter(owner=request.user).first()
+    reports = [
+        {"key": key, "title": definition["title"], "subtitle": definition["subtitle"]}
+        for key, definition in REPORT_DEFINITIONS.items()
+    ]
+    return render(request, "accounts/reports/home.html", {"reports": reports, "state": state})
+
+
+@login_required
+@require_GET
+def report_detail(request, report_key):
+    definition = REPORT_DEFINITIONS.get(report_key)
+    if definition is None:
+        return redirect("accounts:report_home")
+
+    month_from, month_to = _report_month_window(request)
+    dimension_field, dimension_label = definition["dimension"]
+    measure_fields = [field for field, _ in definition["measures"]]
+    derived = definition.get("derived", [])
+
+    facts = definition["model"].objects.filter(
+        owner=request.user,
+        month_key__gte=month_from,
+        month_key__lte=month_to,
+    )
+
+    stage = ""
+    if report_key == "purchase":
+        stage = (request.GET.get("stage") or "").strip()
+        if stage in dict(REPORT_STAGE_CHOICES):
+            facts = facts.filter(stage=stage)
+        else:
+            stage = ""
+
+    has_drill_key = "key" in request.GET
+    drill_key = (request.GET.get("key") or "").strip()
+    if has_drill_key:
+        facts = facts.filter(**{dimension_field: drill_key})
+        group_fields = [field for field, _ in definition["detail"]]
+        group_columns = definition["detail"]
+    else:
+        group_fields = [dimension_field]
+        group_columns = [definition["dimension"]]
+
+    aggregates = {field: Sum(field) for field in measure_fields}
+    rows = list(facts.values(*group_fields).annotate(**aggregates).order_by(*group_fields))
+    totals = facts.aggregate(**aggregates)
+
+    stage_labels = dict(REPORT_STAGE_CHOICES)
+    table_rows = []
+    for row in rows:
+        for name, _, numerator, denominator in derived:
+            row[name] = _report_percent(row[numerator], row[denominator])
+        table_rows.append({
+            "labels": [
+                stage_labels.get(row[field], row[field]) if field == "stage" else (row[field] or "-")
+                for field in group_fields
+            ],
+            "drill_key": None if has_drill_key else (row[dimension_field] or ""),
+            "values": [row[field] for field in measure_fields] + [row[name] for name, *_ in derived],
+        })
+    for name, _, numerator, denominator in derived:
+        totals[name] = _report_percent(totals[numerator], totals[denominator])
+    total_values = [totals[field] for field in measure_fields] + [totals[name] for name, *_ in derived]
+
+    value_columns = [label for _, label in definition["measures"]] + [label for _, label, *_ in derived]
+
+    return render(request, "accounts/reports/detail.html", {
+        "report_key": report_key,
+        "definition": definition,
+        "group_columns": group_columns,
+        "value_columns": value_columns,
+        "column_count": len(group_columns) + len(value_columns),
+        "rows": table_rows,
+        "total_values": total_values,
+        "month_from": month_from,
+        "month_to": month_to,
+        "stage": stage,
+        "stage_choices": REPORT_STAGE_CHOICES if report_key == "purchase" else (),
+        "has_drill_key": has_drill_key,
+        "drill_key": drill_key,
+        "dimension_label": dimension_label,
+        "state": ReportRefreshState.objects.filter(owner=request.user).first(),
+    })
+
+
+@login_required
+@require_POST
+def report_refresh(request):
+    month_keys = ReportRefreshState.run(request.user)
+    messages.success(request, f"Reports refreshed ({len(month_keys)} month(s) rebuilt).")
+    next_url = request.POST.get("next") or ""
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect("accounts:report_home")
+
+
+DYEING_LOSS_COLUMNS = (
+    "po__vendor_id",
+    "po__vendor__name",
+    "dyeing_type",
+    "finished_material__name",
+    "fabric_name",
+    "quantity",
+    "total_qty",
+    "source_input_qty",
+    "expected_loss_percent",
+    "expected_output_qty",
+    "dyeing_master_detail__weight_loss",
+    "received_total",
+    "inward_total",
+    "accepted_total",
+    "rejected_total",
+    "hold_total",
+)
+DYEING_LOSS_PERCENTILES = (50, 90, 95)
+
+
+def _dyeing_loss_cache_key(owner):
+    inwards = DyeingPOInward.objects.filter(owner=owner).aggregate(last=Max("updated_at"), count=Count("id"))
+    pos = DyeingPurchaseOrder.objects.filter(owner=owner).aggregate(last=Max("updated_at"), count=Count("id"))
+    stamp = "-".join(
+        f"{row['count']}.{int(row['last'].timestamp() * 1000000) if row['last'] else 0}"
+        for row in (inwards, pos)
+    )
+    return f"dyeing-loss:{owner.pk}:{stamp}"
+
+
+def _dyeing_loss_rows(owner):
+    return list(
+        DyeingPurchaseOrderItem.objects.filter(po__owner=owner)
+        .annotate(
+            received_total=Sum("inward_items__received_qty"),
+            inward_total=Sum("inward_items__quantity"),
+            accepted_total=Sum("inward_items__accepted_qty"),
+            rejected_total=Sum("inward_items__rejected_qty"),
+            hold_total=Sum("inward_items__hold_qty"),
+        )
+        .values_list(*DYEING_LOSS_COLUMNS)
+        .order_by()
+    )
+
+
+def _dyeing_loss_analytics(np, rows):
+    if not rows:
+        return {"line_count": 0, "summary": {}, "groups": {"vendor": [], "dyeing_type": [], "material": []}}
+
+    numeric = np.array([row[5:] for row in rows], dtype=float)
+    (
+        quantity, total_qty, source_input_qty, expected_loss_percent, expected_output_qty,
+        promised_loss, received_qty, inward_qty, accepted_qty, rejected_qty, hold_qty,
+    ) = np.nan_to_num(numeric, nan=0.0).T
+    promised_loss = numeric[:, 5]
+
+    input_qty = np.where(source_input_qty > 0, source_input_qty, np.where(total_qty > 0, total_qty, quantity))
+    received_qty = np.where(received_qty > 0, received_qty, inward_qty)
+    mask = (input_qty > 0) & (received_qty > 0)
+    if not mask.any():
+        return {"line_count": 0, "summary": {}, "groups": {"vendor": [], "dyeing_type": [], "material": []}}
+
+    input_qty = input_qty[mask]
+    received_qty = received_qty[mask]
+    accepted_qty = accepted_qty[mask]
+    rejected_qty = rejected_qty[mask]
+    hold_qty = hold_qty[mask]
+    promised_loss = promised_loss[mask]
+    expected_loss = np.where(
+        expected_loss_percent[mask] > 0,
+        expected_loss_percent[mask],
+        np.where(expected_output_qty[mask] > 0, (1 - expected_output_qty[mask] / input_qty) * 100, np.nan),
+    )
+    expected_loss = np.where(np.isnan(expected_loss), promised_loss, expected_loss)
+    actual_loss = (1 - received_qty / input_qty) * 100
+    deviation = actual_loss - expected_loss
+
+    def stat(values):
+        values = values[~np.isnan(values)]
+        return round(float(values.mean()), 2) if values.size else None
+
+    hist_counts, hist_edges = np.histogram(np.clip(actual_loss, -10, 50), bins=12, range=(-10, 50))
+    summary = {
+        "input_qty": round(float(input_qty.sum()), 2),
+        "received_qty": round(float(received_qty.sum()), 2),
+        "actual_loss_percent": round(float((1 - received_qty.sum() / input_qty.sum()) * 100), 2),
+        "mean_line_loss_percent": stat(actual_loss),
+        "mean_expected_loss_percent": stat(expected_loss),
+        "mean_deviation_percent": stat(deviation),
+        "percentiles": {
+            f"p{p}": round(float(value), 2)
+            for p, value in zip(DYEING_LOSS_PERCENTILES, np.percentile(actual_loss, DYEING_LOSS_PERCENTILES))
+        },
+        "histogram": [
+            {"from": round(float(low), 1), "to": round(float(high), 1), "lines": int(count)}
+            for low, high, count in zip(hist_edges[:-1], hist_edges[1:], hist_counts)
+        ],
+    }
+
+    vendor_names = np.array([row[1] or "-" for row in rows], dtype=object)[mask]
+    dyeing_types = np.array([row[2] or "-" for row in rows], dtype=object)[mask]
+    materials = np.array([row[3] or row[4] or "-" for row in rows], dtype=object)[mask]
+    dimensions = {
+        "vendor": (np.array([str(row[0] or "") for row in rows])[mask], vendor_names),
+        "dyeing_type": (dyeing_types.astype(str), dyeing_types),
+        "material": (materials.astype(str), materials),
+    }
+
+    groups = {}
+    for name, (keys, names) in dimensions.items():
+        unique_keys, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        size = unique_keys.size
+        lines = np.bincount(inverse, minlength=size)
+        input_sum = np.bincount(inverse, weights=input_qty, minlength=size)
+        received_sum = np.bincount(inverse, weights=received_qty, minlength=size)
+        accepted_sum = np.bincount(inverse, weights=accepted_qty, minlength=size)
+        rejected_sum = np.bincount(inverse, weights=rejected_qty, minlength=size)
+        hold_sum = np.bincount(inverse, weights=hold_qty, minlength=size)
+
+        expected_known = ~np.isnan(expected_loss)
+        expected_weight = np.bincount(inverse, weights=np.where(expected_known, input_qty, 0), minlength=size)
+        expected_sum = np.bincount(inverse, weights=np.where(expected_known, expected_loss * input_qty, 0), minlength=size)
+        promised_known = ~np.isnan(promised_loss)
+        promised_count = np.bincount(inverse, weights=promised_known.astype(float), minlength=size)
+        promised_sum = np.bincount(inverse, weights=np.where(promised_known, promised_loss, 0), minlength=size)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            group_actual = (1 - received_sum / input_sum) * 100
+            group_expected = np.where(expected_weight > 0, expected_sum / expected_weight, np.nan)
+            group_promised = np.where(promised_count > 0, promised_sum / promised_count, np.nan)
+            group_rejected = np.where(received_sum > 0, rejected_sum / received_sum * 100, np.nan)
+
+        order = np.lexsort((actual_loss, inverse))
+        starts = np.concatenate(([0], np.cumsum(lines)[:-1]))
+        group_percentiles = {
+            f"p{p}": actual_loss[order][starts + np.floor((lines - 1) * p / 100).astype(int)]
+            for p in DYEING_LOSS_PERCENTILES
+        }
+
+        def number(values, index):
+            value = values[index]
+            return None if np.isnan(value) else round(float(value), 2)
+
+        results = []
+        for index in range(size):
+            results.append({
+                "key": unique_keys[index],
+                "label": names[first_index[index]],
+                "lines": int(lines[index]),
+                "input_qty": round(float(input_sum[index]), 2),
+                "received_qty": round(float(received_sum[index]), 2),
+                "accepted_qty": round(float(accepted_sum[index]), 2),
+                "rejected_qty": round(float(rejected_sum[index]), 2),
+                "hold_qty": round(float(hold_sum[index]), 2),
+                "actual_loss_percent": number(group_actual, index),
+                "expected_loss_percent": number(group_expected, index),
+                "promised_loss_percent": number(group_promised, index),
+                "deviation_percent": (
+                    None if np.isnan(group_expected[index]) else round(float(group_actual[index] - group_expected[index]), 2)
+                ),
+                "rejection_percent": number(group_rejected, index),
+                **{key: round(float(values[index]), 2) for key, values in group_percentiles.items()},
+            })
+        results.sort(key=lambda row: row["deviation_percent"] if row["deviation_percent"] is not None else float("-inf"), reverse=True)
+        groups[name] = results
+
+    return {"line_count": int(mask.sum()), "summary": summary, "groups": groups}
+
+
+@login_required
+@require_GET
+def report_dyeing_loss_payload(request):
+    try:
+        import numpy as np
+    except ImportError:
+        return JsonResponse(
+            {"ok": False, "message": "NumPy is required for loss analytics. Install it with: pip install numpy"},
+            status=500,
+        )
+
+    cache_key = _dyeing_loss_cache_key(request.user)
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = _dyeing_loss_analytics(np, _dyeing_loss_rows(request.user))
+        cache.set(cache_key, payload, 60 * 60 * 24)
+    return JsonResponse({"ok": True, **payload})
+
+
+# =========================================================
+# JSON API (v1)
+# =========================================================
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 500
+
+
+def _api_resource(model, owner_path="owner", updated_path="updated_at"):
+    return {"model": model, "owner_path": owner_path, "updated_path": updated_path}
+
+
+# Inward items have no timestamps of their own; they sync with their inward.
+API_RESOURCES = {
+    "yarn-pos": _api_resource(YarnPurchaseOrder),
+    "greige-pos": _api_resource(GreigePurchaseOrder),
+    "dyeing-pos": _api_resource(DyeingPurchaseOrder),
+    "ready-pos": _api_resource(ReadyPurchaseOrder),
+    "yarn-inward-items": _api_resource(YarnPOInwardItem, "inward__owner", "inward__updated_at"),
+    "greige-inward-items": _api_resource(GreigePOInwardItem, "inward__owner", "inward__updated_at"),
+    "dyeing-inward-items": _api_resource(DyeingPOInwardItem, "inward__owner", "inward__updated_at"),
+    "ready-inward-items": _api_resource(ReadyPOInwardItem, "inward__owner", "inward__updated_at"),
+    "programs": _api_resource(Program),
+    "challans": _api_resource(ProgramJobberChallan),
+    "dispatches": _api_resource(DispatchChallan),
+    "invoices": _api_resource(ProgramInvoice),
+    "lots": _api_resource(InventoryLot),
+}
+
+
+def _api_fields(model):
+    fields = {}
+    for field in model._meta.concrete_fields:
+        if field.name != "owner":
+            fields[field.name] = field
+            fields[field.attname] = field
+    return fields
+
+
+def _api_owner(request):
+    scheme, _, key = (request.headers.get("Authorization") or "").partition(" ")
+    if scheme.lower() in ("token", "bearer"):
+        token = ApiToken.authenticate(key.strip())
+        return token.owner if token else None
+    if request.user.is_authenticated:
+        return request.user
+    return None
+
+
+def _api_cursor(updated_at, pk):
+    raw = f"{updated_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _api_parse_cursor(value):
+    raw = base64.urlsafe_b64decode((value + "=" * (-len(value) % 4)).encode()).decode()
+    updated_at, pk = raw.split("|")
+    updated_at = parse_datetime(updated_at)
+    if updated_at is None:
+        raise ValueError(value)
+    return updated_at, int(pk)
+
+
+def _api_value(field, obj):
+    value = getattr(obj, field.attname)
+    if isinstance(field, FileField):
+        return value.name or None
+    return value
+
+
+@require_GET
+def api_index(request):
+    if _api_owner(request) is None:
+        return JsonResponse({"ok": False, "error": "Authentication required."}, status=401)
+
+    return JsonResponse({
+        "ok": True,
+        "version": 1,
+        "resources": {
+            name: {
+                "url": reverse("accounts:api_list", args=[name]),
+                "fields": [field.attname for field in spec["model"]._meta.concrete_fields if field.name != "owner"],
+            }
+            for name, spec in API_RESOURCES.items()
+        },
+        "changes": reverse("accounts:api_changes"),
+    })
+
+
+@require_GET
+def api_list(request, resource):
+    owner = _api_owner(request)
+    if owner is None:
+        return JsonResponse({"ok": False, "error": "Authentication required."}, status=401)
+
+    spec = API_RESOURCES.get(resource)
+    if spec is None:
+        return JsonResponse({"ok": False, "error": "Unknown resource."}, status=404)
+
+    model = spec["model"]
+    available = _api_fields(model)
+    requested = [name.strip() for name in (request.GET.get("fields") or "").split(",") if name.strip()]
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        return JsonResponse({"ok": False, "error": f"Unknown fields: {', '.join(unknown)}."}, status=400)
+
+    default = [field for field in model._meta.concrete_fields if field.name != "owner"]
+    selected = [model._meta.pk]
+    for field in [available[name] for name in requested] or default:
+        if field not in selected:
+            selected.append(field)
+
+    try:
+        limit = min(max(int(request.GET.get("limit") or API_PAGE_SIZE), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "limit must be a number."}, status=400)
+
+    updated_since = None
+    if request.GET.get("updated_since"):
+        updated_since = parse_datetime(request.GET["updated_since"])
+        if updated_since is None:
+            return JsonResponse({"ok": False, "error": "updated_since must be an ISO 8601 datetime."}, status=400)
+        if timezone.is_naive(updated_since):
+            updated_since = timezone.make_aware(updated_since)
+
+    cursor = None
+    if request.GET.get("cursor"):
+        try:
+            cursor = _api_parse_cursor(request.GET["cursor"])
+        except (ValueError, UnicodeDecodeError):
+            return JsonResponse({"ok": False, "error": "Invalid cursor."}, status=400)
+
+    with tenant_context(owner):
+        qs = (
+            model.objects
+            .filter(**{spec["owner_path"]: owner})
+            .annotate(sync_ts=F(spec["updated_path"]))
+            .only(*[field.name for field in selected])
+            .order_by("sync_ts", "pk")
+        )
+        if updated_since is not None:
+            qs = qs.filter(sync_ts__gte=updated_since)
+        if cursor is not None:
+            qs = qs.filter(Q(sync_ts__gt=cursor[0]) | Q(sync_ts=cursor[0], pk__gt=cursor[1]))
+        # One extra row tells us whether another page exists without a COUNT query.
+        objects = list(qs[:limit + 1])
+
+    page = objects[:limit]
+    last = page[-1] if page else None
+    return JsonResponse({
+        "ok": True,
+        "resource": resource,
+        "results": [{field.attname: _api_value(field, obj) for field in selected} for obj in page],
+        "has_more": len(objects) > limit,
+        "next_cursor": _api_cursor(last.sync_ts, last.pk) if last is not None else None,
+        "last_updated_at": last.sync_ts if last is not None else None,
+    })
+
+
+@require_GET
+def api_changes(request):
+    owner = _api_owner(request)
+    if owner is None:
+        return JsonResponse({"ok": False, "error": "Authentication required."}, status=401)
+
+    try:
+        after = int(request.GET.get("cursor") or 0)
+        limit = min(max(int(request.GET.get("limit") or API_PAGE_SIZE), 1), API_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "cursor and limit must be numbers."}, status=400)
+
+    models = [label.strip().lower() for label in request.GET.getlist("model") if label.strip()]
+    known = {model._meta.label_lower for model in CHANGE_FEED_MODELS}
+    unknown = [label for label in models if label not in known]
+    if unknown:
+        return JsonResponse({"ok": False, "error": f"Unknown models: {', '.join(unknown)}."}, status=400)
+
+    with tenant_context(owner):
+        events = read_changes(owner, after, models, limit + 1)
+
+    page = events[:limit]
+    return JsonResponse({
+        "ok": True,
+        "results": [
+            {
+                "seq": event.seq,
+                "model": event.model_label,
+                "pk": event.object_pk,
+                "operation": event.operation,
+                "created_at": event.created_at,
+            }
+            for event in page
+        ],
+        "has_more": len(events) > limit,
+        "next_cursor": str(page[-1].seq if page else after),
+    })
+
+
+@login_required
+@require_GET
+def job_status(request, pk: int):
+    job = get_object_or_404(BackgroundJob, pk=pk, owner=request.user)
+    return JsonResponse({"ok": True, "job": job_payload(job)})
+
+
+@login_required
+@require_GET
+def job_file(request, pk: int):
+    job = get_object_or_404(BackgroundJob, pk=pk, owner=request.user, status="done")
+    result = job.result if isinstance(job.result, dict) else {}
+    storage = job_file_storage()
+    if not result.get("file") or not storage.exists(result["file"]):
+        raise Http404("This job has no file.")
+    return FileResponse(
+        storage.open(result["file"], "rb"),
+        as_attachment=request.GET.get("download") == "1",
+        filename=result.get("filename") or result["file"].rsplit("/", 1)[-1],
+    )
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'accounts.staticfiles.StaticAssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,6 +56,9 @@ MIDDLEWARE = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Roll QC grids post about ten fields per roll; allow lots of a few hundred rolls.
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -83,9 +87,55 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # SQLite has no row locks; start write transactions immediately so
+            # concurrent stock allocations queue instead of failing mid-way.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
     }
 }
 
+# Optional per-owner database routing: each owner's POs, inwards, programs,
+# lots and invoices go to their own SQLite file under TENANT_DB_DIR, while
+# auth, firms and masters stay in db.sqlite3. Split an existing database with
+# "manage.py split_tenant_databases" before turning it on.
+TENANT_DB_ROUTING = False
+TENANT_DB_DIR = BASE_DIR / "tenants"
+
+if TENANT_DB_ROUTING:
+    DATABASE_ROUTERS = ["accounts.tenant_db.TenantRouter"]
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.contrib.auth.middleware.AuthenticationMiddleware") + 1,
+        "accounts.tenant_db.TenantDatabaseMiddleware",
+    )
+    # Stock allocations now lock their tenant file; the central database
+    # only takes its write lock when masters actually change.
+    DATABASES["default"]["OPTIONS"]["transaction_mode"] = "DEFERRED"
+
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Per-owner master lists (units, vendors, firms, ...). File based so a
+    # version bump made by one worker process is seen by all of them.
+    "masters": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "masters",
+        "TIMEOUT": 60 * 60 * 24,
+    },
+    # Pre-rendered PO / program list cards (accounts.row_cache). Keys carry
+    # a stamp of the row's data, so entries are never invalidated by hand.
+    "rows": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "rows",
+        "TIMEOUT": 60 * 60 * 24 * 7,
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -123,6 +173,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
+# "manage.py collectstatic" writes content-hashed, pre-compressed copies here;
+# with DEBUG off they are served with a one-year immutable Cache-Control.
+STATIC_ROOT = BASE_DIR / "staticfiles"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "accounts.staticfiles.CompressedManifestStaticFilesStorage"},
+}
 
 LOGIN_URL = "accounts:login"
 LOGIN_REDIRECT_URL = "accounts:dashboard"
@@ -138,6 +195,16 @@ EMAIL_HOST_PASSWORD = "your-16-char-app-password"
 DEFAULT_FROM_EMAIL = f"InventTech <{EMAIL_HOST_USER}>"
 EMAIL_TIMEOUT = 20
 
+# Background jobs (accounts.jobs): lot syncs, generated PO line resyncs,
+# password-reset emails and ?background=1 PDFs. While this is on, every job
+# runs right after the commit of the request that queued it, so nothing
+# depends on a worker. Turn it off only once "manage.py run_jobs" runs as a
+# service next to the web server; otherwise queued jobs never run.
+BACKGROUND_JOBS_EAGER = True
+# Files produced by jobs (PDFs). Kept out of MEDIA_ROOT so they are only
+# served through the owner-checked jobs/<id>/file/ view.
+JOB_FILES_ROOT = BASE_DIR / "job_files"
+
 # Session cookie lives for 30 days
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 30  # 30 days
 